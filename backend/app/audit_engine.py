@@ -1,9 +1,45 @@
 import logging
+from collections.abc import Iterable, Iterator
 from difflib import SequenceMatcher
+from functools import lru_cache
 from typing import Any
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# Contract audited against when no contract rules are given
+DEFAULT_CONTRACT_RULES: dict[str, Any] = {
+    "carrier_name": "ROADWAY EXPRESS",
+    "max_rate_per_mile": 3.50,
+    "allowed_accessorials": ["FUEL SURCHARGE"],
+    "min_string_similarity": 0.8,
+}
+
+# Invoices audited together as one set of columns by the batch audit
+AUDIT_CHUNK_SIZE = 4096
+
+# Distinct pairs of invoice and contract carrier spellings whose similarity
+# is remembered; a contract typically sees only a handful of spellings
+CARRIER_SIMILARITY_CACHE_SIZE = 4096
+
+# difflib only applies its autojunk heuristic to strings at least this long,
+# so shorter identical strings are known to have a ratio of exactly 1.0
+AUTOJUNK_MIN_LENGTH = 200
+
+
+@lru_cache(maxsize=CARRIER_SIMILARITY_CACHE_SIZE)
+def carrier_similarity(invoice_carrier: str, contract_carrier: str) -> float:
+    """
+    Return the SequenceMatcher similarity (0-1) of two normalized carrier names.
+
+    Memoized, so repeated spellings cost a dictionary lookup instead of a
+    full sequence comparison.
+    """
+    if invoice_carrier == contract_carrier and len(contract_carrier) < AUTOJUNK_MIN_LENGTH:
+        return 1.0
+    return SequenceMatcher(None, invoice_carrier, contract_carrier).ratio()
+
 
 class AuditEngine:
     """
@@ -27,6 +63,23 @@ class AuditEngine:
         self.contract_rules = contract_rules
         self.min_similarity = contract_rules.get("min_string_similarity", 0.8)
 
+        # Contract terms are normalized once here rather than for every
+        # invoice, which matters when auditing a statement's worth of them
+        contract_carrier = contract_rules.get("carrier_name")
+        self._contract_carrier_norm = (
+            str(contract_carrier).upper().strip() if contract_carrier else None
+        )
+        self._max_rate = self._as_float(contract_rules.get("max_rate_per_mile"))
+        self._suspicious_rate = self._as_float(contract_rules.get("max_rate_per_mile", 10.0))
+
+    @staticmethod
+    def _as_float(value: Any) -> float | None:
+        """Convert a contract term to float, or None if it is not numeric."""
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return None
+
     def audit(
         self, invoice_data: dict[str, Any], shipment_data: dict[str, Any]
     ) -> list[dict[str, Any]]:
@@ -53,9 +106,167 @@ class AuditEngine:
                 - expected: Any (expected value)
                 - actual: Any (actual value)
         """
-        anomalies: list[dict[str, Any]] = []
+        anomalies = self._audit(invoice_data, shipment_data)
+        logger.info(f"Audit complete: found {len(anomalies)} anomalies")
+        return anomalies
+
+    def audit_batch(
+        self, pairs: Iterable[tuple[dict[str, Any], dict[str, Any]]]
+    ) -> list[list[dict[str, Any]]]:
+        """
+        Audit many invoices against this engine's contract.
+
+        Args:
+            pairs: (invoice_data, shipment_data) pairs, as taken by audit().
 
+        Returns:
+            The anomalies of each pair, in the order the pairs were given.
+        """
+        results = list(self.iter_audit_batch(pairs))
+        logger.info(
+            f"Batch audit complete: {sum(map(len, results))} anomalies "
+            f"across {len(results)} invoices"
+        )
+        return results
+
+    def iter_audit_batch(
+        self, pairs: Iterable[tuple[dict[str, Any], dict[str, Any]]]
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        Lazily audit a stream of (invoice_data, shipment_data) pairs.
+
+        Pairs are audited in chunks of AUDIT_CHUNK_SIZE, so statements too
+        large to hold in memory can be audited as they are read.
+        """
+        chunk: list[tuple[dict[str, Any], dict[str, Any]]] = []
+        for pair in pairs:
+            chunk.append(pair)
+            if len(chunk) == AUDIT_CHUNK_SIZE:
+                yield from self._audit_columnar(chunk)
+                chunk = []
+        if chunk:
+            yield from self._audit_columnar(chunk)
+
+    # Overflow to inf and NaN propagate silently, as in the scalar float checks
+    @np.errstate(all="ignore")
+    def _audit_columnar(
+        self, pairs: list[tuple[dict[str, Any], dict[str, Any]]]
+    ) -> list[list[dict[str, Any]]]:
+        """
+        Audit a chunk of invoices with the numeric checks vectorized.
+
+        Charges and mileages are loaded into arrays and the rate, overage and
+        threshold checks run over the whole chunk, with anomaly records built
+        only for the rows that fail. Rows whose values are not numeric take
+        the scalar path. Results are identical to auditing each pair alone.
+        """
+        results: list[list[dict[str, Any]]] = [[] for _ in pairs]
+        rows: list[int] = []
+        charges: list[float] = []
+        mileages: list[float] = []
+
+        for row, (invoice_data, shipment_data) in enumerate(pairs):
+            missing = self._check_required_fields(invoice_data, shipment_data)
+            if missing:
+                results[row] = missing
+                continue
+            try:
+                charge = float(invoice_data["total_charge"])
+                mileage = float(shipment_data["mileage"])
+            except (ValueError, TypeError):
+                results[row] = self._audit(invoice_data, shipment_data)
+                continue
+            rows.append(row)
+            charges.append(charge)
+            mileages.append(mileage)
+
+        if not rows:
+            return results
+
+        charge_column = np.array(charges, dtype=np.float64)
+        mileage_column = np.array(mileages, dtype=np.float64)
+
+        # Check 1: Rate Overage
+        if self.contract_rules.get("max_rate_per_mile"):
+            if self._max_rate is None:
+                logger.error("Invalid numeric values for rate calculation")
+            else:
+                max_rate = self._max_rate
+                invalid_mileage = mileage_column <= 0
+                actual_rate = np.divide(
+                    charge_column,
+                    mileage_column,
+                    out=np.full_like(charge_column, np.nan),
+                    where=~invalid_mileage,
+                )
+                expected = max_rate * mileage_column
+                overage_amount = charge_column - expected
+                overage_percent = ((actual_rate - max_rate) / max_rate) * 100
+
+                for i in np.flatnonzero(invalid_mileage).tolist():
+                    results[rows[i]].append(self._invalid_mileage_anomaly(mileages[i]))
+                for i in np.flatnonzero(actual_rate > max_rate).tolist():
+                    results[rows[i]].append(
+                        self._rate_overage_anomaly(
+                            charges[i],
+                            float(actual_rate[i]),
+                            max_rate,
+                            float(overage_amount[i]),
+                            float(overage_percent[i]),
+                            float(expected[i]),
+                        )
+                    )
+
+        # Check 2: Carrier Mismatch
+        for row in rows:
+            results[row].extend(self._check_carrier_match(pairs[row][0]))
+
+        # Check 3: Additional validations
+        for i in np.flatnonzero(charge_column <= 0).tolist():
+            results[rows[i]].append(self._invalid_charge_anomaly(pairs[rows[i]][0]["total_charge"]))
+        if self._suspicious_rate is not None:
+            threshold = self._suspicious_rate * mileage_column * 10
+            for i in np.flatnonzero(charge_column > threshold).tolist():
+                results[rows[i]].append(
+                    self._suspicious_charge_anomaly(
+                        pairs[rows[i]][0]["total_charge"], float(threshold[i])
+                    )
+                )
+
+        return results
+
+    def _audit(
+        self, invoice_data: dict[str, Any], shipment_data: dict[str, Any]
+    ) -> list[dict[str, Any]]:
+        """Audit one invoice without logging, shared by audit() and batch audits."""
         # Validation: Check required fields
+        anomalies = self._check_required_fields(invoice_data, shipment_data)
+
+        # If critical fields are missing, return early
+        if anomalies:
+            return anomalies
+
+        # Check 1: Rate Overage
+        rate_anomalies = self._check_rate_overage(invoice_data, shipment_data)
+        anomalies.extend(rate_anomalies)
+
+        # Check 2: Carrier Mismatch
+        carrier_anomalies = self._check_carrier_match(invoice_data)
+        anomalies.extend(carrier_anomalies)
+
+        # Check 3: Additional validations
+        additional_anomalies = self._check_additional_rules(invoice_data, shipment_data)
+        anomalies.extend(additional_anomalies)
+
+        return anomalies
+
+    def _check_required_fields(
+        self, invoice_data: dict[str, Any], shipment_data: dict[str, Any]
+    ) -> list[dict[str, Any]]:
+        """
+        Check that the fields every other check relies on are present.
+        """
+        anomalies: list[dict[str, Any]] = []
         required_invoice_fields = ["carrier_name", "total_charge"]
         required_shipment_fields = ["mileage"]
 
@@ -85,23 +296,6 @@ class AuditEngine:
                     }
                 )
 
-        # If critical fields are missing, return early
-        if anomalies:
-            return anomalies
-
-        # Check 1: Rate Overage
-        rate_anomalies = self._check_rate_overage(invoice_data, shipment_data)
-        anomalies.extend(rate_anomalies)
-
-        # Check 2: Carrier Mismatch
-        carrier_anomalies = self._check_carrier_match(invoice_data)
-        anomalies.extend(carrier_anomalies)
-
-        # Check 3: Additional validations
-        additional_anomalies = self._check_additional_rules(invoice_data, shipment_data)
-        anomalies.extend(additional_anomalies)
-
-        logger.info(f"Audit complete: found {len(anomalies)} anomalies")
         return anomalies
 
     def _check_rate_overage(
@@ -114,31 +308,25 @@ class AuditEngine:
 
         total_charge = invoice_data.get("total_charge")
         mileage = shipment_data.get("mileage")
-        max_rate = self.contract_rules.get("max_rate_per_mile")
+        max_rate = self._max_rate
 
-        if not all([total_charge, mileage, max_rate]):
+        if not all([total_charge, mileage, self.contract_rules.get("max_rate_per_mile")]):
             return anomalies
 
-        # Ensure numeric types
+        # Ensure numeric types (the contracted rate was converted up front)
         try:
             total_charge = float(total_charge)
             mileage = float(mileage)
-            max_rate = float(max_rate)
+            numeric = max_rate is not None
         except (ValueError, TypeError):
+            numeric = False
+
+        if not numeric:
             logger.error("Invalid numeric values for rate calculation")
             return anomalies
 
         if mileage <= 0:
-            anomalies.append(
-                {
-                    "type": "INVALID_DATA",
-                    "severity": "HIGH",
-                    "detail": "Mileage must be greater than zero",
-                    "field": "mileage",
-                    "expected": "> 0",
-                    "actual": mileage,
-                }
-            )
+            anomalies.append(self._invalid_mileage_anomaly(mileage))
             return anomalies
 
         # Calculate actual rate per mile
@@ -149,22 +337,51 @@ class AuditEngine:
             overage_percent = ((actual_rate - max_rate) / max_rate) * 100
 
             anomalies.append(
-                {
-                    "type": "RATE_OVERAGE",
-                    "severity": "HIGH" if overage_percent > 10 else "MEDIUM",
-                    "detail": (
-                        f"Calculated rate ${actual_rate:.2f}/mi exceeds "
-                        f"contracted ${max_rate:.2f}/mi by ${overage_amount:.2f} "
-                        f"({overage_percent:.1f}% over)"
-                    ),
-                    "field": "total_charge",
-                    "expected": max_rate * mileage,
-                    "actual": total_charge,
-                }
+                self._rate_overage_anomaly(
+                    total_charge,
+                    actual_rate,
+                    max_rate,
+                    overage_amount,
+                    overage_percent,
+                    max_rate * mileage,
+                )
             )
 
         return anomalies
 
+    @staticmethod
+    def _invalid_mileage_anomaly(mileage: float) -> dict[str, Any]:
+        return {
+            "type": "INVALID_DATA",
+            "severity": "HIGH",
+            "detail": "Mileage must be greater than zero",
+            "field": "mileage",
+            "expected": "> 0",
+            "actual": mileage,
+        }
+
+    @staticmethod
+    def _rate_overage_anomaly(
+        total_charge: float,
+        actual_rate: float,
+        max_rate: float,
+        overage_amount: float,
+        overage_percent: float,
+        expected: float,
+    ) -> dict[str, Any]:
+        return {
+            "type": "RATE_OVERAGE",
+            "severity": "HIGH" if overage_percent > 10 else "MEDIUM",
+            "detail": (
+                f"Calculated rate ${actual_rate:.2f}/mi exceeds "
+                f"contracted ${max_rate:.2f}/mi by ${overage_amount:.2f} "
+                f"({overage_percent:.1f}% over)"
+            ),
+            "field": "total_charge",
+            "expected": expected,
+            "actual": total_charge,
+        }
+
     def _check_carrier_match(self, invoice_data: dict[str, Any]) -> list[dict[str, Any]]:
         """
         Check if the carrier name on the invoice matches the contracted carrier.
@@ -174,16 +391,16 @@ class AuditEngine:
 
         invoice_carrier = invoice_data.get("carrier_name")
         contract_carrier = self.contract_rules.get("carrier_name")
+        contract_carrier_norm = self._contract_carrier_norm
 
-        if not invoice_carrier or not contract_carrier:
+        if not invoice_carrier or contract_carrier_norm is None:
             return anomalies
 
         # Normalize for comparison
         invoice_carrier_norm = str(invoice_carrier).upper().strip()
-        contract_carrier_norm = str(contract_carrier).upper().strip()
 
         # Calculate similarity
-        similarity = SequenceMatcher(None, invoice_carrier_norm, contract_carrier_norm).ratio()
+        similarity = carrier_similarity(invoice_carrier_norm, contract_carrier_norm)
 
         if similarity < self.min_similarity:
             anomalies.append(
@@ -216,40 +433,40 @@ class AuditEngine:
         if total_charge is not None:
             try:
                 if float(total_charge) <= 0:
-                    anomalies.append(
-                        {
-                            "type": "INVALID_CHARGE",
-                            "severity": "HIGH",
-                            "detail": f"Total charge ${total_charge} must be positive",
-                            "field": "total_charge",
-                            "expected": "> 0",
-                            "actual": total_charge,
-                        }
-                    )
+                    anomalies.append(self._invalid_charge_anomaly(total_charge))
             except (ValueError, TypeError):
                 pass
 
         # Check for unreasonably high charges (10x the expected rate)
-        if total_charge and shipment_data.get("mileage"):
+        if total_charge and shipment_data.get("mileage") and self._suspicious_rate is not None:
             try:
-                max_rate = self.contract_rules.get("max_rate_per_mile", 10.0)
-                threshold = float(max_rate) * float(shipment_data["mileage"]) * 10
+                threshold = self._suspicious_rate * float(shipment_data["mileage"]) * 10
 
                 if float(total_charge) > threshold:
-                    anomalies.append(
-                        {
-                            "type": "SUSPICIOUS_CHARGE",
-                            "severity": "MEDIUM",
-                            "detail": (
-                                f"Total charge ${total_charge} is unusually high "
-                                f"(exceeds 10x expected rate)"
-                            ),
-                            "field": "total_charge",
-                            "expected": f"< ${threshold:.2f}",
-                            "actual": total_charge,
-                        }
-                    )
+                    anomalies.append(self._suspicious_charge_anomaly(total_charge, threshold))
             except (ValueError, TypeError):
                 pass
 
         return anomalies
+
+    @staticmethod
+    def _invalid_charge_anomaly(total_charge: Any) -> dict[str, Any]:
+        return {
+            "type": "INVALID_CHARGE",
+            "severity": "HIGH",
+            "detail": f"Total charge ${total_charge} must be positive",
+            "field": "total_charge",
+            "expected": "> 0",
+            "actual": total_charge,
+        }
+
+    @staticmethod
+    def _suspicious_charge_anomaly(total_charge: Any, threshold: float) -> dict[str, Any]:
+        return {
+            "type": "SUSPICIOUS_CHARGE",
+            "severity": "MEDIUM",
+            "detail": f"Total charge ${total_charge} is unusually high (exceeds 10x expected rate)",
+            "field": "total_charge",
+            "expected": f"< ${threshold:.2f}",
+            "actual": total_charge,
+        }
@@ -0,0 +1,313 @@
+"""Bulk ingestion of invoice PDFs uploaded directly or inside ZIP archives."""
+
+import asyncio
+import logging
+import zipfile
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from functools import partial
+from typing import Any
+from uuid import UUID
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import invoice_crud
+from app.document_processor import DocumentProcessor
+from app.extraction_executor import ExtractionExecutor
+from app.jobs import INVOICE_STATUS_EXTRACTED, invoice_fields_from_extraction
+from app.schemas import BulkUploadItem, BulkUploadResponse
+from app.security import validate_file_upload
+from app.uploads import (
+    ReceivedUpload,
+    UploadTooLargeError,
+    extract_upload,
+    read_stream,
+    read_upload,
+)
+
+logger = logging.getLogger(__name__)
+
+BULK_STATUS_CREATED = "created"
+BULK_STATUS_DUPLICATE = "duplicate"
+BULK_STATUS_REJECTED = "rejected"
+BULK_STATUS_FAILED = "failed"
+
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+
+@dataclass
+class BulkEntry:
+    """One PDF of a bulk upload; ``load`` is None when the entry was rejected up front."""
+
+    filename: str
+    load: Callable[[], Awaitable[ReceivedUpload]] | None
+    detail: str | None = None
+
+
+def _size_error(max_size: int) -> str:
+    return UploadTooLargeError(max_size).detail
+
+
+def _read_zip_entry(
+    archive: zipfile.ZipFile, info: zipfile.ZipInfo, max_size: int
+) -> ReceivedUpload:
+    # The declared size was checked, but may not match the data
+    with archive.open(info) as entry:
+        return read_stream(entry, max_size)
+
+
+async def _load_zip_entry(
+    archive: zipfile.ZipFile, info: zipfile.ZipInfo, max_size: int
+) -> ReceivedUpload:
+    return await run_in_threadpool(_read_zip_entry, archive, info, max_size)
+
+
+def is_zip_upload(file: UploadFile) -> bool:
+    """Whether an uploaded file is a ZIP archive of PDFs."""
+    return bool(file.filename and file.filename.lower().endswith(".zip")) or (
+        file.content_type in ZIP_CONTENT_TYPES
+    )
+
+
+def collect_bulk_entries(files: list[UploadFile], max_size: int, max_files: int) -> list[BulkEntry]:
+    """
+    List the PDFs of a bulk upload, expanding ZIP archives.
+
+    Files are not read yet. Entries that are not PDFs or are too large are
+    kept as rejected entries so that they appear in the manifest.
+    """
+    entries: list[BulkEntry] = []
+
+    for file in files:
+        filename = file.filename or "unnamed"
+
+        if is_zip_upload(file):
+            try:
+                archive = zipfile.ZipFile(file.file)
+            except zipfile.BadZipFile:
+                entries.append(BulkEntry(filename, None, "Invalid ZIP archive"))
+                continue
+
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                entry_name = f"{filename}/{info.filename}"
+                if not info.filename.lower().endswith(".pdf"):
+                    entries.append(BulkEntry(entry_name, None, "File must be a PDF"))
+                elif info.file_size > max_size:
+                    entries.append(BulkEntry(entry_name, None, _size_error(max_size)))
+                else:
+                    entries.append(
+                        BulkEntry(entry_name, partial(_load_zip_entry, archive, info, max_size))
+                    )
+            continue
+
+        try:
+            validate_file_upload(file.filename, file.content_type, max_size)
+        except HTTPException as e:
+            entries.append(BulkEntry(filename, None, str(e.detail)))
+            continue
+        entries.append(BulkEntry(filename, partial(read_upload, file, max_size)))
+
+    if len(entries) > max_files:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Bulk upload contains {len(entries)} files, the maximum is {max_files}",
+        )
+
+    return entries
+
+
+async def _insert_batch(
+    db: AsyncSession, rows: list[tuple[int, dict[str, Any]]], items: list[BulkUploadItem]
+) -> None:
+    """Insert extracted invoices in one transaction, recording each outcome in ``items``."""
+    existing = await invoice_crud.get_existing_invoice_numbers(
+        db, [row["invoice_number"] for _, row in rows]
+    )
+    uploaded_files = await invoice_crud.get_invoice_numbers_by_duplicate_hash(
+        db, [row["duplicate_hash"] for _, row in rows]
+    )
+
+    new_rows = []
+    for index, row in rows:
+        if row["duplicate_hash"] in uploaded_files:
+            items[index] = BulkUploadItem(
+                filename=items[index].filename,
+                status=BULK_STATUS_DUPLICATE,
+                invoice_number=row["invoice_number"],
+                detail=(
+                    "This file was already uploaded as invoice "
+                    f"{uploaded_files[row['duplicate_hash']]}"
+                ),
+            )
+        elif row["invoice_number"] in existing:
+            items[index] = BulkUploadItem(
+                filename=items[index].filename,
+                status=BULK_STATUS_DUPLICATE,
+                invoice_number=row["invoice_number"],
+                detail="Invoice with this number already exists",
+            )
+        else:
+            new_rows.append((index, row))
+
+    if not new_rows:
+        return
+
+    try:
+        invoices = await invoice_crud.create_many(db, [row for _, row in new_rows])
+    except IntegrityError:
+        # A concurrent upload took one of the numbers; find it row by row
+        await db.rollback()
+        for index, row in new_rows:
+            try:
+                invoice = await invoice_crud.create(db, row)
+            except IntegrityError:
+                await db.rollback()
+                items[index] = BulkUploadItem(
+                    filename=items[index].filename,
+                    status=BULK_STATUS_DUPLICATE,
+                    invoice_number=row["invoice_number"],
+                    detail="Invoice with this number already exists",
+                )
+                continue
+            items[index] = BulkUploadItem(
+                filename=items[index].filename,
+                status=BULK_STATUS_CREATED,
+                invoice_id=invoice.id,
+                invoice_number=invoice.invoice_number,
+            )
+        return
+
+    for (index, _), invoice in zip(new_rows, invoices, strict=True):
+        items[index] = BulkUploadItem(
+            filename=items[index].filename,
+            status=BULK_STATUS_CREATED,
+            invoice_id=invoice.id,
+            invoice_number=invoice.invoice_number,
+        )
+
+
+async def ingest_bulk_upload(
+    db: AsyncSession,
+    client_id: UUID,
+    entries: list[BulkEntry],
+    processor: DocumentProcessor,
+    executor: ExtractionExecutor,
+    batch_size: int,
+) -> BulkUploadResponse:
+    """
+    Extract and store the invoices of a bulk upload.
+
+    PDFs are extracted concurrently, at most one per executor worker so the
+    executor's queue stays free for interactive uploads, waiting rather than
+    failing when the executor is busy. Extracted invoices are inserted
+    ``batch_size`` rows per transaction as results arrive. Files or invoice
+    numbers already stored or repeated within the upload are reported as
+    duplicates; files are checked before extraction, so they are not
+    extracted again.
+    """
+    # Entries start out with their rejection (if any) until their outcome is known
+    items = [
+        BulkUploadItem(filename=entry.filename, status=BULK_STATUS_REJECTED, detail=entry.detail)
+        for entry in entries
+    ]
+    semaphore = asyncio.Semaphore(executor.max_concurrency)
+    seen_hashes: set[str] = set()
+    # The session is shared by the extraction tasks and the inserts below
+    db_lock = asyncio.Lock()
+
+    async def extract(index: int, entry: BulkEntry) -> tuple[int, dict[str, Any] | None, str]:
+        """Return the entry's extracted data and SHA-256, or None and the item to report."""
+        async with semaphore:
+            try:
+                upload = await entry.load()
+                if upload.sha256 in seen_hashes:
+                    items[index] = BulkUploadItem(
+                        filename=entry.filename,
+                        status=BULK_STATUS_DUPLICATE,
+                        detail="File repeated within this upload",
+                    )
+                    return index, None, ""
+                seen_hashes.add(upload.sha256)
+                async with db_lock:
+                    existing_invoice = await invoice_crud.get_by_duplicate_hash(db, upload.sha256)
+                if existing_invoice:
+                    items[index] = BulkUploadItem(
+                        filename=entry.filename,
+                        status=BULK_STATUS_DUPLICATE,
+                        invoice_number=existing_invoice.invoice_number,
+                        detail=(
+                            "This file was already uploaded as invoice "
+                            f"{existing_invoice.invoice_number}"
+                        ),
+                    )
+                    return index, None, ""
+                extracted_data = await executor.run_when_available(
+                    extract_upload, processor, upload
+                )
+                return index, extracted_data, upload.sha256
+            except UploadTooLargeError as e:
+                items[index] = BulkUploadItem(
+                    filename=entry.filename, status=BULK_STATUS_REJECTED, detail=e.detail
+                )
+            except Exception as e:
+                logger.error(f"Bulk extraction failed for {entry.filename}: {e}", exc_info=True)
+                items[index] = BulkUploadItem(
+                    filename=entry.filename, status=BULK_STATUS_FAILED, detail=str(e)
+                )
+            return index, None, ""
+
+    tasks = [
+        asyncio.create_task(extract(index, entry))
+        for index, entry in enumerate(entries)
+        if entry.load is not None
+    ]
+
+    seen_numbers: set[str] = set()
+    pending_rows: list[tuple[int, dict[str, Any]]] = []
+
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            index, extracted_data, sha256 = await next_result
+            if extracted_data is None:
+                continue
+            filename = entries[index].filename
+
+            row = {
+                "client_id": client_id,
+                "currency": "USD",
+                "status": INVOICE_STATUS_EXTRACTED,
+                "duplicate_hash": sha256,
+                **invoice_fields_from_extraction(extracted_data, filename),
+            }
+            if row["invoice_number"] in seen_numbers:
+                items[index] = BulkUploadItem(
+                    filename=filename,
+                    status=BULK_STATUS_DUPLICATE,
+                    invoice_number=row["invoice_number"],
+                    detail="Invoice number repeated within this upload",
+                )
+                continue
+            seen_numbers.add(row["invoice_number"])
+
+            pending_rows.append((index, row))
+            if len(pending_rows) >= max(1, batch_size):
+                async with db_lock:
+                    await _insert_batch(db, pending_rows, items)
+                pending_rows = []
+
+        if pending_rows:
+            async with db_lock:
+                await _insert_batch(db, pending_rows, items)
+    finally:
+        # Stop extracting the rest if storing results failed or the request was cancelled
+        for task in tasks:
+            task.cancel()
+
+    created = sum(item.status == BULK_STATUS_CREATED for item in items)
+    logger.info(f"Bulk upload for client {client_id}: {created} of {len(entries)} files created")
+    return BulkUploadResponse(total=len(entries), created=created, items=items)
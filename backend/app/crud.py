@@ -31,6 +31,18 @@ class CRUDBase(Generic[ModelType]):
         await db.refresh(db_obj)
         return db_obj
 
+    async def create_many(self, db: AsyncSession, objs_in: list[dict[str, Any]]) -> list[ModelType]:
+        """
+        Create several objects in a single transaction.
+
+        Objects are not refreshed after the commit, so values generated by
+        the database rather than by column defaults are not loaded.
+        """
+        db_objs = [self.model(**obj_in) for obj_in in objs_in]
+        db.add_all(db_objs)
+        await db.commit()
+        return db_objs
+
     async def get(self, db: AsyncSession, id: UUID) -> ModelType | None:
         """Get object by id."""
         return await db.get(self.model, id)
@@ -83,6 +95,34 @@ class CRUDInvoice(CRUDBase[Invoice]):
         result = await db.execute(query)
         return result.scalar_one_or_none()
 
+    async def get_by_duplicate_hash(self, db: AsyncSession, duplicate_hash: str) -> Invoice | None:
+        """Get the first invoice uploaded from a file with this SHA-256 hash."""
+        query = select(Invoice).where(Invoice.duplicate_hash == duplicate_hash).limit(1)
+        result = await db.execute(query)
+        return result.scalar_one_or_none()
+
+    async def get_invoice_numbers_by_duplicate_hash(
+        self, db: AsyncSession, duplicate_hashes: list[str]
+    ) -> dict[str, str]:
+        """Map each of the given SHA-256 hashes already uploaded to an invoice number."""
+        if not duplicate_hashes:
+            return {}
+        query = select(Invoice.duplicate_hash, Invoice.invoice_number).where(
+            Invoice.duplicate_hash.in_(duplicate_hashes)
+        )
+        result = await db.execute(query)
+        return dict(result.all())
+
+    async def get_existing_invoice_numbers(
+        self, db: AsyncSession, invoice_numbers: list[str]
+    ) -> set[str]:
+        """Return which of the given invoice numbers are already taken."""
+        if not invoice_numbers:
+            return set()
+        query = select(Invoice.invoice_number).where(Invoice.invoice_number.in_(invoice_numbers))
+        result = await db.execute(query)
+        return set(result.scalars().all())
+
     async def get_by_client_id(
         self,
         db: AsyncSession,
@@ -0,0 +1,78 @@
+"""Application-scoped dependencies shared across requests."""
+
+from fastapi import Request
+
+from app.document_processor import DocumentProcessor
+from app.extraction_cache import get_extraction_cache
+from app.extraction_executor import ExtractionExecutor
+from app.field_extractors import get_field_extractors
+from app.layout_templates import get_layout_templates
+from app.ocr_cache import OcrPageCacheConfig
+from app.settings import Settings, settings
+
+
+def create_document_processor(config: Settings = settings) -> DocumentProcessor:
+    """Create a DocumentProcessor configured from settings."""
+    return DocumentProcessor(
+        ocr_workers=config.ocr_workers,
+        render_backend=config.ocr_render_backend,
+        preprocess_profile=config.ocr_preprocess_profile,
+        ocr_min_dpi=config.ocr_min_dpi,
+        ocr_max_dpi=config.ocr_max_dpi,
+        cache=get_extraction_cache(),
+        layout_templates=get_layout_templates(),
+        ocr_engine=config.ocr_engine,
+        accurate_fallback=config.extraction_accurate_fallback,
+        low_confidence_threshold=config.extraction_low_confidence_threshold,
+        field_extractors=get_field_extractors(),
+        early_page_termination=config.extraction_early_page_termination,
+        required_fields=config.extraction_required_fields,
+        ocr_page_cache=create_ocr_page_cache_config(config),
+    )
+
+
+def create_ocr_page_cache_config(config: Settings = settings) -> OcrPageCacheConfig | None:
+    """Create the OCR page cache configuration from settings, or None when disabled."""
+    if config.ocr_page_cache_entries <= 0:
+        return None
+    return OcrPageCacheConfig(
+        max_entries=config.ocr_page_cache_entries,
+        directory=config.ocr_page_cache_dir,
+        max_disk_entries=config.ocr_page_cache_max_disk_entries,
+    )
+
+
+def create_extraction_executor(config: Settings = settings) -> ExtractionExecutor:
+    """Create the bounded executor that runs extraction off the event loop."""
+    return ExtractionExecutor(
+        max_concurrency=config.extraction_max_concurrency,
+        max_queue=config.extraction_max_queue,
+    )
+
+
+async def get_document_processor(request: Request) -> DocumentProcessor:
+    """
+    Get the application's shared DocumentProcessor.
+
+    The processor is created once in the application lifespan. It is created
+    lazily here when the lifespan has not run (e.g. a TestClient used without
+    a context manager).
+    """
+    processor = getattr(request.app.state, "document_processor", None)
+    if processor is None:
+        processor = create_document_processor()
+        request.app.state.document_processor = processor
+    return processor
+
+
+async def get_extraction_executor(request: Request) -> ExtractionExecutor:
+    """
+    Get the application's shared extraction executor.
+
+    Created lazily when the lifespan has not run, like get_document_processor.
+    """
+    executor = getattr(request.app.state, "extraction_executor", None)
+    if executor is None:
+        executor = create_extraction_executor()
+        request.app.state.extraction_executor = executor
+    return executor
@@ -1,52 +1,285 @@
+import hashlib
 import logging
+import math
+import multiprocessing
 import re
+import threading
+from bisect import bisect_right
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from datetime import datetime
+from itertools import accumulate
 from pathlib import Path
 from typing import Any
 
 import cv2
 import fitz  # PyMuPDF
 import numpy as np
-import pytesseract
-from pdf2image import convert_from_path
+from pdf2image import (
+    convert_from_bytes,
+    convert_from_path,
+    pdfinfo_from_bytes,
+    pdfinfo_from_path,
+)
 from PIL import Image
 
+from app.extraction_cache import ExtractionCache, build_cache_key
+from app.field_confidence import (
+    HIGH_CONFIDENCE,
+    LOW_CONFIDENCE,
+    MISSING_FIELD,
+    FieldConfidence,
+    document_confidence,
+    score_field,
+)
+from app.field_extractors import (
+    CORE_FIELDS,
+    FIELD_PATTERN_FLAGS,
+    FieldExtractorRegistry,
+    extract_line_items,
+)
+from app.layout_templates import LayoutTemplateRegistry, crop_regions
+from app.ocr_cache import OcrPageCacheConfig, get_ocr_page_cache, page_cache_key
+from app.ocr_engines import OcrText, image_to_string, resolve_ocr_engine, word_confidences_of
+from app.text_quality import score_text_quality
+
 logger = logging.getLogger(__name__)
 
+# Bump whenever a change to the pipeline alters extraction results, so cached
+# results from older versions are no longer served
+EXTRACTOR_VERSION = "5"
+
+# Pages are rasterized for OCR at the lowest resolution in this range that
+# keeps their text legible to Tesseract
+OCR_MIN_DPI = 150
+OCR_MAX_DPI = 300
+
+# Font size in pixels (roughly 20 px capital letters) at which Tesseract
+# accuracy levels off; rendering larger only adds work
+OCR_TARGET_FONT_PX = 30
+RENDER_BACKENDS = ("pymupdf", "pdf2image")
+
+# "fast" cleans up speckle with a median filter, "quality" runs non-local means
+# denoising, and "auto" picks one per page from the amount of speckle
+PREPROCESS_PROFILES = ("auto", "fast", "quality")
+
+# Share of dark pixels with no dark neighbour above which "auto" treats a page
+# as noisy (scanned/faxed) and uses the "quality" profile
+SPECKLE_RATIO_THRESHOLD = 0.02
+
+PageImage = Image.Image | np.ndarray
+
+# A PDF given either as a filesystem path or as its raw bytes
+PdfSource = str | bytes
+
+# PyMuPDF does not support use from several threads at once, while documents
+# are extracted concurrently on the extraction executor's threads. Every call
+# into PyMuPDF (including loading pages and closing documents) holds this
+# lock; OCR and field matching run outside it.
+FITZ_LOCK = threading.RLock()
+
+
+@contextmanager
+def _closing_document(doc: fitz.Document) -> Iterator[fitz.Document]:
+    """Use an open PyMuPDF document, closing it under FITZ_LOCK."""
+    try:
+        yield doc
+    finally:
+        with FITZ_LOCK:
+            doc.close()
+
+
+def _page_count(doc: fitz.Document) -> int:
+    with FITZ_LOCK:
+        return doc.page_count
+
+
+def _poppler_page_count(source: PdfSource) -> int:
+    """Count a PDF's pages with poppler, for documents PyMuPDF cannot open."""
+    info = pdfinfo_from_bytes(source) if isinstance(source, bytes) else pdfinfo_from_path(source)
+    return int(info["Pages"])
+
+
+@dataclass(frozen=True)
+class OcrOptions:
+    """How pages are OCR'd; sent along with each page to OCR workers."""
+
+    preprocess_profile: str = "auto"
+    engine: str = "pytesseract"
+    page_cache: OcrPageCacheConfig | None = None
+
+
+def _ocr_page(image: PageImage, options: OcrOptions) -> OcrText:
+    """
+    Preprocess and OCR a single rendered page.
+
+    Module-level so it can be pickled and dispatched to OCR worker processes.
+    Pages whose rendered bitmap was OCR'd before are answered from the page
+    cache, skipping both preprocessing and OCR.
+    """
+    cache = key = None
+    if options.page_cache is not None:
+        cache = get_ocr_page_cache(options.page_cache)
+        key = page_cache_key(image, options.preprocess_profile, options.engine)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    processed_image = DocumentProcessor._preprocess_image(image, options.preprocess_profile)
+    text = image_to_string(processed_image, options.engine)
+    if cache is not None:
+        cache.set(key, text)
+    return text
+
+
+def _as_page_text(ocr_text: str) -> OcrText:
+    """End an OCR'd page's text with a newline like direct text, keeping word confidences."""
+    return OcrText(f"{ocr_text}\n", word_confidences_of(ocr_text))
+
+
+# Invoice boundaries in multi-invoice PDFs: a page opening with a "FREIGHT
+# INVOICE" header, or labelled with an invoice number (which must contain a
+# digit, so header text such as "Invoice From" is not mistaken for one)
+FREIGHT_INVOICE_HEADER = re.compile(r"\A\s*freight\s+invoice\b", FIELD_PATTERN_FLAGS)
+INVOICE_NUMBER_LABEL = re.compile(
+    r"\binvoice\s*(?:#|no\.?|number)?[:\s]*([A-Z0-9\-]*\d[A-Z0-9\-]*)", FIELD_PATTERN_FLAGS
+)
+
 
 class DocumentProcessor:
     """
     Processes freight invoice PDFs to extract structured data.
     Uses hybrid approach: direct text extraction with OCR fallback.
+
+    Instances hold only immutable configuration plus thread-safe shared
+    resources (compiled patterns, cache, OCR worker pool), so one processor
+    can serve concurrent requests. Call close() to release the worker pool.
     """
 
-    def __init__(self) -> None:
-        self.field_patterns = {
-            "carrier_name": [
-                r"carrier[:\s]+([A-Z][A-Z\s&]+(?:EXPRESS|FREIGHT|LOGISTICS|LINES|INC|LLC)?)",
-                r"from[:\s]+([A-Z][A-Z\s&]+(?:EXPRESS|FREIGHT|LOGISTICS|LINES|INC|LLC)?)",
-                r"([A-Z][A-Z\s&]{10,}(?:EXPRESS|FREIGHT|LOGISTICS|LINES))",
-            ],
-            "invoice_number": [
-                r"invoice\s*#?[:\s]*([A-Z0-9\-]+)",
-                r"inv(?:oice)?\.?\s*#?[:\s]*([A-Z0-9\-]+)",
-            ],
-            "invoice_date": [
-                r"invoice\s*date[:\s]+([\d]{1,2}[\/\-][\d]{1,2}[\/\-][\d]{2,4})",
-                r"date[:\s]+([\d]{1,2}[\/\-][\d]{1,2}[\/\-][\d]{2,4})",
-                r"([\d]{1,2}[\/\-][\d]{1,2}[\/\-][\d]{4})",
-            ],
-            "total_charge": [
-                r"total[:\s]+\$?\s*([\d,]+\.?\d{0,2})",
-                r"amount\s*due[:\s]+\$?\s*([\d,]+\.?\d{0,2})",
-                r"balance[:\s]+\$?\s*([\d,]+\.?\d{0,2})",
-            ],
-            "shipment_reference": [
-                r"pro\s*#?[:\s]*([A-Z0-9\-]+)",
-                r"ref(?:erence)?[:\s]*([A-Z0-9\-]+)",
-                r"shipment[:\s]*([A-Z0-9\-]+)",
-            ],
-        }
+    def __init__(
+        self,
+        ocr_workers: int = 1,
+        ocr_window: int | None = None,
+        render_backend: str = "pymupdf",
+        cache: ExtractionCache | None = None,
+        preprocess_profile: str = "auto",
+        ocr_min_dpi: int = OCR_MIN_DPI,
+        ocr_max_dpi: int = OCR_MAX_DPI,
+        layout_templates: LayoutTemplateRegistry | None = None,
+        ocr_engine: str = "auto",
+        accurate_fallback: bool = False,
+        low_confidence_threshold: float = LOW_CONFIDENCE,
+        field_extractors: FieldExtractorRegistry | None = None,
+        early_page_termination: bool = False,
+        required_fields: Iterable[str] = CORE_FIELDS,
+        ocr_page_cache: OcrPageCacheConfig | None = None,
+    ) -> None:
+        """
+        Initialize the document processor.
+
+        Args:
+            ocr_workers: Number of worker processes used to OCR pages in
+                parallel. A value of 1 keeps OCR serial in the calling process.
+            ocr_window: Maximum number of rendered pages held in memory while
+                OCR is in flight. Defaults to twice the number of workers.
+            render_backend: How pages are rasterized for OCR. "pymupdf" renders
+                pixmaps from the open document in-process; "pdf2image" shells
+                out to poppler's pdftoppm.
+            cache: Optional content-addressed store of extraction results.
+                Documents seen before are answered without re-extraction.
+            preprocess_profile: Image cleanup applied before OCR. "fast" uses
+                a median filter, "quality" non-local means denoising, and
+                "auto" chooses per page based on how noisy it looks.
+            ocr_min_dpi: Lowest resolution pages are rasterized at for OCR.
+            ocr_max_dpi: Highest resolution pages are rasterized at for OCR,
+                used when a page gives no hint of its text size and to
+                retry pages whose OCR text yielded no fields.
+            layout_templates: Optional registry of known invoice layouts.
+                Pages matching a template only have its regions OCR'd.
+            ocr_engine: "tesserocr" keeps a Tesseract engine loaded per
+                thread, "pytesseract" runs the tesseract CLI per page, and
+                "auto" uses tesserocr when it is installed.
+            accurate_fallback: Whether documents whose extraction confidence
+                is below ``low_confidence_threshold`` are re-read by OCR of
+                every page at full resolution with "quality" preprocessing.
+            low_confidence_threshold: Document confidence (0-1) below which
+                the accurate fallback runs.
+            field_extractors: Registry of field patterns, including
+                carrier-specific pattern sets. Defaults to the generic
+                patterns only.
+            early_page_termination: Whether direct text is read page by page,
+                stopping at the first page by which every one of
+                ``required_fields`` has been found with high confidence.
+                Later pages are then neither read nor OCR'd.
+            required_fields: Fields that must be found before reading stops.
+            ocr_page_cache: Optional cache of OCR output keyed by the hash of
+                each rendered page (or layout region) bitmap, so boilerplate
+                pages repeated across invoices are OCR'd once. Each OCR
+                process keeps its own in-memory tier; the disk tier is shared.
+        """
+        if render_backend not in RENDER_BACKENDS:
+            raise ValueError(
+                f"Unknown render backend '{render_backend}'. "
+                f"Expected one of: {', '.join(RENDER_BACKENDS)}"
+            )
+        if preprocess_profile not in PREPROCESS_PROFILES:
+            raise ValueError(
+                f"Unknown preprocess profile '{preprocess_profile}'. "
+                f"Expected one of: {', '.join(PREPROCESS_PROFILES)}"
+            )
+
+        self.ocr_workers = max(1, ocr_workers)
+        self.ocr_window = max(1, ocr_window or self.ocr_workers * 2)
+        self.render_backend = render_backend
+        self.ocr_options = OcrOptions(
+            preprocess_profile=preprocess_profile,
+            engine=resolve_ocr_engine(ocr_engine),
+            page_cache=ocr_page_cache,
+        )
+        self.ocr_max_dpi = max(1, ocr_max_dpi)
+        self.ocr_min_dpi = min(max(1, ocr_min_dpi), self.ocr_max_dpi)
+        self.cache = cache
+        self.layout_templates = layout_templates
+        self.accurate_fallback = accurate_fallback
+        self.low_confidence_threshold = low_confidence_threshold
+        self._ocr_pool: ProcessPoolExecutor | None = None
+        self._ocr_pool_lock = threading.Lock()
+        # Whether OCR failed during the extraction running on this thread
+        self._ocr_state = threading.local()
+        self.field_extractors = field_extractors or FieldExtractorRegistry()
+        self.field_patterns = self.field_extractors.field_patterns()
+        self.pattern_engine = self.field_extractors.pattern_engine()
+        self.early_page_termination = early_page_termination
+        self.required_fields = tuple(required_fields)
+
+    def __enter__(self) -> "DocumentProcessor":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the OCR worker pool, if one was started."""
+        with self._ocr_pool_lock:
+            if self._ocr_pool is not None:
+                self._ocr_pool.shutdown()
+                self._ocr_pool = None
+
+    def _get_ocr_pool(self) -> ProcessPoolExecutor:
+        """Return the OCR worker pool, starting it on first use."""
+        with self._ocr_pool_lock:
+            if self._ocr_pool is None:
+                # Started from a worker thread of a multithreaded server: forked
+                # children could inherit locks held by other threads, so workers
+                # come from a clean forkserver process instead
+                self._ocr_pool = ProcessPoolExecutor(
+                    max_workers=self.ocr_workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+            return self._ocr_pool
 
     def process_invoice(self, pdf_file_path: str) -> dict[str, Any]:
         """
@@ -59,80 +292,576 @@ class DocumentProcessor:
             Dictionary containing extracted fields
         """
         logger.info(f"Processing invoice: {pdf_file_path}")
+        return self._process_source(pdf_file_path)
 
-        # Step 1: Try direct text extraction
-        text = self._extract_text_direct(pdf_file_path)
+    def process_invoice_bytes(
+        self, pdf_bytes: bytes, pdf_digest: str | None = None
+    ) -> dict[str, Any]:
+        """
+        Process an invoice PDF held in memory, without writing it to disk.
 
-        # Step 2: Check text quality; use OCR if needed
-        if self._is_text_quality_poor(text):
-            logger.info("Poor text quality detected, falling back to OCR")
-            text = self._extract_text_ocr(pdf_file_path)
+        Args:
+            pdf_bytes: Raw bytes of the PDF invoice
+            pdf_digest: SHA-256 hex digest of ``pdf_bytes`` if already known,
+                e.g. computed while the upload was received
+
+        Returns:
+            Dictionary containing extracted fields
+        """
+        logger.info(f"Processing in-memory invoice ({len(pdf_bytes)} bytes)")
+        return self._process_source(pdf_bytes, pdf_digest)
+
+    def process_invoice_batch(self, pdf_file_path: str) -> Iterator[dict[str, Any]]:
+        """
+        Extract each invoice of a PDF bundling several invoices.
+
+        Args:
+            pdf_file_path: Path to the PDF file
+
+        Yields:
+            Dictionary of extracted fields per invoice, in document order, with
+            the invoice's 1-based "first_page" and "last_page"
+        """
+        logger.info(f"Processing invoice batch: {pdf_file_path}")
+        yield from self._iter_invoices(pdf_file_path)
+
+    def process_invoice_batch_bytes(self, pdf_bytes: bytes) -> Iterator[dict[str, Any]]:
+        """
+        Extract each invoice of an in-memory PDF bundling several invoices.
+
+        Args:
+            pdf_bytes: Raw bytes of the PDF file
+
+        Yields:
+            Dictionary of extracted fields per invoice, as process_invoice_batch
+        """
+        logger.info(f"Processing in-memory invoice batch ({len(pdf_bytes)} bytes)")
+        yield from self._iter_invoices(pdf_bytes)
+
+    def _iter_invoices(self, source: PdfSource) -> Iterator[dict[str, Any]]:
+        """
+        Split a PDF into invoices and extract each one as soon as its last page is read.
+
+        A page starts a new invoice when it carries an invoice number other
+        than the current invoice's, or opens with a "FREIGHT INVOICE" header
+        without repeating the current invoice's number.
+        """
+        doc = self._open_document(source)
+        if doc is None:
+            logger.error("Could not open PDF for batch extraction")
+            return
+
+        with _closing_document(doc):
+            invoice_pages: list[str] = []
+            first_page = 1
+            invoice_number = None
+
+            for page_number, page_text in enumerate(self._iter_page_texts(source, doc), start=1):
+                number_match = INVOICE_NUMBER_LABEL.search(page_text)
+                page_invoice_number = number_match.group(1).upper() if number_match else None
+
+                if invoice_pages:
+                    if page_invoice_number and invoice_number:
+                        starts_invoice = page_invoice_number != invoice_number
+                    else:
+                        starts_invoice = bool(FREIGHT_INVOICE_HEADER.search(page_text))
+
+                    if starts_invoice:
+                        yield self._extract_invoice(invoice_pages, first_page)
+                        invoice_pages = []
+                        first_page = page_number
+                        invoice_number = None
+
+                invoice_pages.append(page_text)
+                invoice_number = invoice_number or page_invoice_number
+
+            if invoice_pages:
+                yield self._extract_invoice(invoice_pages, first_page)
+
+    def _extract_invoice(self, page_texts: list[str], first_page: int) -> dict[str, Any]:
+        """Extract the fields of one invoice of a batch from its pages' text."""
+        extracted_data = self._with_confidence(*self._score_fields(page_texts))
+        extracted_data["first_page"] = first_page
+        extracted_data["last_page"] = first_page + len(page_texts) - 1
+        logger.info(f"Extracted invoice from pages {first_page}-{extracted_data['last_page']}")
+        return extracted_data
+
+    def _iter_page_texts(self, source: PdfSource, doc: fitz.Document) -> Iterator[str]:
+        """
+        Yield the text of each page in order, OCRing pages with poor direct text.
+
+        Pages are read ``ocr_window`` at a time so that OCR of a window's poor
+        pages can run in parallel while memory stays bounded.
+        """
+        page_count = _page_count(doc)
+        for window_start in range(0, page_count, self.ocr_window):
+            page_indices = range(window_start, min(window_start + self.ocr_window, page_count))
+            try:
+                with FITZ_LOCK:
+                    page_texts = [doc[i].get_text() for i in page_indices]
+            except Exception as e:
+                logger.error(f"Direct text extraction failed: {e}")
+                page_texts = [""] * len(page_indices)
+
+            poor_pages = [
+                i
+                for i, page_text in zip(page_indices, page_texts, strict=True)
+                if self._is_text_quality_poor(page_text)
+            ]
+            if poor_pages:
+                ocr_texts = self._extract_pages_ocr(source, poor_pages, doc=doc)
+                for page_index, ocr_text in zip(poor_pages, ocr_texts, strict=False):
+                    page_texts[page_index - window_start] = _as_page_text(ocr_text)
+
+            yield from page_texts
+
+    def _process_source(self, source: PdfSource, pdf_digest: str | None = None) -> dict[str, Any]:
+        """Process a PDF path or buffer, consulting the extraction cache if configured."""
+        if self.cache is None:
+            return self._process_document(source)
+
+        pdf_bytes = source if isinstance(source, bytes) else Path(source).read_bytes()
+        cache_key = self._cache_key(pdf_bytes, pdf_digest)
+        cached_data = self.cache.get(cache_key)
+        if cached_data is not None:
+            logger.info(f"Extraction cache hit: {cached_data}")
+            return cached_data
+
+        self._ocr_state.failed = False
+        extracted_data = self._process_document(source)
+        if self._ocr_state.failed:
+            logger.info("OCR failed, not caching the extraction result")
+        elif all(extracted_data.get(field_name) is None for field_name in CORE_FIELDS):
+            logger.info("No core field found, not caching the extraction result")
+        else:
+            self.cache.set(cache_key, extracted_data)
+        return extracted_data
+
+    def _cache_key(self, pdf_bytes: bytes, pdf_digest: str | None = None) -> str:
+        """Build the extraction cache key for a document's raw bytes (or their known digest)."""
+        extraction_config: dict[str, Any] = {
+            "field_extractors": self.field_extractors.to_config(),
+            "ocr": {
+                "preprocess_profile": self.ocr_options.preprocess_profile,
+                "engine": self.ocr_options.engine,
+                "min_dpi": self.ocr_min_dpi,
+                "max_dpi": self.ocr_max_dpi,
+                "render_backend": self.render_backend,
+            },
+        }
+        if self.layout_templates:
+            extraction_config["layout_templates"] = self.layout_templates.to_config()
+        if self.accurate_fallback:
+            extraction_config["low_confidence_threshold"] = self.low_confidence_threshold
+        if self.early_page_termination:
+            extraction_config["required_fields"] = list(self.required_fields)
+        return build_cache_key(
+            pdf_digest or hashlib.sha256(pdf_bytes).hexdigest(),
+            EXTRACTOR_VERSION,
+            extraction_config,
+        )
 
-        # Step 3: Extract structured fields
-        extracted_data = self._extract_fields(text)
+    def _process_document(self, source: PdfSource) -> dict[str, Any]:
+        """Run the extraction pipeline on a PDF, bypassing the cache."""
+        # Step 1: Try direct text extraction, page by page
+        doc = self._open_document(source)
 
+        # Step 2: Check text quality per page; use OCR only where needed
+        if doc is None:
+            logger.info("Direct text extraction unavailable, falling back to OCR")
+            page_texts = [_as_page_text(ocr_text) for ocr_text in self._extract_pages_ocr(source)]
+
+            # Step 3: Extract structured fields
+            fields, confidences = self._score_fields(page_texts)
+        else:
+            with _closing_document(doc):
+                if self.early_page_termination:
+                    page_texts = self._extract_pages_until_complete(doc)
+                else:
+                    page_texts = self._extract_pages_direct(doc)
+                poor_pages = [
+                    i
+                    for i, page_text in enumerate(page_texts)
+                    if self._is_text_quality_poor(page_text)
+                ]
+                direct_fields = None
+                if poor_pages:
+                    skipped_pages = set(poor_pages)
+                    direct_pages = [
+                        page_text
+                        for i, page_text in enumerate(page_texts)
+                        if i not in skipped_pages
+                    ]
+                    if direct_pages:
+                        direct_fields, confidences = self._score_fields(direct_pages)
+
+                if direct_fields and all(
+                    confidence.score >= HIGH_CONFIDENCE
+                    for confidence in self._core_confidences(confidences)
+                ):
+                    # Pages with poor text (e.g. a scanned delivery receipt) cannot improve
+                    # on fields already found with high confidence
+                    logger.info(
+                        f"All fields extracted with high confidence from direct text, "
+                        f"skipping OCR of {len(poor_pages)} pages"
+                    )
+                    fields = direct_fields
+                    poor_pages = []
+                else:
+                    if poor_pages:
+                        logger.info(
+                            f"Poor text quality detected on {len(poor_pages)} of "
+                            f"{len(page_texts)} pages, falling back to OCR for those pages"
+                        )
+                        # A carrier named on a digital page selects the layout of scanned ones
+                        carrier = direct_fields["carrier_name"] if direct_fields else None
+                        ocr_texts = self._extract_pages_ocr(
+                            source, poor_pages, doc=doc, carrier=carrier
+                        )
+                        for page_index, ocr_text in zip(poor_pages, ocr_texts, strict=False):
+                            page_texts[page_index] = _as_page_text(ocr_text)
+
+                    # Step 3: Extract structured fields
+                    fields, confidences = self._score_fields(page_texts)
+
+                # Step 4: If OCR at reduced resolution or of template regions found
+                # nothing, re-read the whole first OCR'd page at full resolution
+                if (
+                    poor_pages
+                    and all(fields.get(field_name) is None for field_name in CORE_FIELDS)
+                    and (
+                        self.layout_templates
+                        or self._choose_page_ocr_dpi(doc, poor_pages[0]) < self.ocr_max_dpi
+                    )
+                ):
+                    retry_page = poor_pages[0]
+                    logger.info(
+                        f"No fields extracted, retrying page {retry_page + 1} "
+                        f"with OCR at {self.ocr_max_dpi} DPI"
+                    )
+                    retry_texts = self._extract_pages_ocr(
+                        source, [retry_page], doc=doc, dpi=self.ocr_max_dpi, use_layouts=False
+                    )
+                    page_texts[retry_page] = _as_page_text(retry_texts[0])
+                    fields, confidences = self._score_fields(page_texts)
+
+                # Step 5: Send low-confidence documents down the slower, accurate path
+                if (
+                    self.accurate_fallback
+                    and document_confidence(self._core_confidences(confidences))
+                    < self.low_confidence_threshold
+                ):
+                    fields, confidences = self._extract_accurate(source, doc, fields, confidences)
+
+        extracted_data = self._with_confidence(fields, confidences)
         logger.info(f"Extraction complete: {extracted_data}")
         return extracted_data
 
-    def _extract_text_direct(self, pdf_path: str) -> str:
-        """Extract text directly from PDF using PyMuPDF."""
+    def _extract_accurate(
+        self,
+        source: PdfSource,
+        doc: fitz.Document,
+        fields: dict[str, Any],
+        confidences: dict[str, FieldConfidence],
+    ) -> tuple[dict[str, Any], dict[str, FieldConfidence]]:
+        """
+        Re-read every page by OCR at full resolution, with non-local means
+        denoising and without layout templates.
+
+        Each field keeps whichever of its two readings scores higher.
+        """
+        logger.info(
+            f"Extraction confidence below {self.low_confidence_threshold}, "
+            f"re-reading {_page_count(doc)} pages with accurate OCR"
+        )
+        ocr_texts = self._extract_pages_ocr(
+            source,
+            doc=doc,
+            dpi=self.ocr_max_dpi,
+            use_layouts=False,
+            ocr_options=replace(self.ocr_options, preprocess_profile="quality"),
+        )
+        accurate_fields, accurate_confidences = self._score_fields(
+            [_as_page_text(ocr_text) for ocr_text in ocr_texts]
+        )
+
+        fields = dict(fields)
+        confidences = dict(confidences)
+        for field_name, confidence in accurate_confidences.items():
+            if confidence.score > confidences.get(field_name, MISSING_FIELD).score:
+                fields[field_name] = accurate_fields[field_name]
+                confidences[field_name] = confidence
+        for field_name, value in accurate_fields.items():
+            if field_name not in accurate_confidences and not fields.get(field_name):
+                # Line items are not scored; keep the accurate reading if the first found none
+                fields[field_name] = value
+        return fields, confidences
+
+    def _open_document(self, source: PdfSource) -> fitz.Document | None:
+        """Open a PDF path or buffer with PyMuPDF, returning None if it cannot be parsed."""
         try:
-            doc = fitz.open(pdf_path)
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            doc.close()
-            return text
+            with FITZ_LOCK:
+                if isinstance(source, bytes):
+                    return fitz.open(stream=source, filetype="pdf")
+                return fitz.open(source)
+        except Exception as e:
+            logger.error(f"Direct text extraction failed: {e}")
+            return None
+
+    def _extract_pages_direct(self, doc: fitz.Document) -> list[str]:
+        """Extract the text of each page directly from PDF using PyMuPDF."""
+        try:
+            with FITZ_LOCK:
+                return [page.get_text() for page in doc]
+        except Exception as e:
+            logger.error(f"Direct text extraction failed: {e}")
+            return [""] * _page_count(doc)
+
+    def _extract_pages_until_complete(self, doc: fitz.Document) -> list[str]:
+        """
+        Extract the text of pages directly, in order, until the required fields are found.
+
+        Each page is matched on its own as it is read, so the work stays
+        proportional to the pages read. Reading stops after the first page by
+        which every required field has been found with high confidence by the
+        first pattern of its table, as a full read would then pick the same
+        value; pages with poor text are read but cannot complete the fields.
+        A carrier named only on the skipped pages is not detected.
+        """
+        page_texts: list[str] = []
+        missing_fields = set(self.required_fields)
+        page_count = _page_count(doc)
+
+        try:
+            for page_index in range(page_count):
+                with FITZ_LOCK:
+                    page_text = doc[page_index].get_text()
+                page_texts.append(page_text)
+                if self._is_text_quality_poor(page_text):
+                    continue
+
+                _, confidences, first_choice_fields = self._score_field_matches([page_text])
+                missing_fields = {
+                    field_name
+                    for field_name in missing_fields
+                    if field_name not in first_choice_fields
+                    or confidences[field_name].score < HIGH_CONFIDENCE
+                }
+                if not missing_fields:
+                    logger.info(
+                        f"Required fields found by page {page_index + 1} of {page_count}, "
+                        "skipping the remaining pages"
+                    )
+                    break
         except Exception as e:
             logger.error(f"Direct text extraction failed: {e}")
-            return ""
+            return [""] * page_count
+
+        return page_texts
 
     def _is_text_quality_poor(self, text: str) -> bool:
         """
         Heuristic to determine if extracted text quality is poor.
         Checks for minimum length and alphanumeric content.
         """
-        if len(text.strip()) < 50:
-            return True
+        return score_text_quality(text).is_poor
+
+    def _extract_pages_ocr(
+        self,
+        source: PdfSource,
+        page_indices: list[int] | None = None,
+        doc: fitz.Document | None = None,
+        dpi: int | None = None,
+        carrier: str | None = None,
+        use_layouts: bool = True,
+        ocr_options: OcrOptions | None = None,
+    ) -> list[str]:
+        """
+        OCR the given pages (0-based, all pages by default), returning one text per page.
+
+        An already open ``doc`` is reused for page counting and rendering.
+        Documents PyMuPDF cannot open are counted and rendered by poppler.
+        Pages are rendered at ``dpi`` if given, otherwise at a resolution
+        chosen per page. Unless ``use_layouts`` is False, pages matching a
+        layout template (by ``carrier`` or by page fingerprint) are cropped to
+        the template's regions before OCR. ``ocr_options`` override the
+        processor's own.
+        """
+        try:
+            if doc is None:
+                opened_doc = self._open_document(source)
+                if opened_doc is not None:
+                    with _closing_document(opened_doc):
+                        return self._extract_pages_ocr(
+                            source, page_indices, opened_doc, dpi, carrier, use_layouts, ocr_options
+                        )
+
+            if page_indices is None:
+                page_count = _page_count(doc) if doc is not None else _poppler_page_count(source)
+                page_indices = list(range(page_count))
+
+            # Pages are rendered lazily so only a bounded window is in memory
+            images = self._iter_page_images(source, page_indices, doc, dpi)
+            if use_layouts and self.layout_templates:
+                images = (self._crop_to_layout(image, carrier) for image in images)
+
+            return self._ocr_images(images, len(page_indices), ocr_options)
+        except Exception as e:
+            logger.error(f"OCR extraction failed: {e}")
+            self._ocr_state.failed = True
+            return [""] * len(page_indices or [])
+
+    def _iter_page_images(
+        self,
+        source: PdfSource,
+        page_indices: list[int],
+        doc: fitz.Document | None,
+        dpi: int | None = None,
+    ) -> Iterator[PageImage]:
+        """
+        Render the given PDF pages (0-based) to images one page at a time.
 
-        alphanumeric_count = sum(c.isalnum() for c in text)
-        if len(text) > 0 and (alphanumeric_count / len(text)) < 0.3:
-            return True
+        Without an explicit ``dpi`` each page is rendered at the resolution
+        picked by _choose_ocr_dpi, or the maximum when there is no ``doc``.
+        Without a ``doc`` pages are rendered by pdf2image whatever the backend.
+        """
+        for page_index in page_indices:
+            if dpi is not None:
+                page_dpi = dpi
+            elif doc is not None:
+                page_dpi = self._choose_page_ocr_dpi(doc, page_index)
+            else:
+                page_dpi = self.ocr_max_dpi
+
+            if self.render_backend == "pymupdf" and doc is not None:
+                # Rendered under the lock, but yielded (and OCR'd) outside it
+                with FITZ_LOCK:
+                    image = self._render_page_pixmap(doc[page_index], page_dpi)
+                yield image
+            else:
+                convert = convert_from_bytes if isinstance(source, bytes) else convert_from_path
+                yield from convert(
+                    source, dpi=page_dpi, first_page=page_index + 1, last_page=page_index + 1
+                )
+
+    def _crop_to_layout(self, image: PageImage, carrier: str | None) -> PageImage:
+        """Crop a rendered page to its layout template's regions, if a template applies."""
+        template = self.layout_templates.match(image, carrier)
+        if template is None:
+            return image
 
-        return False
+        logger.info(f"Page matches layout template '{template.name}', OCRing its regions only")
+        return crop_regions(image, template.regions)
 
-    def _extract_text_ocr(self, pdf_path: str) -> str:
+    def _choose_page_ocr_dpi(self, doc: fitz.Document, page_index: int) -> int:
+        """Pick the OCR rendering resolution of a page of an open document."""
+        with FITZ_LOCK:
+            return self._choose_ocr_dpi(doc[page_index])
+
+    def _choose_ocr_dpi(self, page: fitz.Page) -> int:
         """
-        Extract text using OCR on PDF converted to images.
-        Applies preprocessing for better OCR accuracy.
+        Pick the lowest rendering resolution that keeps a page legible to OCR.
+
+        Text spans need enough pixels for their smallest font to reach
+        OCR_TARGET_FONT_PX. Embedded (scanned) images gain nothing from being
+        rendered above their native resolution. Pages offering neither hint
+        are rendered at the maximum resolution.
         """
         try:
-            # Convert PDF pages to images
-            images = convert_from_path(pdf_path, dpi=300)
+            required_dpis = []
+
+            with FITZ_LOCK:
+                image_info = page.get_image_info()
+                text_blocks = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]
+
+            for image in image_info:
+                x0, y0, x1, y1 = image["bbox"]
+                if x1 > x0 and y1 > y0:
+                    # Page space is measured in points (1/72 inch)
+                    required_dpis.append(
+                        min(image["width"] / (x1 - x0), image["height"] / (y1 - y0)) * 72
+                    )
+
+            font_sizes = [
+                span["size"]
+                for block in text_blocks
+                for line in block.get("lines", [])
+                for span in line["spans"]
+                if span["size"] > 0 and span["text"].strip()
+            ]
+            if font_sizes:
+                required_dpis.append(OCR_TARGET_FONT_PX * 72 / min(font_sizes))
+        except Exception as e:
+            logger.warning(f"Could not inspect page for OCR resolution: {e}")
+            return self.ocr_max_dpi
+
+        if not required_dpis:
+            return self.ocr_max_dpi
+
+        return min(self.ocr_max_dpi, max(self.ocr_min_dpi, math.ceil(max(required_dpis))))
 
-            text = ""
+    @staticmethod
+    def _render_page_pixmap(page: fitz.Page, dpi: int) -> np.ndarray:
+        """Rasterize a page in-process into an RGB array, without temp files."""
+        with FITZ_LOCK:
+            pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+            image = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(
+                pixmap.height, pixmap.width, pixmap.n
+            )
+            # Free the pixmap while still holding the lock
+            del pixmap
+        return image
+
+    def _ocr_images(
+        self,
+        images: Iterable[PageImage],
+        page_count: int,
+        ocr_options: OcrOptions | None = None,
+    ) -> list[str]:
+        """
+        OCR rendered pages, returning the text of each page in page order.
+
+        Pages are consumed from ``images`` as they are needed, so at most
+        ``ocr_window`` rendered pages are alive at once. They are spread across
+        the processor's persistent worker pool when more than one worker is
+        configured; otherwise they are processed serially in this process.
+        """
+        ocr_options = ocr_options or self.ocr_options
+        if self.ocr_workers <= 1 or page_count <= 1:
+            page_texts = []
             for i, image in enumerate(images):
                 logger.info(f"Processing page {i + 1} with OCR")
+                page_texts.append(_ocr_page(image, ocr_options))
+            return page_texts
 
-                # Preprocess image for better OCR
-                processed_image = self._preprocess_image(image)
+        logger.info(f"Processing {page_count} pages with OCR across {self.ocr_workers} workers")
+        pool = self._get_ocr_pool()
+        page_texts = []
+        pending: deque[Future[str]] = deque()
+        for image in images:
+            pending.append(pool.submit(_ocr_page, image, ocr_options))
+            # Wait on the oldest page before rendering more than the window allows
+            if len(pending) >= self.ocr_window:
+                page_texts.append(pending.popleft().result())
 
-                # Perform OCR
-                page_text = pytesseract.image_to_string(processed_image)
-                text += page_text + "\n"
+        while pending:
+            page_texts.append(pending.popleft().result())
 
-            return text
-        except Exception as e:
-            logger.error(f"OCR extraction failed: {e}")
-            return ""
+        return page_texts
 
-    def _preprocess_image(self, image: Image.Image) -> Image.Image:
+    @staticmethod
+    def _preprocess_image(image: PageImage, profile: str = "auto") -> Image.Image:
         """
         Preprocess image to improve OCR accuracy.
         Applies grayscale, thresholding, and noise reduction.
+
+        Non-local means denoising is by far the most expensive step, so it is
+        only used for the "quality" profile, or under "auto" when the
+        thresholded page is noisy. Otherwise a 3x3 median filter removes the
+        isolated specks left by thresholding.
         """
-        # Convert PIL Image to OpenCV format
-        img_array = np.array(image)
+        # Convert PIL Image to OpenCV format (rendered pixmaps already are)
+        img_array = np.asarray(image)
         gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
 
         # Apply adaptive thresholding
@@ -140,45 +869,142 @@ class DocumentProcessor:
             gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
         )
 
+        if profile == "auto":
+            noisy = DocumentProcessor._estimate_speckle_ratio(thresh) > SPECKLE_RATIO_THRESHOLD
+            profile = "quality" if noisy else "fast"
+
         # Denoise
-        denoised = cv2.fastNlMeansDenoising(thresh, None, 10, 7, 21)
+        if profile == "quality":
+            denoised = cv2.fastNlMeansDenoising(thresh, None, 10, 7, 21)
+        else:
+            denoised = cv2.medianBlur(thresh, 3)
 
         # Convert back to PIL Image
         return Image.fromarray(denoised)
 
-    def _extract_fields(self, text: str) -> dict[str, Any]:
+    @staticmethod
+    def _estimate_speckle_ratio(thresh: np.ndarray) -> float:
         """
-        Extract structured fields from raw text using regex patterns.
+        Estimate noise in a binarized page as the share of dark pixels that
+        have no dark neighbour.
+
+        Text strokes are connected, so clean renders score close to zero while
+        scanner grain and fax noise leave many isolated pixels.
         """
-        extracted: dict[str, Any] = {}
+        dark = (thresh == 0).astype(np.uint8)
+        dark_count = int(dark.sum())
+        if dark_count == 0:
+            return 0.0
 
-        for field_name, patterns in self.field_patterns.items():
-            value = None
-            for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    value = match.group(1).strip()
-                    break
+        neighbour_kernel = np.ones((3, 3), dtype=np.float32)
+        neighbour_kernel[1, 1] = 0
+        neighbours = cv2.filter2D(dark, -1, neighbour_kernel, borderType=cv2.BORDER_CONSTANT)
+        isolated = int(np.count_nonzero(dark & (neighbours == 0)))
+        return isolated / dark_count
 
-            if field_name == "total_charge" and value:
-                # Clean and convert to float
-                value = value.replace(",", "")
-                try:
-                    value = float(value)
-                except ValueError:
-                    value = None
+    def _score_fields(
+        self, page_texts: list[str]
+    ) -> tuple[dict[str, Any], dict[str, FieldConfidence]]:
+        """
+        Extract structured fields from a document's page texts, with their confidence.
+
+        Pages read by OCR are given as OcrText, so that values matched on
+        them are scored with Tesseract's confidence in their words. Line-item
+        fields are extracted but not scored.
+        """
+        fields, confidences, _ = self._score_field_matches(page_texts)
+        return fields, confidences
+
+    def _score_field_matches(
+        self, page_texts: list[str]
+    ) -> tuple[dict[str, Any], dict[str, FieldConfidence], set[str]]:
+        """
+        Like _score_fields, also returning the fields matched by the first
+        pattern of their table: text further on cannot change those values.
+        """
+        text = "".join(page_texts)
+        page_starts = list(accumulate((len(page_text) for page_text in page_texts), initial=0))
+        extractor = self.field_extractors.detect_carrier(text)
+        if extractor is not None:
+            logger.info(
+                f"Detected carrier '{extractor.carrier}', using extractor '{extractor.name}'"
+            )
+
+        fields: dict[str, Any] = {}
+        confidences: dict[str, FieldConfidence] = {}
+        first_choice_fields: set[str] = set()
+
+        pattern_engine = self.field_extractors.pattern_engine(extractor)
+        for field_name, match in pattern_engine.search_matches(text).items():
+            if match is None:
+                fields[field_name] = None
+                confidences[field_name] = MISSING_FIELD
+                continue
+
+            if match.pattern_index == 0:
+                first_choice_fields.add(field_name)
+            value = self._clean_field(field_name, match.value)
+            page_text = page_texts[bisect_right(page_starts, match.start) - 1]
+            fields[field_name] = value
+            confidences[field_name] = score_field(
+                field_name,
+                value,
+                match.value,
+                self.field_extractors.pattern_rank(extractor, field_name, match.pattern_index),
+                page_text.word_confidences if isinstance(page_text, OcrText) else None,
+            )
+
+        for field_name, patterns in self.field_extractors.line_item_patterns(extractor).items():
+            fields[field_name] = extract_line_items(text, patterns)
 
-            elif field_name == "invoice_date" and value:
-                # Normalize date format
-                value = self._normalize_date(value)
+        return fields, confidences, first_choice_fields
 
-            elif field_name == "carrier_name" and value:
-                # Clean up carrier name
-                value = " ".join(value.split()).upper()
+    @staticmethod
+    def _core_confidences(confidences: dict[str, FieldConfidence]) -> list[FieldConfidence]:
+        """The confidences of the fields every invoice is expected to have."""
+        return [confidences[name] for name in CORE_FIELDS if name in confidences]
+
+    @classmethod
+    def _with_confidence(
+        cls, fields: dict[str, Any], confidences: dict[str, FieldConfidence]
+    ) -> dict[str, Any]:
+        """Add the overall (core field) and per-field confidence to extracted fields."""
+        return {
+            **fields,
+            "confidence": document_confidence(cls._core_confidences(confidences)),
+            "field_confidence": {
+                field_name: confidence.as_dict() for field_name, confidence in confidences.items()
+            },
+        }
+
+    def _clean_field(self, field_name: str, value: str | None) -> Any:
+        """Convert a matched field value to its stored form."""
+        if field_name == "total_charge" and value:
+            # Clean and convert to float
+            value = value.replace(",", "")
+            try:
+                return float(value)
+            except ValueError:
+                return None
+
+        elif field_name == "invoice_date" and value:
+            # Normalize date format
+            return self._normalize_date(value)
+
+        elif field_name == "carrier_name" and value:
+            # Clean up carrier name
+            return " ".join(value.split()).upper()
+
+        elif field_name == "distance" and value:
+            try:
+                return float(value.replace(",", ""))
+            except ValueError:
+                return None
 
-            extracted[field_name] = value
+        elif field_name in ("origin", "destination") and value:
+            return " ".join(value.split()).upper()
 
-        return extracted
+        return value
 
     def _normalize_date(self, date_str: str) -> str | None:
         """
@@ -0,0 +1,242 @@
+"""Content-addressed cache for invoice extraction results."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import redis
+
+from app.settings import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKENDS = ("none", "disk", "redis")
+
+# Share of a disk cache's entries freed whenever it outgrows max_entries, so
+# the directory is not listed again on the very next write
+DISK_EVICTION_HEADROOM = 0.1
+
+
+def build_cache_key(pdf_digest: str, extractor_version: str, field_patterns: Any) -> str:
+    """
+    Build a cache key for an extraction result.
+
+    Args:
+        pdf_digest: SHA-256 hex digest of the uploaded PDF bytes
+        extractor_version: Version of the extraction pipeline
+        field_patterns: Field pattern table used for extraction; any change
+            to the patterns yields a different key
+
+    Returns:
+        SHA-256 hex digest identifying the extraction result
+    """
+    patterns_fingerprint = hashlib.sha256(
+        json.dumps(field_patterns, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    key_material = f"{extractor_version}:{patterns_fingerprint}:{pdf_digest}"
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache(ABC):
+    """
+    Base class for extraction result caches.
+    Tracks hit/miss counters; subclasses implement storage and eviction.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the cached extraction result for ``key``, or None on a miss."""
+        value = self._get(key)
+        with self._counter_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: dict[str, Any]) -> None:
+        """Store an extraction result, evicting old entries beyond ``max_entries``."""
+        self._set(key, value)
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters."""
+        with self._counter_lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    @abstractmethod
+    def _get(self, key: str) -> dict[str, Any] | None:
+        """Read an entry from storage, or None if absent."""
+
+    @abstractmethod
+    def _set(self, key: str, value: dict[str, Any]) -> None:
+        """Write an entry to storage, evicting beyond ``max_entries``."""
+
+
+class DiskExtractionCache(ExtractionCache):
+    """
+    Stores extraction results as JSON files in a local directory.
+    Least recently used entries are evicted by file modification time.
+
+    The directory is listed once on creation and then only when the tracked
+    entry count exceeds ``max_entries``; entries written by other processes
+    are counted at that point.
+    """
+
+    def __init__(self, directory: str | Path, max_entries: int = 10000) -> None:
+        super().__init__(max_entries)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._entry_count = sum(1 for _ in self.directory.glob("*.json"))
+        self._entry_count_lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _get(self, key: str) -> dict[str, Any] | None:
+        path = self._path(key)
+        try:
+            value = json.loads(path.read_text(encoding="utf-8"))
+            # Bump the modification time so eviction is least-recently-used
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read extraction cache entry {key}: {e}")
+            return None
+
+    def _set(self, key: str, value: dict[str, Any]) -> None:
+        try:
+            # Write atomically so concurrent readers never see a partial entry
+            path = self._path(key)
+            is_new = not path.exists()
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                json.dump(value, tmp_file)
+            os.replace(tmp_path, path)
+            if is_new:
+                self._entry_added()
+        except OSError as e:
+            logger.warning(f"Failed to write extraction cache entry {key}: {e}")
+
+    def _entry_added(self) -> None:
+        with self._entry_count_lock:
+            self._entry_count += 1
+            if self._entry_count > self.max_entries:
+                self._entry_count = self._evict()
+
+    def _evict(self) -> int:
+        """Evict least recently used entries below ``max_entries``; return how many remain."""
+        entries = list(self.directory.glob("*.json"))
+        target = self.max_entries - int(self.max_entries * DISK_EVICTION_HEADROOM)
+        excess = len(entries) - target
+        if excess <= 0:
+            return len(entries)
+
+        def mtime(path: Path) -> float:
+            try:
+                return path.stat().st_mtime
+            except FileNotFoundError:
+                return 0.0
+
+        for path in sorted(entries, key=mtime)[:excess]:
+            path.unlink(missing_ok=True)
+        return target
+
+
+class RedisExtractionCache(ExtractionCache):
+    """
+    Stores extraction results in Redis.
+    A sorted set of last-access times drives least-recently-used eviction.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        max_entries: int = 10000,
+        prefix: str = "extraction-cache",
+    ) -> None:
+        super().__init__(max_entries)
+        self.client = client
+        self.prefix = prefix
+        self.index_key = f"{prefix}:lru"
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def _get(self, key: str) -> dict[str, Any] | None:
+        try:
+            raw = self.client.get(self._entry_key(key))
+            if raw is None:
+                return None
+            self.client.zadd(self.index_key, {key: time.time()})
+            return json.loads(raw)
+        except (redis.RedisError, ValueError) as e:
+            logger.warning(f"Failed to read extraction cache entry {key}: {e}")
+            return None
+
+    def _set(self, key: str, value: dict[str, Any]) -> None:
+        try:
+            pipeline = self.client.pipeline()
+            pipeline.set(self._entry_key(key), json.dumps(value))
+            pipeline.zadd(self.index_key, {key: time.time()})
+            pipeline.execute()
+            self._evict()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to write extraction cache entry {key}: {e}")
+
+    def _evict(self) -> None:
+        excess = self.client.zcard(self.index_key) - self.max_entries
+        if excess <= 0:
+            return
+
+        stale_keys = [
+            k.decode("utf-8") if isinstance(k, bytes) else k
+            for k in self.client.zrange(self.index_key, 0, excess - 1)
+        ]
+        if stale_keys:
+            pipeline = self.client.pipeline()
+            pipeline.delete(*(self._entry_key(k) for k in stale_keys))
+            pipeline.zrem(self.index_key, *stale_keys)
+            pipeline.execute()
+
+
+def create_extraction_cache(config: Settings) -> ExtractionCache | None:
+    """Create the extraction cache configured in settings, or None if disabled."""
+    backend = config.extraction_cache_backend.lower()
+
+    if backend == "none":
+        return None
+    if backend == "disk":
+        return DiskExtractionCache(
+            config.extraction_cache_dir, max_entries=config.extraction_cache_max_entries
+        )
+    if backend == "redis":
+        return RedisExtractionCache(
+            redis.Redis.from_url(config.redis_url),
+            max_entries=config.extraction_cache_max_entries,
+        )
+
+    raise ValueError(
+        f"Unknown extraction cache backend '{config.extraction_cache_backend}'. "
+        f"Expected one of: {', '.join(CACHE_BACKENDS)}"
+    )
+
+
+@lru_cache
+def get_extraction_cache() -> ExtractionCache | None:
+    """Return the process-wide extraction cache."""
+    return create_extraction_cache(settings)
@@ -0,0 +1,119 @@
+"""Bounded executor that keeps blocking PDF extraction off the event loop."""
+
+import asyncio
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ExtractionCapacityError(Exception):
+    """Raised when the extraction executor has no free worker or queue slot."""
+
+
+class ExtractionExecutor:
+    """
+    Runs blocking extraction work on a fixed-size thread pool.
+
+    At most ``max_concurrency`` jobs run at once and at most ``max_queue``
+    more wait for a worker. Submissions beyond that are rejected immediately
+    with ExtractionCapacityError rather than piling up.
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 8) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.capacity = self.max_concurrency + self.max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="extraction"
+        )
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        # Futures of run_when_available callers waiting for a slot, with their loops
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future[None]]] = []
+
+    @property
+    def in_flight(self) -> int:
+        """Number of jobs currently running or queued."""
+        with self._lock:
+            return self._in_flight
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        """
+        Submit a job, raising ExtractionCapacityError if the executor is full.
+
+        The slot is released when the job finishes, even if the caller stops
+        waiting for it, so abandoned requests cannot overcommit the pool.
+        """
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise ExtractionCapacityError(
+                    f"Extraction capacity of {self.capacity} jobs exceeded"
+                )
+            self._in_flight += 1
+
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run a job on the pool and await its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    async def run_when_available(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Like run, but wait for a free slot instead of raising ExtractionCapacityError.
+
+        Meant for bulk work that should queue behind interactive requests
+        rather than be rejected. Waiters sleep until a job finishes, then
+        retry; a job submitted with run meanwhile may take the slot first.
+        """
+        while True:
+            try:
+                future = self.submit(fn, *args)
+            except ExtractionCapacityError:
+                await self._wait_for_release()
+                continue
+            return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        """Wait for running jobs and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+
+    async def _wait_for_release(self) -> None:
+        """Wait until a slot is released, returning at once if one is free already."""
+        loop = asyncio.get_running_loop()
+        waiter: asyncio.Future[None] = loop.create_future()
+        with self._lock:
+            if self._in_flight < self.capacity:
+                return
+            self._waiters.append((loop, waiter))
+        try:
+            await waiter
+        finally:
+            with self._lock:
+                if (loop, waiter) in self._waiters:
+                    self._waiters.remove((loop, waiter))
+
+    def _release(self) -> None:
+        # Called from worker threads: wake every waiter on its own loop to retry
+        with self._lock:
+            self._in_flight -= 1
+            waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+
+def _wake(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
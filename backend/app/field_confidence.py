@@ -0,0 +1,154 @@
+"""
+Confidence scoring of extracted invoice fields.
+
+A field's score starts from how specific the pattern that matched it is (the
+first, labelled patterns of a field are more trustworthy than the generic
+fallbacks after them), is reduced when the value fails format validation,
+and for text read by OCR is scaled by Tesseract's confidence in the words
+the value was read from.
+"""
+
+import re
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from datetime import date
+from typing import Any
+
+# Fields scoring at least this are trusted without further work (e.g. OCR of
+# the document's other pages); documents averaging below LOW_CONFIDENCE can
+# be sent down the slower, more accurate extraction path
+HIGH_CONFIDENCE = 0.8
+LOW_CONFIDENCE = 0.5
+
+# Score lost per pattern of higher priority that did not match
+PATTERN_RANK_PENALTY = 0.15
+
+INVALID_FORMAT_FACTOR = 0.4
+
+# Used for OCR'd values whose words carry no Tesseract confidence
+UNKNOWN_OCR_CONFIDENCE = 0.6
+
+FIELD_SOURCE_TEXT = "text"
+FIELD_SOURCE_OCR = "ocr"
+
+MIN_INVOICE_YEAR = 1990
+MAX_TOTAL_CHARGE = 1_000_000
+MAX_DISTANCE_MILES = 10_000
+
+IDENTIFIER_FORMAT = re.compile(r"[A-Z0-9\-]*\d[A-Z0-9\-]*")
+CARRIER_NAME_FORMAT = re.compile(r"[A-Z][A-Z &.,'\-]{2,59}")
+LOCATION_FORMAT = re.compile(r"[A-Z][A-Z .'\-]*, [A-Z]{2}")
+WORD_TOKEN = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class FieldConfidence:
+    """How much an extracted field can be trusted, and why."""
+
+    score: float
+    pattern_index: int | None = None
+    format_valid: bool = False
+    ocr_confidence: float | None = None
+    source: str | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+MISSING_FIELD = FieldConfidence(score=0.0)
+
+
+def validate_field_format(field_name: str, value: Any) -> bool:
+    """Check that a cleaned field value looks like a valid value of its field."""
+    if value is None:
+        return False
+
+    if field_name == "invoice_date":
+        try:
+            invoice_date = date.fromisoformat(value)
+        except ValueError:
+            return False
+        return MIN_INVOICE_YEAR <= invoice_date.year <= date.today().year + 1
+
+    if field_name == "total_charge":
+        return 0 < value < MAX_TOTAL_CHARGE
+
+    if field_name == "carrier_name":
+        return CARRIER_NAME_FORMAT.fullmatch(value) is not None
+
+    if field_name in ("invoice_number", "shipment_reference"):
+        return len(value) >= 3 and IDENTIFIER_FORMAT.fullmatch(value.upper()) is not None
+
+    if field_name == "distance":
+        return 0 < value < MAX_DISTANCE_MILES
+
+    if field_name in ("origin", "destination"):
+        return LOCATION_FORMAT.fullmatch(value) is not None
+
+    return True
+
+
+def ocr_value_confidence(
+    raw_value: str, word_confidences: Iterable[tuple[str, float]]
+) -> float | None:
+    """
+    Return Tesseract's confidence (0-1) in the words a value was read from.
+
+    Each token of the value takes the best confidence of the OCR'd words
+    containing it, and the value the lowest of its tokens. None if no token
+    is found among the words.
+    """
+    words = [(word.upper(), confidence) for word, confidence in word_confidences]
+    token_confidences = []
+    for token in WORD_TOKEN.findall(raw_value.upper()):
+        matches = [confidence for word, confidence in words if token in word]
+        if matches:
+            token_confidences.append(max(matches))
+
+    if not token_confidences:
+        return None
+    return min(token_confidences) / 100
+
+
+def score_field(
+    field_name: str,
+    value: Any,
+    raw_value: str | None,
+    pattern_index: int | None,
+    word_confidences: Iterable[tuple[str, float]] | None = None,
+) -> FieldConfidence:
+    """
+    Score an extracted field.
+
+    ``word_confidences`` are those of the OCR'd page the value was matched
+    on, or None when it was matched in directly extracted text.
+    """
+    if value is None or raw_value is None or pattern_index is None:
+        return MISSING_FIELD
+
+    score = max(0.0, 1.0 - PATTERN_RANK_PENALTY * pattern_index)
+
+    format_valid = validate_field_format(field_name, value)
+    if not format_valid:
+        score *= INVALID_FORMAT_FACTOR
+
+    ocr_confidence = None
+    source = FIELD_SOURCE_TEXT
+    if word_confidences is not None:
+        source = FIELD_SOURCE_OCR
+        ocr_confidence = ocr_value_confidence(raw_value, word_confidences)
+        score *= UNKNOWN_OCR_CONFIDENCE if ocr_confidence is None else ocr_confidence
+
+    return FieldConfidence(
+        score=round(score, 3),
+        pattern_index=pattern_index,
+        format_valid=format_valid,
+        ocr_confidence=ocr_confidence,
+        source=source,
+    )
+
+
+def document_confidence(confidences: Iterable[FieldConfidence]) -> float:
+    """Overall confidence of an extraction: the mean of its field scores."""
+    scores = [confidence.score for confidence in confidences]
+    return round(sum(scores) / len(scores), 3) if scores else 0.0
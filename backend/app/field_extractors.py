@@ -0,0 +1,418 @@
+"""
+Field extraction rules: a generic pattern set plus carrier-specific pattern sets.
+
+Each document is first scanned once for the names of carriers with a
+registered extractor. Only the detected carrier's patterns (tried ahead of
+the generic ones) and the generic patterns are then run on it.
+"""
+
+import json
+import logging
+import re
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from app.layout_templates import normalize_carrier
+from app.settings import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+FIELD_PATTERN_FLAGS = re.IGNORECASE | re.MULTILINE
+
+# Fields every invoice is expected to have; document confidence is computed over these
+CORE_FIELDS = (
+    "carrier_name",
+    "invoice_number",
+    "invoice_date",
+    "total_charge",
+    "shipment_reference",
+)
+
+# "City, ST" on the rest of a labelled line
+_LOCATION = r"([A-Z][A-Z .'\-]*,[ \t]*[A-Z]{2})\b"
+
+GENERIC_FIELD_PATTERNS: dict[str, list[str]] = {
+    "carrier_name": [
+        r"carrier[:\s]+([A-Z][A-Z\s&]+(?:EXPRESS|FREIGHT|LOGISTICS|LINES|INC|LLC)?)",
+        r"from[:\s]+([A-Z][A-Z\s&]+(?:EXPRESS|FREIGHT|LOGISTICS|LINES|INC|LLC)?)",
+        r"([A-Z][A-Z\s&]{10,}(?:EXPRESS|FREIGHT|LOGISTICS|LINES))",
+    ],
+    "invoice_number": [
+        r"invoice\s*#?[:\s]*([A-Z0-9\-]+)",
+        r"inv(?:oice)?\.?\s*#?[:\s]*([A-Z0-9\-]+)",
+    ],
+    "invoice_date": [
+        r"invoice\s*date[:\s]+([\d]{1,2}[\/\-][\d]{1,2}[\/\-][\d]{2,4})",
+        r"date[:\s]+([\d]{1,2}[\/\-][\d]{1,2}[\/\-][\d]{2,4})",
+        r"([\d]{1,2}[\/\-][\d]{1,2}[\/\-][\d]{4})",
+    ],
+    "total_charge": [
+        r"total[:\s]+\$?\s*([\d,]+\.?\d{0,2})",
+        r"amount\s*due[:\s]+\$?\s*([\d,]+\.?\d{0,2})",
+        r"balance[:\s]+\$?\s*([\d,]+\.?\d{0,2})",
+    ],
+    "shipment_reference": [
+        r"pro\s*#?[:\s]*([A-Z0-9\-]+)",
+        r"ref(?:erence)?[:\s]*([A-Z0-9\-]+)",
+        r"shipment[:\s]*([A-Z0-9\-]+)",
+    ],
+    "origin": [
+        rf"origin[: \t]+{_LOCATION}",
+        rf"(?:ship(?:ped)?[ \t]*from|pick[ \t]*up)[: \t]+{_LOCATION}",
+    ],
+    "destination": [
+        rf"destination[: \t]+{_LOCATION}",
+        rf"(?:ship(?:ped)?[ \t]*to|deliver(?:y|ed)?[ \t]*to|consignee)[: \t]+{_LOCATION}",
+    ],
+    "distance": [
+        r"(?:distance|mileage|miles)[: \t]+([\d,]+(?:\.\d+)?)",
+        r"([\d,]+(?:\.\d+)?)[ \t]*(?:mi|miles)\b",
+    ],
+}
+
+# Line-item fields collect every match, as {"description": ..., "amount": ...} items
+GENERIC_LINE_ITEM_PATTERNS: dict[str, list[str]] = {
+    "accessorials": [
+        r"^[ \t]*(?P<description>(?:fuel[ \t]*surcharge|liftgate|detention|lumper|hazmat"
+        r"|residential[ \t]*delivery|inside[ \t]*delivery|limited[ \t]*access|redelivery"
+        r"|storage|reweigh|reconsignment|appointment|notify(?:[ \t]*before[ \t]*delivery)?)"
+        r"[A-Z \t\-/]*?)[ \t]*[:\-]?[ \t]*\$?[ \t]*(?P<amount>[\d,]+\.\d{2})[ \t]*$",
+    ],
+}
+
+
+class FieldMatch(NamedTuple):
+    """A field value found in text, with the index of the pattern that matched it."""
+
+    value: str
+    pattern_index: int
+    start: int
+
+
+class FieldPatternEngine:
+    """
+    Field regex patterns compiled once and matched with first-pattern-wins priority.
+
+    Each field also gets a combined alternation of all its patterns. One scan
+    with it finds the earliest position any pattern matches (and which one), so
+    fields with no match cost a single pass, and higher-priority patterns only
+    need to be searched from that position onwards.
+    """
+
+    def __init__(self, field_patterns: dict[str, list[str]]) -> None:
+        self.patterns = {
+            field_name: [re.compile(pattern, FIELD_PATTERN_FLAGS) for pattern in patterns]
+            for field_name, patterns in field_patterns.items()
+        }
+        self.combined: dict[str, re.Pattern[str] | None] = {}
+        for field_name, patterns in field_patterns.items():
+            branches = "|".join(f"(?P<p{i}>{pattern})" for i, pattern in enumerate(patterns))
+            try:
+                self.combined[field_name] = re.compile(branches, FIELD_PATTERN_FLAGS)
+            except re.error:
+                # e.g. backreferences that no longer line up once patterns are combined
+                self.combined[field_name] = None
+
+    @classmethod
+    def for_patterns(cls, field_patterns: dict[str, list[str]]) -> "FieldPatternEngine":
+        """Return the process-wide engine for a pattern table, compiling it on first use."""
+        frozen = tuple((name, tuple(patterns)) for name, patterns in field_patterns.items())
+        return _compiled_field_patterns(frozen)
+
+    def search(self, text: str) -> dict[str, str | None]:
+        """Return the stripped first capture group of the first matching pattern per field."""
+        return {
+            field_name: match.value if match else None
+            for field_name, match in self.search_matches(text).items()
+        }
+
+    def search_matches(self, text: str) -> dict[str, FieldMatch | None]:
+        """Like search, also reporting which pattern matched each field and where."""
+        return {field_name: self._search_field(field_name, text) for field_name in self.patterns}
+
+    def _search_field(self, field_name: str, text: str) -> FieldMatch | None:
+        patterns = self.patterns[field_name]
+        combined = self.combined[field_name]
+
+        if combined is None:
+            for index, pattern in enumerate(patterns):
+                match = pattern.search(text)
+                if match:
+                    return FieldMatch(match.group(1).strip(), index, match.start())
+            return None
+
+        combined_match = combined.search(text)
+        if not combined_match:
+            return None
+
+        # No pattern matches before this position, and pattern `first` matches here
+        start = combined_match.start()
+        first = int(combined_match.lastgroup[1:])
+
+        for index, pattern in enumerate(patterns[:first]):
+            match = pattern.search(text, start + 1)
+            if match:
+                return FieldMatch(match.group(1).strip(), index, match.start())
+
+        value = combined_match.group(combined.groupindex[f"p{first}"] + 1).strip()
+        return FieldMatch(value, first, start)
+
+
+@lru_cache
+def _compiled_field_patterns(frozen: tuple[tuple[str, tuple[str, ...]], ...]) -> FieldPatternEngine:
+    return FieldPatternEngine({name: list(patterns) for name, patterns in frozen})
+
+
+@lru_cache
+def _compiled_line_item_patterns(patterns: tuple[str, ...]) -> list[re.Pattern[str]]:
+    return [re.compile(pattern, FIELD_PATTERN_FLAGS) for pattern in patterns]
+
+
+def extract_line_items(text: str, patterns: list[str]) -> list[dict[str, Any]]:
+    """
+    Collect every line item matched by ``patterns``, in document order.
+
+    Patterns capture ``description`` and ``amount`` groups; a line matched by
+    several patterns is only reported once.
+    """
+    matches: dict[int, re.Match[str]] = {}
+    for pattern in _compiled_line_item_patterns(tuple(patterns)):
+        for match in pattern.finditer(text):
+            matches.setdefault(match.start(), match)
+
+    items = []
+    for _, match in sorted(matches.items()):
+        try:
+            amount = float(match.group("amount").replace(",", ""))
+        except ValueError:
+            continue
+        description = " ".join(match.group("description").upper().split())
+        items.append({"description": description, "amount": amount})
+    return items
+
+
+def _trie_pattern(names: Iterable[str]) -> str:
+    """
+    Build a regex matching any of ``names``, shaped as a prefix trie.
+
+    Names sharing a prefix share its branch, so the regex engine follows a
+    single path per position, as an Aho-Corasick automaton would, instead of
+    retrying every name. Longer names are preferred over their prefixes.
+    """
+    trie: dict[str, dict] = {}
+    for name in names:
+        node = trie
+        for char in name:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _trie_node_pattern(trie)
+
+
+def _trie_node_pattern(node: dict[str, dict]) -> str:
+    branches = [
+        (r"\s+" if char == " " else re.escape(char)) + _trie_node_pattern(child)
+        for char, child in sorted(node.items())
+        if char
+    ]
+    if not branches:
+        return ""
+    if len(branches) == 1 and "" not in node:
+        return branches[0]
+
+    group = f"(?:{'|'.join(branches)})"
+    return f"{group}?" if "" in node else group
+
+
+@dataclass(frozen=True)
+class CarrierExtractor:
+    """
+    Extraction rules for one carrier's invoices.
+
+    The extractor applies to documents naming the carrier or one of its
+    ``aliases``. Its patterns are tried before the generic patterns of the
+    same field, and may define fields the generic set does not have.
+    """
+
+    name: str
+    carrier: str
+    aliases: tuple[str, ...] = ()
+    field_patterns: dict[str, list[str]] = field(default_factory=dict)
+    line_item_patterns: dict[str, list[str]] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        for patterns in self.field_patterns.values():
+            for pattern in patterns:
+                if re.compile(pattern).groups < 1:
+                    raise ValueError(
+                        f"Pattern '{pattern}' of extractor '{self.name}' has no capture group"
+                    )
+
+    @property
+    def names(self) -> list[str]:
+        """Normalized names the carrier is detected by."""
+        return [normalize_carrier(name) for name in (self.carrier, *self.aliases)]
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "CarrierExtractor":
+        """Build an extractor from its JSON representation."""
+        return cls(
+            name=data["name"],
+            carrier=data["carrier"],
+            aliases=tuple(data.get("aliases", ())),
+            field_patterns=data.get("field_patterns", {}),
+            line_item_patterns=data.get("line_item_patterns", {}),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "carrier": self.carrier,
+            "aliases": list(self.aliases),
+            "field_patterns": self.field_patterns,
+            "line_item_patterns": self.line_item_patterns,
+        }
+
+
+class FieldExtractorRegistry:
+    """
+    Thread-safe collection of carrier extractors over a generic pattern set.
+
+    Carrier detection uses one regex built from all registered carrier names
+    (see _trie_pattern), rebuilt when an extractor is registered.
+    """
+
+    def __init__(
+        self,
+        extractors: Iterable[CarrierExtractor] = (),
+        generic_patterns: dict[str, list[str]] | None = None,
+        generic_line_item_patterns: dict[str, list[str]] | None = None,
+    ) -> None:
+        self.generic_patterns = generic_patterns or GENERIC_FIELD_PATTERNS
+        self.generic_line_item_patterns = (
+            GENERIC_LINE_ITEM_PATTERNS
+            if generic_line_item_patterns is None
+            else generic_line_item_patterns
+        )
+        self._extractors: dict[str, CarrierExtractor] = {}
+        self._by_carrier_name: dict[str, CarrierExtractor] = {}
+        self._carrier_pattern: re.Pattern[str] | None = None
+        self._lock = threading.Lock()
+        for extractor in extractors:
+            self.register(extractor)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._extractors)
+
+    def register(self, extractor: CarrierExtractor) -> None:
+        """Add an extractor, replacing any existing extractor with the same name."""
+        with self._lock:
+            self._extractors.pop(extractor.name, None)
+            self._extractors[extractor.name] = extractor
+
+            # Earlier registrations win a name claimed by several extractors
+            by_carrier_name: dict[str, CarrierExtractor] = {}
+            for registered in self._extractors.values():
+                for name in registered.names:
+                    by_carrier_name.setdefault(name, registered)
+            self._by_carrier_name = by_carrier_name
+            self._carrier_pattern = (
+                re.compile(rf"(?<!\w)(?:{_trie_pattern(by_carrier_name)})(?!\w)", re.IGNORECASE)
+                if by_carrier_name
+                else None
+            )
+
+    def extractors(self) -> list[CarrierExtractor]:
+        """Return the registered extractors in registration order."""
+        with self._lock:
+            return list(self._extractors.values())
+
+    def detect_carrier(self, text: str) -> CarrierExtractor | None:
+        """Return the extractor of the first registered carrier named in ``text``."""
+        with self._lock:
+            carrier_pattern = self._carrier_pattern
+            by_carrier_name = self._by_carrier_name
+        if carrier_pattern is None:
+            return None
+
+        match = carrier_pattern.search(text)
+        return by_carrier_name.get(normalize_carrier(match.group())) if match else None
+
+    def field_patterns(self, extractor: CarrierExtractor | None = None) -> dict[str, list[str]]:
+        """Return the pattern table for a carrier (or the generic one), carrier patterns first."""
+        if extractor is None:
+            return self.generic_patterns
+        return _merge_patterns(extractor.field_patterns, self.generic_patterns)
+
+    def line_item_patterns(self, extractor: CarrierExtractor | None = None) -> dict[str, list[str]]:
+        """Return the line-item patterns for a carrier (or the generic ones)."""
+        if extractor is None:
+            return self.generic_line_item_patterns
+        return _merge_patterns(extractor.line_item_patterns, self.generic_line_item_patterns)
+
+    def pattern_engine(self, extractor: CarrierExtractor | None = None) -> FieldPatternEngine:
+        """Return the compiled engine for a carrier's (or the generic) pattern table."""
+        return FieldPatternEngine.for_patterns(self.field_patterns(extractor))
+
+    def pattern_rank(
+        self, extractor: CarrierExtractor | None, field_name: str, pattern_index: int
+    ) -> int:
+        """
+        Return the rank of a matched pattern within its own set, carrier or generic.
+
+        Carrier patterns are placed ahead of the generic ones in a carrier's
+        table, so a generic pattern's index there is offset by their number.
+        """
+        if extractor is None:
+            return pattern_index
+        carrier_count = len(extractor.field_patterns.get(field_name, []))
+        return pattern_index if pattern_index < carrier_count else pattern_index - carrier_count
+
+    def to_config(self) -> dict[str, Any]:
+        """Return the JSON representation of every rule in the registry."""
+        return {
+            "field_patterns": self.generic_patterns,
+            "line_item_patterns": self.generic_line_item_patterns,
+            "extractors": [extractor.to_dict() for extractor in self.extractors()],
+        }
+
+
+def _merge_patterns(
+    first: dict[str, list[str]], then: dict[str, list[str]]
+) -> dict[str, list[str]]:
+    merged = {name: list(patterns) for name, patterns in then.items()}
+    for name, patterns in first.items():
+        merged[name] = [*patterns, *merged.get(name, [])]
+    return merged
+
+
+def load_field_extractors(path: str | Path) -> FieldExtractorRegistry:
+    """
+    Load carrier extractors from a JSON file holding a list of extractors, e.g.::
+
+        [{"name": "roadway", "carrier": "ROADWAY EXPRESS", "aliases": ["ROADWAY"],
+          "field_patterns": {"shipment_reference": ["pro\\\\s*number[:\\\\s]*(\\\\d+)"]}}]
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return FieldExtractorRegistry(CarrierExtractor.from_dict(item) for item in data)
+
+
+def create_field_extractors(config: Settings = settings) -> FieldExtractorRegistry:
+    """Create the field extractor registry from settings; generic only unless a file is set."""
+    if not config.field_extractors_path:
+        return FieldExtractorRegistry()
+
+    registry = load_field_extractors(config.field_extractors_path)
+    logger.info(f"Loaded {len(registry)} carrier extractors from {config.field_extractors_path}")
+    return registry
+
+
+@lru_cache
+def get_field_extractors() -> FieldExtractorRegistry:
+    """Get the process-wide field extractor registry."""
+    return create_field_extractors()
@@ -0,0 +1,197 @@
+"""Asynchronous invoice ingestion jobs."""
+
+import logging
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from fastapi import BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.audit_engine import DEFAULT_CONTRACT_RULES, AuditEngine
+from app.crud import audit_result_crud, contract_crud, invoice_crud
+from app.database import AsyncSessionLocal
+from app.document_processor import DocumentProcessor
+from app.extraction_executor import ExtractionExecutor
+from app.settings import settings
+from app.storage import pending_upload_key, put_pending_upload
+
+logger = logging.getLogger(__name__)
+
+INVOICE_STATUS_PROCESSING = "processing"
+INVOICE_STATUS_EXTRACTED = "draft"
+INVOICE_STATUS_FAILED = "failed"
+
+TASK_QUEUE_BACKENDS = ("inprocess", "celery")
+
+
+def invoice_fields_from_extraction(
+    extracted_data: dict[str, Any], default_invoice_number: str
+) -> dict[str, Any]:
+    """Map extracted invoice data onto Invoice columns."""
+    invoice_date = extracted_data.get("invoice_date")
+    if isinstance(invoice_date, str):
+        try:
+            issue_date = datetime.fromisoformat(invoice_date)
+        except (ValueError, TypeError):
+            issue_date = datetime.now()
+    else:
+        issue_date = invoice_date or datetime.now()
+
+    return {
+        "invoice_number": extracted_data.get("invoice_number") or default_invoice_number,
+        "amount": int(float(extracted_data.get("total_charge") or 0) * 100),
+        "issue_date": issue_date,
+        "extracted_entities": extracted_data,
+    }
+
+
+async def complete_invoice_job(
+    db: AsyncSession,
+    invoice_id: UUID,
+    extracted_data: dict[str, Any],
+    contract_id: UUID | None = None,
+    shipment_data: dict[str, Any] | None = None,
+) -> None:
+    """
+    Store extraction results on a processing invoice and, if a contract was
+    given, audit it and record the audit result.
+    """
+    invoice = await invoice_crud.get(db, invoice_id)
+    if not invoice:
+        logger.error(f"Invoice {invoice_id} disappeared before its job completed")
+        return
+
+    update_data = invoice_fields_from_extraction(extracted_data, invoice.invoice_number)
+    update_data["status"] = INVOICE_STATUS_EXTRACTED
+    await invoice_crud.update(db, invoice, update_data)
+
+    if contract_id is None:
+        return
+
+    contract = await contract_crud.get(db, contract_id)
+    contract_rules = (contract.data if contract else None) or DEFAULT_CONTRACT_RULES
+    anomalies = AuditEngine(contract_rules).audit(extracted_data, shipment_data or {})
+
+    await audit_result_crud.create(
+        db,
+        {
+            "invoice_id": invoice_id,
+            "contract_id": contract_id if contract else None,
+            "rule_id": "GENERAL_AUDIT",
+            "status": "passed" if not anomalies else "failed",
+            "findings": {
+                "anomalies": anomalies,
+                "anomaly_count": len(anomalies),
+                "invoice_data": extracted_data,
+                "contract_rules": contract_rules,
+            },
+        },
+    )
+
+
+async def fail_invoice_job(db: AsyncSession, invoice_id: UUID, error: str) -> None:
+    """
+    Mark a processing invoice as failed, keeping the error for clients polling it.
+
+    Its file hash is cleared so that the same PDF can be uploaded again.
+    """
+    await db.rollback()
+    invoice = await invoice_crud.get(db, invoice_id)
+    if invoice:
+        data = dict(invoice.data or {})
+        data["error"] = error
+        await invoice_crud.update(
+            db,
+            invoice,
+            {"status": INVOICE_STATUS_FAILED, "data": data, "duplicate_hash": None},
+        )
+
+
+async def run_invoice_job(
+    session_factory: Callable[[], AsyncSession],
+    extracted_data: dict[str, Any] | None,
+    invoice_id: UUID,
+    contract_id: UUID | None = None,
+    shipment_data: dict[str, Any] | None = None,
+    error: str | None = None,
+) -> None:
+    """Persist the outcome of an extraction job in its own database session."""
+    async with session_factory() as db:
+        try:
+            if extracted_data is None:
+                raise RuntimeError(error or "Extraction failed")
+            await complete_invoice_job(db, invoice_id, extracted_data, contract_id, shipment_data)
+            logger.info(f"Invoice job {invoice_id} complete")
+        except Exception as e:
+            logger.error(f"Invoice job {invoice_id} failed: {e}", exc_info=True)
+            await fail_invoice_job(db, invoice_id, str(e))
+
+
+async def _run_in_process(
+    processor: DocumentProcessor,
+    executor: ExtractionExecutor,
+    invoice_id: UUID,
+    pdf_bytes: bytes,
+    contract_id: UUID | None,
+    shipment_data: dict[str, Any] | None,
+) -> None:
+    extracted_data = None
+    error = None
+    try:
+        # The client was already told the invoice is processing, so wait for
+        # capacity rather than failing the job when the executor is busy
+        extracted_data = await executor.run_when_available(
+            processor.process_invoice_bytes, pdf_bytes
+        )
+    except Exception as e:
+        error = str(e)
+
+    await run_invoice_job(
+        AsyncSessionLocal, extracted_data, invoice_id, contract_id, shipment_data, error
+    )
+
+
+async def enqueue_invoice_job(
+    background_tasks: BackgroundTasks,
+    processor: DocumentProcessor,
+    executor: ExtractionExecutor,
+    invoice_id: UUID,
+    pdf_bytes: bytes,
+    contract_id: UUID | None = None,
+    shipment_data: dict[str, Any] | None = None,
+) -> None:
+    """
+    Queue extraction (and optional audit) of an uploaded invoice.
+
+    With the "celery" backend the PDF is stored in S3 and a job carrying its
+    key goes to the Celery broker, to run on a worker pool. The "inprocess"
+    backend runs it after the response is sent, on this application's
+    extraction executor; it needs no broker and is meant for tests and local
+    development.
+    """
+    if settings.task_queue_backend == "celery":
+        # Imported lazily so the API only needs a broker when Celery is in use
+        from app.tasks import process_invoice_job
+
+        # Both the upload and the publish block, so they run off the event loop
+        pdf_key = pending_upload_key(invoice_id)
+        await run_in_threadpool(put_pending_upload, pdf_key, pdf_bytes)
+        await run_in_threadpool(
+            process_invoice_job.delay,
+            str(invoice_id),
+            pdf_key,
+            str(contract_id) if contract_id else None,
+            shipment_data,
+        )
+    elif settings.task_queue_backend == "inprocess":
+        background_tasks.add_task(
+            _run_in_process, processor, executor, invoice_id, pdf_bytes, contract_id, shipment_data
+        )
+    else:
+        raise ValueError(
+            f"Unknown task queue backend '{settings.task_queue_backend}'. "
+            f"Expected one of: {', '.join(TASK_QUEUE_BACKENDS)}"
+        )
@@ -0,0 +1,224 @@
+"""Layout templates that restrict OCR to known regions of recurring invoice layouts."""
+
+import json
+import logging
+import threading
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.settings import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+# Page fingerprints compare a 9x8 thumbnail's horizontal gradients (a 64-bit dHash),
+# which survives rescaling, rescanning and small shifts of the same layout
+FINGERPRINT_HEIGHT = 8
+DEFAULT_MAX_FINGERPRINT_DISTANCE = 6
+
+# White space left between cropped regions so Tesseract reads them as separate blocks
+REGION_GAP_PX = 16
+
+
+@dataclass(frozen=True)
+class LayoutRegion:
+    """A rectangle on the page, in fractions (0 to 1) of the page width and height."""
+
+    name: str
+    left: float
+    top: float
+    right: float
+    bottom: float
+
+    def __post_init__(self) -> None:
+        if not (0 <= self.left < self.right <= 1 and 0 <= self.top < self.bottom <= 1):
+            raise ValueError(f"Invalid bounds for layout region '{self.name}'")
+
+    @property
+    def area(self) -> float:
+        """Fraction of the page covered by the region."""
+        return (self.right - self.left) * (self.bottom - self.top)
+
+
+@dataclass(frozen=True)
+class LayoutTemplate:
+    """
+    A known invoice layout and the page regions worth OCRing.
+
+    A template applies to a page when the document's carrier name equals
+    ``carrier`` or when the rendered page's fingerprint is within
+    ``max_distance`` bits of ``fingerprint``.
+    """
+
+    name: str
+    regions: tuple[LayoutRegion, ...]
+    carrier: str | None = None
+    fingerprint: str | None = None
+    max_distance: int = DEFAULT_MAX_FINGERPRINT_DISTANCE
+
+    def __post_init__(self) -> None:
+        if not self.regions:
+            raise ValueError(f"Layout template '{self.name}' has no regions")
+        if self.carrier is None and self.fingerprint is None:
+            raise ValueError(f"Layout template '{self.name}' needs a carrier or a fingerprint")
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "LayoutTemplate":
+        """Build a template from its JSON representation."""
+        return cls(
+            name=data["name"],
+            regions=tuple(LayoutRegion(**region) for region in data["regions"]),
+            carrier=data.get("carrier"),
+            fingerprint=data.get("fingerprint"),
+            max_distance=data.get("max_distance", DEFAULT_MAX_FINGERPRINT_DISTANCE),
+        )
+
+
+def normalize_carrier(carrier: str) -> str:
+    """Normalize a carrier name the way extracted carrier names are normalized."""
+    return " ".join(carrier.upper().split())
+
+
+def page_fingerprint(image: Image.Image | np.ndarray) -> str:
+    """
+    Compute a 64-bit perceptual fingerprint (dHash) of a rendered page, as hex.
+
+    Use it on a sample page to fill in a template's ``fingerprint``.
+    """
+    gray = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2GRAY)
+    thumbnail = cv2.resize(
+        gray, (FINGERPRINT_HEIGHT + 1, FINGERPRINT_HEIGHT), interpolation=cv2.INTER_AREA
+    )
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).flatten()
+    return f"{int(''.join('1' if bit else '0' for bit in bits), 2):016x}"
+
+
+def fingerprint_distance(first: str, second: str) -> int:
+    """Number of differing bits between two page fingerprints."""
+    return bin(int(first, 16) ^ int(second, 16)).count("1")
+
+
+def crop_regions(image: Image.Image | np.ndarray, regions: Iterable[LayoutRegion]) -> np.ndarray:
+    """
+    Crop regions out of a rendered page and stack them into one image for OCR.
+
+    Regions are stacked top to bottom in template order on a white
+    background, separated by REGION_GAP_PX.
+    """
+    page = np.asarray(image)
+    height, width = page.shape[:2]
+
+    crops = [
+        page[
+            int(region.top * height) : int(np.ceil(region.bottom * height)),
+            int(region.left * width) : int(np.ceil(region.right * width)),
+        ]
+        for region in regions
+    ]
+
+    stacked_width = max(crop.shape[1] for crop in crops)
+    stacked_height = sum(crop.shape[0] for crop in crops) + REGION_GAP_PX * (len(crops) - 1)
+    stacked = np.full((stacked_height, stacked_width, *page.shape[2:]), 255, dtype=page.dtype)
+
+    top = 0
+    for crop in crops:
+        stacked[top : top + crop.shape[0], : crop.shape[1]] = crop
+        top += crop.shape[0] + REGION_GAP_PX
+
+    return stacked
+
+
+class LayoutTemplateRegistry:
+    """
+    Thread-safe collection of layout templates.
+
+    Carrier templates are preferred; otherwise the template with the closest
+    fingerprint within its ``max_distance`` applies.
+    """
+
+    def __init__(self, templates: Iterable[LayoutTemplate] = ()) -> None:
+        self._templates: list[LayoutTemplate] = []
+        self._lock = threading.Lock()
+        for template in templates:
+            self.register(template)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._templates)
+
+    def register(self, template: LayoutTemplate) -> None:
+        """Add a template, replacing any existing template with the same name."""
+        with self._lock:
+            self._templates = [t for t in self._templates if t.name != template.name]
+            self._templates.append(template)
+
+    def templates(self) -> list[LayoutTemplate]:
+        """Return the registered templates in registration order."""
+        with self._lock:
+            return list(self._templates)
+
+    def match(
+        self, image: Image.Image | np.ndarray, carrier: str | None = None
+    ) -> LayoutTemplate | None:
+        """Find the template for a rendered page, or None if no template applies."""
+        templates = self.templates()
+
+        if carrier:
+            normalized = normalize_carrier(carrier)
+            for template in templates:
+                if template.carrier and normalize_carrier(template.carrier) == normalized:
+                    return template
+
+        fingerprinted = [template for template in templates if template.fingerprint]
+        if not fingerprinted:
+            return None
+
+        fingerprint = page_fingerprint(image)
+        best_match = None
+        best_distance = None
+        for template in fingerprinted:
+            distance = fingerprint_distance(fingerprint, template.fingerprint)
+            if distance <= template.max_distance and (
+                best_distance is None or distance < best_distance
+            ):
+                best_match, best_distance = template, distance
+        return best_match
+
+    def to_config(self) -> list[dict[str, Any]]:
+        """Return the JSON representation of the registered templates."""
+        return [asdict(template) for template in self.templates()]
+
+
+def load_layout_templates(path: str | Path) -> LayoutTemplateRegistry:
+    """
+    Load templates from a JSON file holding a list of templates, e.g.::
+
+        [{"name": "roadway-express", "carrier": "ROADWAY EXPRESS",
+          "regions": [{"name": "header", "left": 0.5, "top": 0.0,
+                       "right": 1.0, "bottom": 0.15}]}]
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return LayoutTemplateRegistry(LayoutTemplate.from_dict(item) for item in data)
+
+
+def create_layout_templates(config: Settings = settings) -> LayoutTemplateRegistry:
+    """Create the layout template registry from settings; empty unless a file is configured."""
+    if not config.layout_templates_path:
+        return LayoutTemplateRegistry()
+
+    registry = load_layout_templates(config.layout_templates_path)
+    logger.info(f"Loaded {len(registry)} layout templates from {config.layout_templates_path}")
+    return registry
+
+
+@lru_cache
+def get_layout_templates() -> LayoutTemplateRegistry:
+    """Get the process-wide layout template registry."""
+    return create_layout_templates()
@@ -7,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 
+from app.dependencies import create_document_processor, create_extraction_executor
 from app.routers import audit_results, clients, contracts, health, invoices, invoice
 from app.security import RateLimitMiddleware, SecurityHeadersMiddleware
 from app.settings import settings
@@ -27,8 +28,18 @@ async def lifespan(app: FastAPI):
     logger.info(f"Debug mode: {settings.debug}")
     logger.info(f"API key authentication: {'enabled' if settings.require_api_key else 'disabled'}")
     logger.info(f"Rate limiting: {'enabled' if settings.enable_rate_limiting else 'disabled'}")
+
+    # Expensive extraction setup happens once and is shared by all requests
+    app.state.document_processor = create_document_processor()
+    app.state.extraction_executor = create_extraction_executor()
+
     yield
+
     logger.info("Shutting down application")
+    app.state.extraction_executor.shutdown()
+    app.state.document_processor.close()
+    app.state.extraction_executor = None
+    app.state.document_processor = None
 
 
 def create_app() -> FastAPI:
@@ -0,0 +1,119 @@
+"""
+Cache of OCR output per rendered page image.
+
+Carriers attach the same cover sheets and terms-and-conditions pages to
+thousands of invoices. Those pages render to identical bitmaps, so their OCR
+output is cached under a hash of the bitmap: an in-memory LRU per process in
+front of an optional on-disk tier shared by all processes.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+from app.extraction_cache import DiskExtractionCache
+from app.ocr_engines import OCR_LANGUAGE, OcrText
+
+# Bump whenever preprocessing or OCR changes in a way that alters page text
+OCR_PAGE_CACHE_VERSION = "1"
+
+
+@dataclass(frozen=True)
+class OcrPageCacheConfig:
+    """Sizes and location of the page cache; sent to OCR workers with their options."""
+
+    max_entries: int = 1000
+    directory: str | None = None
+    max_disk_entries: int = 50000
+
+
+def page_cache_key(image: Image.Image | np.ndarray, profile: str, engine: str) -> str:
+    """
+    Hash a rendered page bitmap together with how it is going to be OCR'd.
+
+    The exact pixels are hashed: a perceptual hash would also match pages
+    that differ only in their invoice number or amounts.
+    """
+    pixels = np.ascontiguousarray(np.asarray(image))
+    digest = hashlib.sha256()
+    digest.update(
+        f"{OCR_PAGE_CACHE_VERSION}:{engine}:{OCR_LANGUAGE}:{profile}:"
+        f"{pixels.dtype}:{pixels.shape}:".encode()
+    )
+    digest.update(pixels.data)
+    return digest.hexdigest()
+
+
+class OcrPageCache:
+    """
+    Two-tier store of page OCR output.
+
+    The memory tier is an LRU of at most ``max_entries`` pages. Misses fall
+    through to the disk tier, if configured, and disk hits are promoted to
+    memory.
+    """
+
+    def __init__(self, config: OcrPageCacheConfig) -> None:
+        self.max_entries = max(1, config.max_entries)
+        self.disk = (
+            DiskExtractionCache(Path(config.directory), max_entries=config.max_disk_entries)
+            if config.directory
+            else None
+        )
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, OcrText] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> OcrText | None:
+        """Return the cached OCR output for a page key, or None on a miss."""
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return text
+
+        stored = self.disk.get(key) if self.disk is not None else None
+        if stored is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        text = OcrText(stored["text"], map(tuple, stored["word_confidences"]))
+        self._remember(key, text)
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def set(self, key: str, text: str) -> None:
+        """Store a page's OCR output in both tiers."""
+        text = text if isinstance(text, OcrText) else OcrText(text)
+        self._remember(key, text)
+        if self.disk is not None:
+            self.disk.set(key, {"text": str(text), "word_confidences": text.word_confidences})
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and the number of pages held in memory."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _remember(self, key: str, text: OcrText) -> None:
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+@lru_cache
+def get_ocr_page_cache(config: OcrPageCacheConfig) -> OcrPageCache:
+    """Get this process's page cache for a configuration, creating it on first use."""
+    return OcrPageCache(config)
@@ -0,0 +1,140 @@
+"""
+OCR engines used to read preprocessed page images.
+
+"pytesseract" runs the tesseract CLI once per page, paying process startup,
+a temp image file and language model loading each time. "tesserocr" keeps a
+Tesseract engine loaded per thread (and so per OCR worker process) through
+the C API and hands it page buffers directly. tesserocr needs the libtesseract
+headers to build; the Docker images install it from requirements-ocr.txt, and
+pytesseract remains the fallback where it is missing.
+
+Both engines also report Tesseract's per-word confidences, which are carried
+along with the page text as an OcrText.
+"""
+
+import logging
+import threading
+from collections.abc import Iterable
+from typing import Any
+
+import pytesseract
+from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:  # pragma: no cover - depends on the build environment
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+OCR_ENGINES = ("auto", "tesserocr", "pytesseract")
+
+OCR_LANGUAGE = "eng"
+
+_thread_state = threading.local()
+
+WordConfidences = tuple[tuple[str, float], ...]
+
+
+class OcrText(str):
+    """
+    Text read by OCR, with Tesseract's confidence (0-100) for each word.
+
+    A str, so OCR'd text is handled like any other page text; the word
+    confidences are lost once it is concatenated.
+    """
+
+    word_confidences: WordConfidences
+
+    def __new__(cls, text: str, word_confidences: Iterable[tuple[str, float]] = ()) -> "OcrText":
+        ocr_text = super().__new__(cls, text)
+        ocr_text.word_confidences = tuple(word_confidences)
+        return ocr_text
+
+
+def word_confidences_of(text: str) -> WordConfidences:
+    """Return the word confidences of OCR'd text, or none for other text."""
+    return getattr(text, "word_confidences", ())
+
+
+def resolve_ocr_engine(engine: str) -> str:
+    """
+    Resolve a configured OCR engine to the engine that will actually run.
+
+    "auto" picks tesserocr when it is installed and pytesseract otherwise.
+    """
+    if engine not in OCR_ENGINES:
+        raise ValueError(
+            f"Unknown OCR engine '{engine}'. Expected one of: {', '.join(OCR_ENGINES)}"
+        )
+    if engine == "auto":
+        if tesserocr is None:
+            logger.warning("tesserocr is not installed, OCR falls back to pytesseract")
+            return "pytesseract"
+        return "tesserocr"
+    if engine == "tesserocr" and tesserocr is None:
+        raise ValueError("OCR engine 'tesserocr' requested but tesserocr is not installed")
+    return engine
+
+
+def _get_tesserocr_api() -> Any | None:
+    """
+    Return this thread's Tesseract engine, initializing it on first use.
+
+    Returns None if the engine cannot be initialized (e.g. missing language
+    data), in which case the thread falls back to pytesseract.
+    """
+    if getattr(_thread_state, "init_failed", False):
+        return None
+
+    api = getattr(_thread_state, "api", None)
+    if api is None:
+        try:
+            api = tesserocr.PyTessBaseAPI(lang=OCR_LANGUAGE)
+        except RuntimeError as e:
+            logger.warning(f"Could not start tesserocr engine, falling back to pytesseract: {e}")
+            _thread_state.init_failed = True
+            return None
+        _thread_state.api = api
+    return api
+
+
+def _text_from_data(data: dict[str, list[Any]]) -> OcrText:
+    """
+    Rebuild page text and word confidences from pytesseract's image_to_data output.
+
+    Words of a line are joined by spaces, lines by newlines and paragraphs by
+    a blank line, as Tesseract lays out its plain text output.
+    """
+    paragraphs: list[list[str]] = []
+    words: list[tuple[str, float]] = []
+    line_key = paragraph_key = None
+
+    for i, word in enumerate(data["text"]):
+        confidence = float(data["conf"][i])
+        if confidence < 0 or not word.strip():
+            continue
+        words.append((word, confidence))
+
+        if (data["block_num"][i], data["par_num"][i]) != paragraph_key:
+            paragraph_key = (data["block_num"][i], data["par_num"][i])
+            paragraphs.append([])
+            line_key = None
+        if data["line_num"][i] != line_key:
+            line_key = data["line_num"][i]
+            paragraphs[-1].append(word)
+        else:
+            paragraphs[-1][-1] += f" {word}"
+
+    return OcrText("\n\n".join("\n".join(lines) for lines in paragraphs), words)
+
+
+def image_to_string(image: Image.Image, engine: str = "pytesseract") -> OcrText:
+    """OCR a preprocessed page image with a resolved engine."""
+    if engine == "tesserocr":
+        api = _get_tesserocr_api()
+        if api is not None:
+            api.SetImage(image)
+            return OcrText(api.GetUTF8Text(), api.MapWordConfidences())
+
+    return _text_from_data(pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT))
@@ -1,15 +1,16 @@
 import logging
-import tempfile
-from pathlib import Path
 from typing import Any
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 from pydantic import BaseModel, Field
 
-from app.audit_engine import AuditEngine
+from app.audit_engine import DEFAULT_CONTRACT_RULES, AuditEngine
+from app.dependencies import get_document_processor, get_extraction_executor
 from app.document_processor import DocumentProcessor
+from app.extraction_executor import ExtractionCapacityError, ExtractionExecutor
 from app.security import validate_file_upload, verify_api_key
 from app.settings import settings
+from app.uploads import extract_upload, read_upload
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +26,9 @@ class ExtractResponse(BaseModel):
 
     success: bool
     data: dict[str, Any]
+    confidence: float | None = Field(
+        None, description="Overall extraction confidence (0-1); per-field detail is in data"
+    )
     message: str | None = None
 
 
@@ -71,8 +75,50 @@ class AuditResponse(BaseModel):
     message: str | None = None
 
 
+class BatchAuditItem(BaseModel):
+    """One invoice of a batch audit, with its reference shipment data."""
+
+    invoice_data: dict[str, Any] = Field(..., description="Extracted invoice data")
+    shipment_data: dict[str, Any] = Field(..., description="Reference shipment data")
+
+
+class BatchAuditRequest(BaseModel):
+    """Request model for the batch invoice audit endpoint."""
+
+    items: list[BatchAuditItem] = Field(
+        ...,
+        description="Invoices to audit against the same contract",
+        max_length=settings.audit_batch_max_items,
+    )
+    contract_rules: dict[str, Any] | None = Field(
+        None,
+        description="Contract rules to validate against (optional, uses defaults if not provided)",
+    )
+
+
+class BatchAuditResult(BaseModel):
+    """Audit outcome of one invoice of a batch."""
+
+    anomalies: list[dict[str, Any]]
+    anomaly_count: int
+
+
+class BatchAuditResponse(BaseModel):
+    """Response model for the batch invoice audit endpoint."""
+
+    success: bool
+    results: list[BatchAuditResult] = Field(..., description="One result per item, in order")
+    invoice_count: int
+    anomaly_count: int
+    message: str | None = None
+
+
 @router.post("/extract", response_model=ExtractResponse)
-async def extract_invoice(file: UploadFile = File(...)) -> ExtractResponse:
+async def extract_invoice(
+    file: UploadFile = File(...),
+    processor: DocumentProcessor = Depends(get_document_processor),
+    executor: ExtractionExecutor = Depends(get_extraction_executor),
+) -> ExtractResponse:
     """
     Extract structured data from a freight invoice PDF.
 
@@ -96,52 +142,41 @@ async def extract_invoice(file: UploadFile = File(...)) -> ExtractResponse:
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
 
-    tmp_path = None
     try:
-        # Read file content with size limit
-        content = await file.read(settings.max_upload_size + 1)
-        if len(content) > settings.max_upload_size:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File size exceeds maximum allowed size of {settings.max_upload_size / (1024 * 1024):.1f}MB",
-            )
-
-        # Save uploaded file to temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
-
-        logger.info(f"Saved temporary file: {tmp_path}")
-
-        # Process the invoice
-        processor = DocumentProcessor()
-        extracted_data = processor.process_invoice(tmp_path)
+        # Read file content in chunks, rejecting it as soon as it exceeds the size limit
+        upload = await read_upload(file, settings.max_upload_size)
 
-        # Clean up temporary file
-        Path(tmp_path).unlink(missing_ok=True)
+        # Extraction blocks on PDF parsing and OCR, so it runs on the bounded executor
+        extracted_data = await executor.run(extract_upload, processor, upload)
 
         # Check if extraction was successful
-        if not any(extracted_data.values()):
+        confidence = extracted_data.get("confidence")
+        if not any(extracted_data.get(field) for field in processor.field_patterns):
             return ExtractResponse(
                 success=False,
                 data=extracted_data,
+                confidence=confidence,
                 message="No data could be extracted from the PDF. The document may be empty or unreadable.",
             )
 
         return ExtractResponse(
-            success=True, data=extracted_data, message="Invoice data extracted successfully"
+            success=True,
+            data=extracted_data,
+            confidence=confidence,
+            message="Invoice data extracted successfully",
         )
 
     except HTTPException:
         raise
+    except ExtractionCapacityError as e:
+        logger.warning(f"Rejecting upload, {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Invoice extraction is at capacity. Please retry shortly.",
+            headers={"Retry-After": str(settings.extraction_retry_after)},
+        ) from e
     except Exception as e:
         logger.error(f"Error processing invoice: {e}", exc_info=True)
-        # Clean up temporary file on error
-        if tmp_path:
-            try:
-                Path(tmp_path).unlink(missing_ok=True)
-            except Exception:
-                pass
 
         if settings.is_production and not settings.debug:
             raise HTTPException(status_code=500, detail="Error processing invoice")
@@ -164,12 +199,7 @@ async def audit_invoice(request: AuditRequest) -> AuditResponse:
     logger.info("Starting invoice audit")
 
     # Use default contract rules if not provided
-    contract_rules = request.contract_rules or {
-        "carrier_name": "ROADWAY EXPRESS",
-        "max_rate_per_mile": 3.50,
-        "allowed_accessorials": ["FUEL SURCHARGE"],
-        "min_string_similarity": 0.8,
-    }
+    contract_rules = request.contract_rules or DEFAULT_CONTRACT_RULES
 
     try:
         # Initialize audit engine
@@ -190,3 +220,42 @@ async def audit_invoice(request: AuditRequest) -> AuditResponse:
     except Exception as e:
         logger.error(f"Error during audit: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error during audit: {str(e)}")
+
+
+@router.post("/audit/batch", response_model=BatchAuditResponse)
+def audit_invoice_batch(request: BatchAuditRequest) -> BatchAuditResponse:
+    """
+    Audit many invoices against one contract, e.g. a carrier's monthly statement.
+
+    Runs the same checks as /invoice/audit on each item, with the contract
+    rules normalized once for the whole batch. Results are returned in the
+    order of the items.
+
+    Declared without async so the CPU-bound audit runs in the threadpool
+    instead of blocking the event loop.
+    """
+    logger.info(f"Starting batch audit of {len(request.items)} invoices")
+
+    contract_rules = request.contract_rules or DEFAULT_CONTRACT_RULES
+
+    try:
+        engine = AuditEngine(contract_rules)
+        results = engine.audit_batch(
+            (item.invoice_data, item.shipment_data) for item in request.items
+        )
+    except Exception as e:
+        logger.error(f"Error during batch audit: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error during batch audit: {str(e)}") from e
+
+    anomaly_count = sum(map(len, results))
+    return BatchAuditResponse(
+        success=True,
+        results=[
+            BatchAuditResult(anomalies=anomalies, anomaly_count=len(anomalies))
+            for anomalies in results
+        ],
+        invoice_count=len(results),
+        anomaly_count=anomaly_count,
+        message=f"Batch audit complete: {anomaly_count} anomalies detected "
+        f"across {len(results)} invoices",
+    )
@@ -1,21 +1,33 @@
 import logging
-import tempfile
 from datetime import datetime
-from pathlib import Path
 from typing import Any
-from uuid import UUID
-
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from uuid import UUID, uuid4
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.audit_engine import AuditEngine
+from app.bulk_upload import collect_bulk_entries, ingest_bulk_upload
 from app.crud import client_crud, invoice_crud
 from app.database import get_db
+from app.dependencies import get_document_processor, get_extraction_executor
 from app.document_processor import DocumentProcessor
+from app.extraction_executor import ExtractionCapacityError, ExtractionExecutor
+from app.jobs import INVOICE_STATUS_PROCESSING, enqueue_invoice_job, invoice_fields_from_extraction
 from app.models import Invoice
-from app.schemas import InvoiceCreate, InvoiceResponse, InvoiceUpdate
+from app.schemas import BulkUploadResponse, InvoiceCreate, InvoiceResponse, InvoiceUpdate
 from app.security import validate_file_upload, verify_api_key
 from app.settings import settings
+from app.uploads import extract_upload, read_upload
 
 logger = logging.getLogger(__name__)
 
@@ -49,10 +61,28 @@ async def create_invoice(
 @router.post("/upload", response_model=InvoiceResponse)
 async def upload_invoice(
     client_id: UUID,
+    response: Response,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    async_processing: bool = Query(
+        False, description="Return immediately and extract the invoice in the background"
+    ),
+    contract_id: UUID | None = Query(
+        None, description="Audit the extracted invoice against this contract (async only)"
+    ),
+    mileage: float | None = Query(None, description="Shipment mileage used by the audit"),
     db: AsyncSession = Depends(get_db),
+    processor: DocumentProcessor = Depends(get_document_processor),
+    executor: ExtractionExecutor = Depends(get_extraction_executor),
 ) -> InvoiceResponse:
-    """Upload and process a PDF invoice."""
+    """
+    Upload and process a PDF invoice.
+
+    With async_processing the invoice is created with status "processing" and
+    returned with 202 straight away; extraction (and, if contract_id is given,
+    the audit) runs on the task queue. Poll GET /api/invoices/{id} until the
+    status becomes "draft" (extracted) or "failed".
+    """
     logger.info(f"Uploading invoice for client: {client_id}")
 
     client = await client_crud.get(db, client_id)
@@ -64,43 +94,59 @@ async def upload_invoice(
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
 
-    tmp_path = None
     try:
-        content = await file.read(settings.max_upload_size + 1)
-        if len(content) > settings.max_upload_size:
+        # Read in chunks, hashing as we go and rejecting the file once it is too large
+        upload = await read_upload(file, settings.max_upload_size)
+        existing_invoice = await invoice_crud.get_by_duplicate_hash(db, upload.sha256)
+        if existing_invoice:
             raise HTTPException(
-                status_code=413,
-                detail=f"File size exceeds maximum allowed size of {settings.max_upload_size / (1024 * 1024):.1f}MB",
+                status_code=400,
+                detail=(
+                    "This file was already uploaded as invoice "
+                    f"{existing_invoice.invoice_number}"
+                ),
             )
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
-
-        logger.info(f"Processing PDF: {tmp_path}")
+        if async_processing:
+            # Placeholder number until extraction finds the real one
+            invoice = await invoice_crud.create(
+                db,
+                {
+                    "client_id": client_id,
+                    "invoice_number": f"PENDING-{uuid4().hex}",
+                    "amount": 0,
+                    "currency": "USD",
+                    "status": INVOICE_STATUS_PROCESSING,
+                    "issue_date": datetime.now(),
+                    "duplicate_hash": upload.sha256,
+                    "data": {"filename": file.filename},
+                },
+            )
+            await enqueue_invoice_job(
+                background_tasks,
+                processor,
+                executor,
+                invoice.id,
+                upload.data,
+                contract_id=contract_id,
+                shipment_data={"mileage": mileage} if mileage is not None else None,
+            )
+            logger.info(f"Queued invoice job {invoice.id} for {file.filename}")
 
-        processor = DocumentProcessor()
-        extracted_data = processor.process_invoice(tmp_path)
+            response.status_code = 202
+            return InvoiceResponse.model_validate(invoice)
 
-        Path(tmp_path).unlink(missing_ok=True)
+        logger.info(f"Processing PDF: {file.filename} ({upload.size} bytes)")
 
-        invoice_date = extracted_data.get("invoice_date")
-        if isinstance(invoice_date, str):
-            try:
-                issue_date = datetime.fromisoformat(invoice_date)
-            except (ValueError, TypeError):
-                issue_date = datetime.now()
-        else:
-            issue_date = invoice_date or datetime.now()
+        # Extraction blocks on PDF parsing and OCR, so it runs on the bounded executor
+        extracted_data = await executor.run(extract_upload, processor, upload)
 
         invoice_data = {
             "client_id": client_id,
-            "invoice_number": extracted_data.get("invoice_number", file.filename),
-            "amount": int(float(extracted_data.get("total_charge", 0)) * 100),
             "currency": "USD",
             "status": "draft",
-            "issue_date": issue_date,
-            "extracted_entities": extracted_data,
+            "duplicate_hash": upload.sha256,
+            **invoice_fields_from_extraction(extracted_data, file.filename),
         }
 
         invoice = await invoice_crud.create(db, invoice_data)
@@ -108,13 +154,47 @@ async def upload_invoice(
 
     except HTTPException:
         raise
+    except ExtractionCapacityError as e:
+        logger.warning(f"Rejecting upload, {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Invoice extraction is at capacity. Please retry shortly.",
+            headers={"Retry-After": str(settings.extraction_retry_after)},
+        ) from e
     except Exception as e:
         logger.error(f"Error uploading invoice: {e}", exc_info=True)
-        if tmp_path:
-            Path(tmp_path).unlink(missing_ok=True)
         raise HTTPException(status_code=500, detail="Error processing invoice")
 
 
+@router.post("/upload/bulk", response_model=BulkUploadResponse)
+async def upload_invoices_bulk(
+    client_id: UUID,
+    files: list[UploadFile] = File(..., description="PDF invoices and/or ZIP archives of PDFs"),
+    db: AsyncSession = Depends(get_db),
+    processor: DocumentProcessor = Depends(get_document_processor),
+    executor: ExtractionExecutor = Depends(get_extraction_executor),
+) -> BulkUploadResponse:
+    """
+    Upload many PDF invoices at once, directly or inside ZIP archives.
+
+    PDFs are extracted concurrently and stored in batched transactions. The
+    response lists every file (ZIP entries as "archive.zip/name.pdf") with
+    its status: "created", "duplicate" (invoice number already stored or
+    repeated in the upload), "rejected" (not a PDF or too large) or
+    "failed" (extraction error).
+    """
+    logger.info(f"Bulk uploading {len(files)} files for client: {client_id}")
+
+    client = await client_crud.get(db, client_id)
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    entries = collect_bulk_entries(files, settings.max_upload_size, settings.bulk_max_files)
+    return await ingest_bulk_upload(
+        db, client_id, entries, processor, executor, settings.bulk_insert_batch_size
+    )
+
+
 @router.get("", response_model=list[InvoiceResponse])
 async def list_invoices(
     client_id: UUID | None = Query(None),
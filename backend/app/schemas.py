@@ -88,6 +88,24 @@ class InvoiceResponse(InvoiceBase):
     updated_at: datetime
 
 
+class BulkUploadItem(BaseModel):
+    """Outcome of one file of a bulk invoice upload."""
+
+    filename: str
+    status: str  # created, duplicate, rejected or failed
+    invoice_id: UUID | None = None
+    invoice_number: str | None = None
+    detail: str | None = None
+
+
+class BulkUploadResponse(BaseModel):
+    """Per-file manifest of a bulk invoice upload."""
+
+    total: int
+    created: int
+    items: list[BulkUploadItem]
+
+
 # Contract Schemas
 class ContractBase(BaseModel):
     """Base contract schema."""
@@ -52,6 +52,46 @@ class Settings(BaseSettings):
     # File Upload
     max_upload_size: int = 10 * 1024 * 1024  # 10MB
     allowed_file_types: list[str] = [".pdf"]
+    bulk_max_files: int = 1000  # PDFs per bulk upload, counting ZIP entries
+    bulk_insert_batch_size: int = 100
+    audit_batch_max_items: int = 50000  # invoices per batch audit request
+
+    # Document Processing
+    ocr_workers: int = 1
+    ocr_render_backend: str = "pymupdf"
+    ocr_preprocess_profile: str = "auto"  # auto, fast or quality
+    ocr_min_dpi: int = 150
+    ocr_max_dpi: int = 300
+    layout_templates_path: str | None = None  # JSON file of OCR layout templates
+    field_extractors_path: str | None = None  # JSON file of carrier field extractors
+    ocr_engine: str = "auto"  # auto, tesserocr or pytesseract
+    # Reuse OCR output of page images seen before (0 disables); disk tier is optional
+    ocr_page_cache_entries: int = 0  # per OCR process
+    ocr_page_cache_dir: str | None = None
+    ocr_page_cache_max_disk_entries: int = 50000
+    # Re-read documents extracted with low confidence by slower, more accurate OCR
+    extraction_accurate_fallback: bool = False
+    extraction_low_confidence_threshold: float = 0.5
+    # Stop reading a document's pages once these fields are found with high confidence
+    extraction_early_page_termination: bool = False
+    extraction_required_fields: list[str] = [
+        "carrier_name",
+        "invoice_number",
+        "invoice_date",
+        "total_charge",
+        "shipment_reference",
+    ]
+    extraction_cache_backend: str = "none"  # none, disk or redis
+    extraction_cache_dir: str = "/tmp/tesseract-extraction-cache"
+    extraction_cache_max_entries: int = 10000
+    extraction_max_concurrency: int = 2
+    extraction_max_queue: int = 8
+    extraction_retry_after: int = 5  # seconds, sent with 503 when over capacity
+
+    # Task Queue
+    task_queue_backend: str = "inprocess"  # inprocess or celery
+    celery_broker_url: str | None = None  # defaults to redis_url; sqs:// for SQS/LocalStack
+    celery_result_backend: str | None = None
 
     # Logging
     log_level: str = "INFO"
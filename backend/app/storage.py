@@ -0,0 +1,61 @@
+"""
+S3 storage of uploaded PDFs awaiting processing by task queue workers.
+
+Broker messages only carry the object key: a 10 MB upload would not fit in
+a message (SQS caps them at 256 KB), and keeping messages small keeps the
+broker fast.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Any
+from uuid import UUID
+
+import boto3
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PENDING_UPLOAD_PREFIX = "pending-uploads"
+
+
+@lru_cache
+def get_s3_client() -> Any:
+    """Get the S3 client configured from settings, creating it on first use."""
+    return boto3.client(
+        "s3",
+        region_name=settings.aws_region,
+        endpoint_url=settings.aws_endpoint_url,
+        aws_access_key_id=settings.aws_access_key_id,
+        aws_secret_access_key=settings.aws_secret_access_key,
+    )
+
+
+def pending_upload_key(invoice_id: UUID) -> str:
+    """Object key under which an invoice's PDF waits for its job."""
+    return f"{PENDING_UPLOAD_PREFIX}/{invoice_id}.pdf"
+
+
+def put_pending_upload(key: str, pdf_bytes: bytes) -> None:
+    """Store an uploaded PDF for a worker to pick up. Blocking."""
+    get_s3_client().put_object(
+        Bucket=settings.s3_bucket_name,
+        Key=key,
+        Body=pdf_bytes,
+        ContentType="application/pdf",
+    )
+
+
+def get_pending_upload(key: str) -> bytes:
+    """Read a stored PDF back. Blocking."""
+    response = get_s3_client().get_object(Bucket=settings.s3_bucket_name, Key=key)
+    return response["Body"].read()
+
+
+def delete_pending_upload(key: str) -> None:
+    """Remove a stored PDF once its job has finished, logging rather than raising on failure."""
+    try:
+        get_s3_client().delete_object(Bucket=settings.s3_bucket_name, Key=key)
+    except Exception as e:
+        logger.warning(f"Could not delete pending upload {key}: {e}")
@@ -0,0 +1,89 @@
+"""
+Celery application and worker tasks.
+
+Run a worker with:
+    celery -A app.tasks worker --loglevel=info
+"""
+
+import asyncio
+import logging
+from typing import Any
+from uuid import UUID
+
+from celery import Celery
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.dependencies import create_document_processor
+from app.document_processor import DocumentProcessor
+from app.jobs import run_invoice_job
+from app.settings import settings
+from app.storage import delete_pending_upload, get_pending_upload
+
+logger = logging.getLogger(__name__)
+
+celery_app = Celery(
+    "tesseract",
+    broker=settings.celery_broker_url or settings.redis_url,
+    backend=settings.celery_result_backend,
+)
+celery_app.conf.update(
+    task_default_queue=settings.sqs_queue_name,
+    task_serializer="json",
+    accept_content=["json"],
+    result_serializer="json",
+    # Extraction jobs are long and CPU bound: take one at a time, ack on completion
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    broker_transport_options={"region": settings.aws_region},
+)
+
+# Each task runs in its own event loop, so connections must not be pooled across tasks
+_worker_engine = create_async_engine(settings.database_url, poolclass=NullPool)
+WorkerSessionLocal = sessionmaker(_worker_engine, class_=AsyncSession, expire_on_commit=False)
+
+_processor: DocumentProcessor | None = None
+
+
+def _get_processor() -> DocumentProcessor:
+    """Return this worker process's DocumentProcessor, creating it on first use."""
+    global _processor
+    if _processor is None:
+        _processor = create_document_processor()
+    return _processor
+
+
+@celery_app.task(name="invoices.process")
+def process_invoice_job(
+    invoice_id: str,
+    pdf_key: str,
+    contract_id: str | None = None,
+    shipment_data: dict[str, Any] | None = None,
+) -> None:
+    """
+    Extract an uploaded invoice stored under ``pdf_key``, optionally audit it,
+    and store the results. The stored PDF is deleted once they are saved.
+    """
+    logger.info(f"Processing invoice job {invoice_id}")
+
+    extracted_data = None
+    error = None
+    try:
+        extracted_data = _get_processor().process_invoice_bytes(get_pending_upload(pdf_key))
+    except Exception as e:
+        logger.error(f"Extraction failed for invoice job {invoice_id}: {e}", exc_info=True)
+        error = str(e)
+
+    asyncio.run(
+        run_invoice_job(
+            WorkerSessionLocal,
+            extracted_data,
+            UUID(invoice_id),
+            UUID(contract_id) if contract_id else None,
+            shipment_data,
+            error,
+        )
+    )
+    # Kept until now so a job redelivered after a worker crash can still read it
+    delete_pending_upload(pdf_key)
@@ -0,0 +1,119 @@
+"""Bulk scoring of extracted text quality, used to decide which pages need OCR."""
+
+import re
+import string
+from dataclasses import dataclass
+
+import numpy as np
+
+# Text shorter than this (ignoring surrounding whitespace) is treated as missing
+MIN_TEXT_LENGTH = 50
+
+# Below this share of letters and digits, text is treated as garbled
+MIN_ALNUM_RATIO = 0.3
+
+_ASCII_ALNUM = (string.ascii_letters + string.digits).encode("ascii")
+
+# Control characters other than whitespace
+_ASCII_CONTROL = bytes([*range(0x00, 0x09), *range(0x0E, 0x20), 0x7F])
+
+_ASCII_ALNUM_TABLE = np.zeros(128, dtype=bool)
+_ASCII_ALNUM_TABLE[list(_ASCII_ALNUM)] = True
+
+_ASCII_CONTROL_TABLE = np.zeros(128, dtype=bool)
+_ASCII_CONTROL_TABLE[list(_ASCII_CONTROL)] = True
+
+_WORD_PATTERN = re.compile(r"[A-Za-z]{2,}")
+
+# Common English and freight billing words. Text extracted through a broken
+# font encoding rarely spells them, even when it is mostly letters.
+INVOICE_VOCABULARY = frozenset(
+    """
+    a about account accessorial additional address amount and any are as at
+    balance bill billing bol by carrier charge charges check city class
+    consignee contact credit customer date days delivery description destination
+    detention discount due each express fee for freight from fuel hazmat in
+    inc invoice is item line lines llc lbs logistics miles mileage net no
+    number of on or order origin page paid pay payment per pickup please po
+    pro quantity rate reference remit ship shipment shipper state subtotal
+    surcharge tax terms the this to total trailer truck unit weight with zip
+    """.split()
+)
+
+
+@dataclass(frozen=True)
+class TextQualityScore:
+    """Quality measures of a piece of extracted text."""
+
+    length: int
+    stripped_length: int
+    alnum_ratio: float  # share of characters that are letters or digits
+    word_ratio: float  # share of words (2+ ASCII letters) in INVOICE_VOCABULARY
+    garbage_ratio: float  # share of control, private-use and replacement characters
+
+    @property
+    def is_poor(self) -> bool:
+        """Whether the text is too short or too garbled to trust without OCR."""
+        return self.stripped_length < MIN_TEXT_LENGTH or (
+            self.length > 0 and self.alnum_ratio < MIN_ALNUM_RATIO
+        )
+
+
+def score_text_quality(text: str) -> TextQualityScore:
+    """
+    Score extracted text without looping over it in Python.
+
+    ASCII text is counted with bytes.translate; other text is scored with
+    NumPy over its UTF-32 code points. Alphanumerics are counted exactly as
+    str.isalnum would count them.
+    """
+    length = len(text)
+
+    if text.isascii():
+        data = text.encode("ascii")
+        alnum_count = length - len(data.translate(None, _ASCII_ALNUM))
+        garbage_count = length - len(data.translate(None, _ASCII_CONTROL))
+    else:
+        alnum_count, garbage_count = _count_code_points(text)
+
+    words = _WORD_PATTERN.findall(text)
+    known_words = sum(word.lower() in INVOICE_VOCABULARY for word in words)
+
+    return TextQualityScore(
+        length=length,
+        stripped_length=len(text.strip()),
+        alnum_ratio=alnum_count / length if length else 0.0,
+        word_ratio=known_words / len(words) if words else 0.0,
+        garbage_ratio=garbage_count / length if length else 0.0,
+    )
+
+
+def _count_code_points(text: str) -> tuple[int, int]:
+    """Count alphanumeric and garbage characters of non-ASCII text."""
+    code_points = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    is_ascii = code_points < 128
+    ascii_points = code_points[is_ascii]
+    other_points = code_points[~is_ascii]
+
+    alnum_count = int(_ASCII_ALNUM_TABLE[ascii_points].sum())
+    # Only distinct non-ASCII characters are classified one by one
+    unique_points, counts = np.unique(other_points, return_counts=True)
+    alnum_count += int(
+        sum(
+            count
+            for point, count in zip(unique_points.tolist(), counts.tolist(), strict=True)
+            if chr(point).isalnum()
+        )
+    )
+
+    garbage_count = int(_ASCII_CONTROL_TABLE[ascii_points].sum())
+    garbage_count += int(
+        np.count_nonzero(
+            (other_points <= 0x9F)  # C1 control characters
+            | (other_points == 0xFFFD)  # replacement character
+            | ((other_points >= 0xE000) & (other_points <= 0xF8FF))  # private use area
+            | ((other_points >= 0xD800) & (other_points <= 0xDFFF))  # lone surrogates
+        )
+    )
+
+    return alnum_count, garbage_count
@@ -0,0 +1,90 @@
+"""Chunked reading of uploaded files with incremental size checks and hashing."""
+
+import hashlib
+from dataclasses import dataclass
+from typing import IO, Any
+
+from fastapi import HTTPException, UploadFile
+
+from app.document_processor import DocumentProcessor
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+class UploadTooLargeError(HTTPException):
+    """Raised as soon as an upload grows past the size limit."""
+
+    def __init__(self, max_size: int) -> None:
+        super().__init__(
+            status_code=413,
+            detail=f"File size exceeds maximum allowed size of {max_size / (1024 * 1024):.1f}MB",
+        )
+
+
+@dataclass(frozen=True)
+class ReceivedUpload:
+    """An uploaded file read into memory, with its SHA-256."""
+
+    data: bytes
+    sha256: str
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+class _UploadReader:
+    """Collects chunks in memory, enforcing the size limit and hashing as it goes."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.chunks: list[bytes] = []
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise UploadTooLargeError(self.max_size)
+        self.digest.update(chunk)
+        self.chunks.append(chunk)
+
+    def finish(self) -> ReceivedUpload:
+        return ReceivedUpload(b"".join(self.chunks), self.digest.hexdigest())
+
+
+async def read_upload(
+    file: UploadFile, max_size: int, chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> ReceivedUpload:
+    """
+    Read an uploaded file chunk by chunk into memory.
+
+    Raises UploadTooLargeError (413) at the first chunk that crosses
+    ``max_size``, without reading the rest of the file. The chunks come
+    straight from Starlette's spool and are only joined once complete, so
+    the file is not copied to another temporary file.
+    """
+    reader = _UploadReader(max_size)
+    while chunk := await file.read(chunk_size):
+        reader.write(chunk)
+    return reader.finish()
+
+
+def read_stream(
+    stream: IO[bytes], max_size: int, chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> ReceivedUpload:
+    """Like read_upload, for a synchronous binary stream such as a ZIP entry."""
+    reader = _UploadReader(max_size)
+    while chunk := stream.read(chunk_size):
+        reader.write(chunk)
+    return reader.finish()
+
+
+def extract_upload(processor: DocumentProcessor, upload: ReceivedUpload) -> dict[str, Any]:
+    """
+    Extract a received PDF upload.
+
+    Blocking: meant to run on the extraction executor. The upload's digest
+    is reused for the extraction cache.
+    """
+    return processor.process_invoice_bytes(upload.data, pdf_digest=upload.sha256)
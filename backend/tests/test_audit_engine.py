@@ -1,5 +1,6 @@
 import pytest
 
+from app import audit_engine
 from app.audit_engine import AuditEngine
 
 
@@ -292,6 +293,80 @@ class TestAuditEngine:
         rate_anomalies = [a for a in anomalies if a["type"] == "RATE_OVERAGE"]
         assert len(rate_anomalies) == 0, "Exact rate match should not trigger anomaly"
 
+    def test_batch_audit_matches_single_audits(self) -> None:
+        """
+        Test that a batch audit returns, in order, what auditing each invoice alone does.
+        """
+        # Arrange
+        engine = AuditEngine({"carrier_name": "ROADWAY EXPRESS", "max_rate_per_mile": 3.50})
+        pairs = [
+            ({"carrier_name": "ROADWAY EXPRESS", "total_charge": 1575.00}, {"mileage": 450}),
+            ({"carrier_name": "ROADWAY EXPRESS", "total_charge": 1857.50}, {"mileage": 450}),
+            ({"carrier_name": "SWIFT LOGISTICS", "total_charge": 20000.00}, {"mileage": 450}),
+            ({"carrier_name": "ROADWAY EXPRESS", "total_charge": "n/a"}, {"mileage": -5}),
+            ({"invoice_number": "INV-001"}, {}),
+        ]
+
+        # Act
+        batch = engine.audit_batch(pairs)
+        streamed = engine.iter_audit_batch(iter(pairs))
+
+        # Assert
+        expected = [engine.audit(invoice, shipment) for invoice, shipment in pairs]
+        assert batch == expected
+        assert next(streamed) == expected[0]
+        assert list(streamed) == expected[1:]
+
+    def test_columnar_batch_audit_matches_scalar_audit(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that the vectorized batch checks match the scalar ones across chunks and odd values.
+        """
+        # Arrange
+        monkeypatch.setattr(audit_engine, "AUDIT_CHUNK_SIZE", 4)
+        engine = AuditEngine({"carrier_name": "ROADWAY EXPRESS", "max_rate_per_mile": 3.50})
+        charges = [1575.00, 1857.50, "1857.50", -20.0, 90000.0, "n/a", 1e308, 0.01]
+        mileages = [450, 450, "450", 450, -5, 450, 1e-300, "abc"]
+        pairs = [
+            ({"carrier_name": "ROADWAY EXPRESS", "total_charge": charge}, {"mileage": mileage})
+            for charge in charges
+            for mileage in mileages
+        ]
+
+        # Act
+        batch = engine.audit_batch(pairs)
+
+        # Assert
+        assert batch == [engine.audit(invoice, shipment) for invoice, shipment in pairs]
+        assert {anomaly["type"] for anomalies in batch for anomaly in anomalies} == {
+            "INVALID_DATA",
+            "RATE_OVERAGE",
+            "INVALID_CHARGE",
+            "SUSPICIOUS_CHARGE",
+        }
+
+    def test_carrier_similarity_is_memoized(self) -> None:
+        """
+        Test that repeated carrier spellings reuse the cached similarity.
+        """
+        # Arrange
+        audit_engine.carrier_similarity.cache_clear()
+        engine = AuditEngine({"carrier_name": "ROADWAY EXPRESS", "max_rate_per_mile": 3.50})
+        pairs = [
+            ({"carrier_name": carrier, "total_charge": 1575.00}, {"mileage": 450})
+            for carrier in ["ROADWAY EXPRESS", "Roadway Express Inc", "SWIFT LOGISTICS"] * 5
+        ]
+
+        # Act
+        results = engine.audit_batch(pairs)
+
+        # Assert
+        cache_info = audit_engine.carrier_similarity.cache_info()
+        assert (cache_info.misses, cache_info.hits) == (3, 12)
+        assert [len(anomalies) for anomalies in results] == [0, 0, 1] * 5
+        assert "similarity: 13.33%" in results[2][0]["detail"]
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,190 @@
+import asyncio
+import io
+import zipfile
+from datetime import UTC, datetime
+
+import fitz  # PyMuPDF
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app import bulk_upload
+from app.crud import client_crud, invoice_crud
+from app.settings import settings
+
+
+def _invoice_pdf(invoice_number: str, total: str) -> bytes:
+    doc = fitz.open()
+    doc.new_page(width=612, height=792).insert_text(
+        (50, 100),
+        f"Carrier: ROADWAY EXPRESS\nInvoice #: {invoice_number}\nTotal: ${total}",
+    )
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+def _zip_archive(files: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+class TestBulkUpload:
+    """Test suite for bulk invoice uploads."""
+
+    def test_bulk_upload_returns_manifest(
+        self,
+        api_client: TestClient,
+        session_factory: sessionmaker,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Test that PDFs and ZIP entries are extracted, stored in batches and reported per file.
+        """
+
+        # Arrange
+        async def create_client_with_invoice():
+            async with session_factory() as db:
+                client = await client_crud.create(
+                    db, {"name": "Test Client", "email": "bulk@example.com"}
+                )
+                await invoice_crud.create(
+                    db,
+                    {
+                        "client_id": client.id,
+                        "invoice_number": "INV-EXIST",
+                        "amount": 100,
+                        "issue_date": datetime.now(UTC),
+                    },
+                )
+                return client
+
+        client_row = asyncio.run(create_client_with_invoice())
+        monkeypatch.setattr(settings, "bulk_insert_batch_size", 2)
+
+        archive = _zip_archive(
+            {
+                "march/INV-C.pdf": _invoice_pdf("INV-C", "300.00"),
+                "march/INV-D.pdf": _invoice_pdf("INV-D", "400.00"),
+                "march/notes.txt": b"not an invoice",
+            }
+        )
+        files = [
+            ("files", ("a.pdf", _invoice_pdf("INV-A", "1,575.00"), "application/pdf")),
+            ("files", ("b.pdf", _invoice_pdf("INV-EXIST", "200.00"), "application/pdf")),
+            ("files", ("a-copy.pdf", _invoice_pdf("INV-A", "1,575.00"), "application/pdf")),
+            ("files", ("march.zip", archive, "application/zip")),
+            ("files", ("photo.png", b"\x89PNG", "image/png")),
+        ]
+
+        # Act
+        response = api_client.post(
+            f"/api/invoices/upload/bulk?client_id={client_row.id}", files=files
+        )
+
+        # Assert: one manifest item per file, in upload order
+        assert response.status_code == 200
+        manifest = response.json()
+        statuses = {item["filename"]: item["status"] for item in manifest["items"]}
+        assert [item["filename"] for item in manifest["items"]] == [
+            "a.pdf",
+            "b.pdf",
+            "a-copy.pdf",
+            "march.zip/march/INV-C.pdf",
+            "march.zip/march/INV-D.pdf",
+            "march.zip/march/notes.txt",
+            "photo.png",
+        ]
+        assert manifest["total"] == 7
+        assert manifest["created"] == 3
+        assert statuses["b.pdf"] == "duplicate"
+        assert sorted([statuses["a.pdf"], statuses["a-copy.pdf"]]) == ["created", "duplicate"]
+        assert statuses["march.zip/march/INV-C.pdf"] == "created"
+        assert statuses["march.zip/march/INV-D.pdf"] == "created"
+        assert statuses["march.zip/march/notes.txt"] == "rejected"
+        assert statuses["photo.png"] == "rejected"
+
+        async def stored_numbers():
+            async with session_factory() as db:
+                invoices = await invoice_crud.get_by_client_id(db, client_row.id)
+                return {invoice.invoice_number: invoice.amount for invoice in invoices}
+
+        assert asyncio.run(stored_numbers()) == {
+            "INV-EXIST": 100,
+            "INV-A": 157500,
+            "INV-C": 30000,
+            "INV-D": 40000,
+        }
+
+    def test_bulk_upload_skips_files_uploaded_before(
+        self,
+        api_client: TestClient,
+        session_factory: sessionmaker,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Test that a file whose hash is already stored is reported as a duplicate unextracted.
+        """
+
+        # Arrange
+        async def create_client():
+            async with session_factory() as db:
+                return await client_crud.create(
+                    db, {"name": "Test Client", "email": "bulk-hash@example.com"}
+                )
+
+        client_row = asyncio.run(create_client())
+        pdf = _invoice_pdf("INV-H", "50.00")
+        url = f"/api/invoices/upload/bulk?client_id={client_row.id}"
+        first = api_client.post(url, files=[("files", ("h.pdf", pdf, "application/pdf"))])
+        monkeypatch.setattr(
+            bulk_upload,
+            "extract_upload",
+            lambda *args: pytest.fail("A file uploaded before should not be extracted"),
+        )
+
+        # Act
+        response = api_client.post(url, files=[("files", ("h-again.pdf", pdf, "application/pdf"))])
+
+        # Assert
+        assert first.json()["created"] == 1
+        [item] = response.json()["items"]
+        assert item["status"] == "duplicate"
+        assert item["detail"] == "This file was already uploaded as invoice INV-H"
+
+    def test_bulk_upload_rejects_too_many_files(
+        self,
+        api_client: TestClient,
+        session_factory: sessionmaker,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Test that uploads with more PDFs than allowed are refused before extraction.
+        """
+
+        # Arrange
+        async def create_client():
+            async with session_factory() as db:
+                return await client_crud.create(
+                    db, {"name": "Test Client", "email": "bulk-limit@example.com"}
+                )
+
+        client_row = asyncio.run(create_client())
+        monkeypatch.setattr(settings, "bulk_max_files", 1)
+        archive = _zip_archive({"a.pdf": b"%PDF", "b.pdf": b"%PDF"})
+
+        # Act
+        response = api_client.post(
+            f"/api/invoices/upload/bulk?client_id={client_row.id}",
+            files=[("files", ("batch.zip", archive, "application/zip"))],
+        )
+
+        # Assert
+        assert response.status_code == 413
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,10 +1,23 @@
+import re
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import fitz  # PyMuPDF
+import numpy as np
 import pytest
 
-from app.document_processor import DocumentProcessor
+from app import document_processor
+from app.document_processor import DocumentProcessor, OcrOptions
+from app.field_extractors import CarrierExtractor, FieldExtractorRegistry, FieldPatternEngine
+from app.ocr_engines import OcrText
+
+
+def _fake_ocr_page(image: str, options: OcrOptions) -> str:
+    """Stand-in for the OCR worker; module-level so worker processes can unpickle it."""
+    return f"text of {image}"
 
 
 class TestDocumentProcessor:
@@ -32,7 +45,7 @@ class TestDocumentProcessor:
         """
 
         # Act
-        extracted = processor._extract_fields(sample_text)
+        extracted, _ = processor._score_fields([sample_text])
 
         # Assert
         assert extracted["carrier_name"] is not None
@@ -135,7 +148,7 @@ class TestDocumentProcessor:
         """
 
         # Act
-        extracted = processor._extract_fields(incomplete_text)
+        extracted, _ = processor._score_fields([incomplete_text])
 
         # Assert
         assert isinstance(extracted, dict), "Should return a dict"
@@ -161,11 +174,654 @@ class TestDocumentProcessor:
 
         # Act & Assert
         for text, expected_amount in test_cases:
-            extracted = processor._extract_fields(text)
+            extracted, _ = processor._score_fields([text])
             assert (
                 extracted["total_charge"] == expected_amount
             ), f"Failed to parse: {text} (expected {expected_amount}, got {extracted['total_charge']})"
 
+    def test_ocr_images_serial_with_single_worker(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Test that a single OCR worker processes pages in order without a pool.
+        """
+        # Arrange
+        monkeypatch.setattr(document_processor, "_ocr_page", _fake_ocr_page)
+        monkeypatch.setattr(
+            document_processor,
+            "ProcessPoolExecutor",
+            lambda *args, **kwargs: pytest.fail("Serial OCR should not start a process pool"),
+        )
+        processor = DocumentProcessor(ocr_workers=1)
+
+        # Act
+        page_texts = processor._ocr_images(iter(["page-1", "page-2", "page-3"]), 3)
+
+        # Assert
+        assert page_texts == ["text of page-1", "text of page-2", "text of page-3"]
+
+    def test_ocr_images_pooled_preserves_page_order(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Test that pooled OCR reassembles page text in page order.
+        """
+        # Arrange
+        monkeypatch.setattr(document_processor, "_ocr_page", _fake_ocr_page)
+        processor = DocumentProcessor(ocr_workers=3, ocr_window=2)
+        pages = (f"page-{i}" for i in range(1, 9))
+
+        # Act
+        with processor:
+            page_texts = processor._ocr_images(pages, 8)
+
+        # Assert
+        assert page_texts == [f"text of page-{i}" for i in range(1, 9)]
+
+    def test_ocr_pool_does_not_fork_the_server_process(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that OCR workers are started from a forkserver rather than forked directly.
+        """
+        # Arrange
+        pool_options = {}
+        monkeypatch.setattr(
+            document_processor,
+            "ProcessPoolExecutor",
+            lambda **kwargs: pool_options.update(kwargs),
+        )
+        processor = DocumentProcessor(ocr_workers=2)
+
+        # Act
+        processor._get_ocr_pool()
+
+        # Assert
+        assert pool_options["max_workers"] == 2
+        assert pool_options["mp_context"].get_start_method() == "forkserver"
+
+    def test_page_images_rendered_one_page_at_a_time(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Test that OCR rendering requests a single page per conversion call.
+        """
+        # Arrange
+        rendered_ranges = []
+
+        def fake_convert_from_path(pdf_path: str, **kwargs: int) -> list[str]:
+            rendered_ranges.append((kwargs["first_page"], kwargs["last_page"]))
+            return [f"page-{kwargs['first_page']}"]
+
+        monkeypatch.setattr(document_processor, "convert_from_path", fake_convert_from_path)
+        processor = DocumentProcessor(render_backend="pdf2image")
+
+        # Act
+        pages = processor._iter_page_images("invoice.pdf", [0, 1, 2], None)
+        first_page = next(pages)
+
+        # Assert: nothing beyond the first page is rendered until it is consumed
+        assert first_page == "page-1"
+        assert rendered_ranges == [(1, 1)]
+        assert list(pages) == ["page-2", "page-3"]
+        assert rendered_ranges == [(1, 1), (2, 2), (3, 3)]
+
+    def test_process_invoice_ocrs_only_poor_pages(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Test that only pages with poor direct text are sent to OCR.
+        """
+        # Arrange: a digital invoice page followed by an (empty) scanned page
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+            pdf_path = tmp_file.name
+
+        try:
+            doc = fitz.open()
+            page = doc.new_page(width=612, height=792)
+            page.insert_text(
+                (50, 100),
+                "Carrier: ROADWAY EXPRESS\nInvoice #: INV-2024-001\nInvoice Date: 01/15/2024",
+            )
+            doc.new_page(width=612, height=792)
+            doc.save(pdf_path)
+            doc.close()
+
+            ocr_requests = []
+
+            def fake_extract_pages_ocr(
+                path: str, page_indices: list[int], doc: fitz.Document, **options: object
+            ) -> list[str]:
+                ocr_requests.append(page_indices)
+                return ["PRO #: PRO-12345\nTotal: $1,575.00"]
+
+            processor = DocumentProcessor()
+            monkeypatch.setattr(processor, "_extract_pages_ocr", fake_extract_pages_ocr)
+
+            # Act
+            result = processor.process_invoice(pdf_path)
+
+            # Assert: only the scanned page was OCR'd and both pages contributed fields
+            assert ocr_requests == [[1]]
+            assert result["invoice_number"] == "INV-2024-001"
+            assert result["shipment_reference"] == "PRO-12345"
+            assert result["total_charge"] == 1575.00
+
+        finally:
+            Path(pdf_path).unlink(missing_ok=True)
+
+    def test_process_invoice_batch_splits_invoices(self) -> None:
+        """
+        Test that a bundle of invoices yields one result per invoice with its page range.
+        """
+        # Arrange: INV-001 spans two pages, INV-002 follows without a header,
+        # and a third invoice starts with a header
+        pages = [
+            "FREIGHT INVOICE (original)\nCarrier: ROADWAY EXPRESS\nInvoice #: INV-001\n"
+            "Invoice Date: 01/15/2024",
+            "Continued - Invoice #: INV-001\nLine haul and accessorial charges\n"
+            "Total: $1,575.00",
+            "Invoice #: INV-002\nShipment Reference: PRO-12345\nTotal: $980.00\n"
+            "Thank you for your business",
+            "FREIGHT INVOICE (original)\nCarrier: ACME FREIGHT LINES\nPayment due in 30 days\n"
+            "Total: $410.25",
+        ]
+        doc = fitz.open()
+        for page_text in pages:
+            doc.new_page(width=612, height=792).insert_text((50, 100), page_text)
+        pdf_bytes = doc.tobytes()
+        doc.close()
+        processor = DocumentProcessor()
+
+        # Act
+        results = processor.process_invoice_batch_bytes(pdf_bytes)
+        first = next(results)
+        remaining = list(results)
+
+        # Assert
+        assert (first["first_page"], first["last_page"]) == (1, 2)
+        assert first["invoice_number"] == "INV-001"
+        assert first["total_charge"] == 1575.00
+        assert [(r["first_page"], r["last_page"]) for r in remaining] == [(3, 3), (4, 4)]
+        assert remaining[0]["invoice_number"] == "INV-002"
+        assert remaining[0]["total_charge"] == 980.00
+        assert remaining[1]["total_charge"] == 410.25
+
+    def test_pymupdf_backend_renders_pages_to_arrays(self) -> None:
+        """
+        Test that the PyMuPDF backend rasterizes pages from the open document.
+        """
+        # Arrange
+        doc = fitz.open()
+        doc.new_page(width=612, height=792)
+        doc.new_page(width=612, height=792)
+        processor = DocumentProcessor(render_backend="pymupdf")
+
+        # Act
+        images = list(processor._iter_page_images("unused.pdf", [1], doc))
+        processed = processor._preprocess_image(images[0][:200, :100])
+        doc.close()
+
+        # Assert: one 300 DPI RGB page, accepted by OpenCV preprocessing
+        assert len(images) == 1
+        assert images[0].shape == (3300, 2550, 3)
+        assert processed.size == (100, 200)
+
+    def test_ocr_dpi_follows_text_size_and_scan_resolution(self) -> None:
+        """
+        Test that pages are rendered at the lowest DPI their text size or scan needs.
+        """
+        # Arrange
+        doc = fitz.open()
+        doc.new_page(width=612, height=792).insert_text(
+            (50, 100), "Invoice #: INV-2024-001", fontsize=12
+        )
+        doc.new_page(width=612, height=792).insert_text(
+            (50, 100), "Terms and conditions apply", fontsize=6
+        )
+        scan = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 1700, 2200), False)
+        scan.clear_with(255)
+        scan_page = doc.new_page(width=612, height=792)
+        scan_page.insert_image(scan_page.rect, pixmap=scan)
+        doc.new_page(width=612, height=792)
+        processor = DocumentProcessor()
+
+        # Act
+        dpis = [processor._choose_ocr_dpi(page) for page in doc]
+        doc.close()
+
+        # Assert: 12pt needs 180 DPI, 6pt is capped at the maximum, the scan
+        # at its native 200 DPI, and a page without hints uses the maximum
+        assert dpis == [180, 300, 200, 300]
+
+    def test_empty_fields_retry_one_page_at_max_dpi(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Test that a page OCR'd at reduced DPI is re-read at full DPI when no fields are found.
+        """
+        # Arrange: a page with too little direct text, rendered below the maximum DPI
+        doc = fitz.open()
+        doc.new_page(width=612, height=792).insert_text((50, 100), "~", fontsize=12)
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        ocr_requests = []
+
+        def fake_extract_pages_ocr(
+            source: bytes,
+            page_indices: list[int],
+            doc: fitz.Document | None = None,
+            dpi: int | None = None,
+            **options: object,
+        ) -> list[str]:
+            ocr_requests.append((page_indices, dpi))
+            return ["Invoice #: INV-2024-001" if dpi == 300 else "~"]
+
+        processor = DocumentProcessor()
+        monkeypatch.setattr(processor, "_extract_pages_ocr", fake_extract_pages_ocr)
+
+        # Act
+        result = processor.process_invoice_bytes(pdf_bytes)
+
+        # Assert
+        assert ocr_requests == [([0], None), ([0], 300)]
+        assert result["invoice_number"] == "INV-2024-001"
+
+    def test_high_confidence_direct_text_skips_ocr(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Test that OCR of poor pages is skipped when direct text yields every field confidently.
+        """
+        # Arrange: a complete digital invoice followed by an (empty) scanned page
+        doc = fitz.open()
+        doc.new_page(width=612, height=792).insert_text(
+            (50, 100),
+            "Carrier: ROADWAY EXPRESS\n1 Invoice #: INV-2024-001\nInvoice Date: 01/15/2024\n"
+            "PRO #: PRO-12345\nTotal: $1,575.00",
+        )
+        doc.new_page(width=612, height=792)
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        processor = DocumentProcessor()
+        monkeypatch.setattr(
+            processor,
+            "_extract_pages_ocr",
+            lambda *args, **kwargs: pytest.fail("High-confidence direct text should skip OCR"),
+        )
+
+        # Act
+        result = processor.process_invoice_bytes(pdf_bytes)
+
+        # Assert
+        assert result["carrier_name"] == "ROADWAY EXPRESS"
+        assert result["total_charge"] == 1575.00
+        assert result["confidence"] == 1.0
+        assert result["field_confidence"]["invoice_number"] == {
+            "score": 1.0,
+            "pattern_index": 0,
+            "format_valid": True,
+            "ocr_confidence": None,
+            "source": "text",
+        }
+
+    def test_low_confidence_documents_take_accurate_path(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that a low-confidence extraction is re-read with accurate OCR, keeping better fields.
+        """
+        # Arrange: a scanned page whose first OCR pass is uncertain
+        doc = fitz.open()
+        doc.new_page(width=612, height=792)
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        def ocr_text(text: str, confidence: float) -> OcrText:
+            return OcrText(text, [(word, confidence) for word in text.split()])
+
+        ocr_requests = []
+
+        def fake_extract_pages_ocr(
+            source: bytes,
+            page_indices: list[int] | None = None,
+            doc: fitz.Document | None = None,
+            dpi: int | None = None,
+            ocr_options: OcrOptions | None = None,
+            **options: object,
+        ) -> list[str]:
+            profile = ocr_options.preprocess_profile if ocr_options else None
+            ocr_requests.append((page_indices, dpi, profile))
+            if profile == "quality":
+                return [ocr_text("Invoice #: INV-2024-001\nTotal: $1,575.00\nPRO #: PRO-1", 93)]
+            return [ocr_text("Invoice #: INV-2O24-OO1\nTotal: $1,575.00", 40)]
+
+        processor = DocumentProcessor(accurate_fallback=True)
+        monkeypatch.setattr(processor, "_extract_pages_ocr", fake_extract_pages_ocr)
+
+        # Act
+        result = processor.process_invoice_bytes(pdf_bytes)
+
+        # Assert
+        assert ocr_requests == [([0], None, None), (None, 300, "quality")]
+        assert result["invoice_number"] == "INV-2024-001"
+        assert result["shipment_reference"] == "PRO-1"
+        assert result["field_confidence"]["total_charge"]["ocr_confidence"] == 0.93
+        assert result["field_confidence"]["carrier_name"]["score"] == 0.0
+
+    def test_accurate_path_adds_fields_of_a_carrier_it_detects(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that a carrier detected only by the accurate re-read contributes its own fields.
+        """
+        # Arrange: the first OCR pass misreads the carrier name
+        doc = fitz.open()
+        doc.new_page(width=612, height=792)
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        def fake_extract_pages_ocr(
+            source: bytes,
+            page_indices: list[int] | None = None,
+            doc: fitz.Document | None = None,
+            dpi: int | None = None,
+            ocr_options: OcrOptions | None = None,
+            **options: object,
+        ) -> list[str]:
+            if ocr_options and ocr_options.preprocess_profile == "quality":
+                text = "Carrier: ROADWAY EXPRESS\n1 Invoice #: INV-2024-001\nBOL: 778899"
+                return [OcrText(text, [(word, 93) for word in text.split()])]
+            text = "Carrier: R0ADWAY EXPRE5S\n1 Invoice #: INV-2O24-OO1"
+            return [OcrText(text, [(word, 40) for word in text.split()])]
+
+        registry = FieldExtractorRegistry(
+            [
+                CarrierExtractor(
+                    "roadway",
+                    "ROADWAY EXPRESS",
+                    field_patterns={"bol_number": [r"bol[:\s]*(\d+)"]},
+                )
+            ]
+        )
+        processor = DocumentProcessor(accurate_fallback=True, field_extractors=registry)
+        monkeypatch.setattr(processor, "_extract_pages_ocr", fake_extract_pages_ocr)
+
+        # Act
+        result = processor.process_invoice_bytes(pdf_bytes)
+
+        # Assert
+        assert result["invoice_number"] == "INV-2024-001"
+        assert result["bol_number"] == "778899"
+        assert result["field_confidence"]["bol_number"]["ocr_confidence"] == 0.93
+
+    def test_early_page_termination_stops_once_fields_are_found(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that incremental extraction stops reading pages once the required fields are found.
+        """
+        # Arrange: fields spread over pages 1 and 3 of a five-page statement
+        pages = [
+            "Carrier: ROADWAY EXPRESS\n1 Invoice #: INV-2024-001\nInvoice Date: 01/15/2024",
+            "",
+            "PRO #: PRO-12345\nTotal: $1,575.00\nLine haul and accessorial charges",
+            "Invoice #: INV-2024-999 appears on a later statement page",
+            "Remittance copy - please return with your payment",
+        ]
+        doc = fitz.open()
+        for page_text in pages:
+            doc.new_page(width=612, height=792).insert_text((50, 100), page_text)
+        pdf_bytes = doc.tobytes()
+
+        processor = DocumentProcessor(early_page_termination=True)
+        monkeypatch.setattr(
+            processor,
+            "_extract_pages_ocr",
+            lambda *args, **kwargs: pytest.fail("Pages before the stop need no OCR here"),
+        )
+
+        # Act
+        page_texts = processor._extract_pages_until_complete(doc)
+        first_page_only = DocumentProcessor(
+            early_page_termination=True, required_fields=["invoice_number"]
+        )._extract_pages_until_complete(doc)
+        result = processor.process_invoice_bytes(pdf_bytes)
+        doc.close()
+
+        # Assert
+        assert len(page_texts) == 3
+        assert len(first_page_only) == 1
+        assert result["invoice_number"] == "INV-2024-001"
+        assert result["shipment_reference"] == "PRO-12345"
+        assert result["total_charge"] == 1575.00
+
+    def test_early_page_termination_matches_a_full_read(self) -> None:
+        """
+        Test that a lower-priority match on an early page does not stop reading.
+        """
+        # Arrange: page 2 holds the reference matched by the first pattern
+        doc = fitz.open()
+        pages = [
+            "Invoice #: INV-2024-001\nRef: CUST-778\nLine haul and accessorial charges",
+            "PRO #: PRO-12345\nTotal: $1,575.00\nLine haul and accessorial charges",
+        ]
+        for page_text in pages:
+            doc.new_page(width=612, height=792).insert_text((50, 100), page_text)
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        # Act
+        early = DocumentProcessor(
+            early_page_termination=True, required_fields=["shipment_reference"]
+        ).process_invoice_bytes(pdf_bytes)
+        full = DocumentProcessor().process_invoice_bytes(pdf_bytes)
+
+        # Assert
+        assert full["shipment_reference"] == "PRO-12345"
+        assert early["shipment_reference"] == "PRO-12345"
+
+    def test_rejects_unknown_render_backend(self) -> None:
+        """
+        Test that an unsupported render backend is rejected up front.
+        """
+        with pytest.raises(ValueError, match="render backend"):
+            DocumentProcessor(render_backend="ghostscript")
+
+    def test_auto_preprocessing_denoises_only_noisy_pages(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that "auto" keeps clean renders on the fast path and denoises speckled scans.
+        """
+        # Arrange: a clean page with a text-like block, and the same page with salt noise
+        clean = np.full((200, 200, 3), 255, dtype=np.uint8)
+        clean[50:60, 20:180] = 0
+        noisy = clean.copy()
+        rng = np.random.default_rng(0)
+        rows, cols = rng.integers(0, 200, size=(2, 800))
+        noisy[rows, cols] = 0
+
+        denoised_calls = []
+        original_denoise = document_processor.cv2.fastNlMeansDenoising
+
+        def spy_denoise(*args, **kwargs):
+            denoised_calls.append(args[0].shape)
+            return original_denoise(*args, **kwargs)
+
+        monkeypatch.setattr(document_processor.cv2, "fastNlMeansDenoising", spy_denoise)
+
+        # Act
+        fast = DocumentProcessor._preprocess_image(clean, "auto")
+        assert denoised_calls == []
+        quality = DocumentProcessor._preprocess_image(noisy, "auto")
+
+        # Assert
+        assert denoised_calls == [(200, 200)]
+        assert fast.size == quality.size == (200, 200)
+        assert np.asarray(fast)[55, 100] == 0
+        assert np.asarray(fast)[150, 100] == 255
+
+    def test_rejects_unknown_preprocess_profile(self) -> None:
+        """
+        Test that an unsupported preprocessing profile is rejected up front.
+        """
+        with pytest.raises(ValueError, match="preprocess profile"):
+            DocumentProcessor(preprocess_profile="sharpest")
+
+    def test_pattern_engine_matches_sequential_search(self) -> None:
+        """
+        Test that the compiled engine keeps first-pattern-wins priority per field.
+        """
+        # Arrange
+        processor = DocumentProcessor()
+        texts = [
+            "Ref: R-1 then PRO # PRO-2",  # lower priority pattern appears first
+            "Balance: 10.00\nAmount Due: 20.00\nTotal: 30.00",
+            "12/01/2023 issued; Invoice Date: 01/15/2024",
+            "ACME FREIGHT LINES\nCarrier: ROADWAY EXPRESS",
+            "nothing to see here",
+        ]
+
+        for text in texts:
+            expected = {}
+            for field_name, patterns in processor.field_patterns.items():
+                match = next((m for p in patterns if (m := re.search(p, text, re.I | re.M))), None)
+                expected[field_name] = match.group(1).strip() if match else None
+
+            # Act & Assert
+            assert processor.pattern_engine.search(text) == expected, text
+
+    def test_pattern_engine_compiled_once_per_pattern_table(self) -> None:
+        """
+        Test that processors with the same pattern table share one compiled engine.
+        """
+        assert DocumentProcessor().pattern_engine is DocumentProcessor().pattern_engine
+        assert FieldPatternEngine.for_patterns({"f": [r"a(b)"]}) is not (
+            DocumentProcessor().pattern_engine
+        )
+
+    def test_process_invoice_bytes_matches_file_processing(self) -> None:
+        """
+        Test that an in-memory PDF is processed like the same PDF on disk.
+        """
+        # Arrange
+        doc = fitz.open()
+        page = doc.new_page(width=612, height=792)
+        page.insert_text(
+            (50, 100),
+            "Carrier: ROADWAY EXPRESS\nInvoice #: INV-2024-001\nTotal: $1,575.00",
+        )
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+            tmp_file.write(pdf_bytes)
+            pdf_path = tmp_file.name
+
+        try:
+            processor = DocumentProcessor()
+
+            # Act
+            from_bytes = processor.process_invoice_bytes(pdf_bytes)
+            from_file = processor.process_invoice(pdf_path)
+
+            # Assert
+            assert from_bytes == from_file
+            assert from_bytes["invoice_number"] == "INV-2024-001"
+
+        finally:
+            Path(pdf_path).unlink(missing_ok=True)
+
+    def test_pdf2image_backend_renders_buffers_from_memory(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that in-memory PDFs are rendered from bytes rather than a file path.
+        """
+        # Arrange
+        rendered_sources = []
+
+        def fake_convert_from_bytes(pdf_bytes: bytes, **kwargs: int) -> list[str]:
+            rendered_sources.append(pdf_bytes)
+            return ["page"]
+
+        monkeypatch.setattr(document_processor, "convert_from_bytes", fake_convert_from_bytes)
+        processor = DocumentProcessor(render_backend="pdf2image")
+
+        # Act
+        pages = list(processor._iter_page_images(b"%PDF-1.7", [0], None))
+
+        # Assert
+        assert pages == ["page"]
+        assert rendered_sources == [b"%PDF-1.7"]
+
+    def test_documents_pymupdf_cannot_open_are_ocrd_with_poppler(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that a PDF PyMuPDF cannot open is counted and rendered by poppler for OCR.
+        """
+        # Arrange
+        rendered_pages = []
+
+        def fake_convert_from_bytes(pdf_bytes: bytes, **kwargs: int) -> list[str]:
+            rendered_pages.append(kwargs["first_page"])
+            return [f"page-{kwargs['first_page']}"]
+
+        page_texts = {
+            "page-1": "Invoice #: INV-2024-001\nInvoice Date: 01/15/2024",
+            "page-2": "PRO #: PRO-12345\nTotal: $1,575.00",
+        }
+        monkeypatch.setattr(document_processor, "pdfinfo_from_bytes", lambda _: {"Pages": 2})
+        monkeypatch.setattr(document_processor, "convert_from_bytes", fake_convert_from_bytes)
+        processor = DocumentProcessor()
+        monkeypatch.setattr(
+            processor,
+            "_ocr_images",
+            lambda images, count, options: [page_texts[image] for image in images],
+        )
+
+        # Act
+        result = processor.process_invoice_bytes(b"%PDF-1.4 damaged beyond PyMuPDF's repair")
+
+        # Assert
+        assert rendered_pages == [1, 2]
+        assert result["invoice_number"] == "INV-2024-001"
+        assert result["shipment_reference"] == "PRO-12345"
+        assert result["total_charge"] == 1575.00
+
+    def test_pymupdf_is_used_by_one_thread_at_a_time(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Test that documents extracted on several threads never call into PyMuPDF concurrently.
+        """
+        # Arrange
+        doc = fitz.open()
+        for page_number in range(3):
+            doc.new_page(width=612, height=792).insert_text(
+                (50, 100), f"Carrier: ROADWAY EXPRESS\n{page_number} Invoice #: INV-2024-001"
+            )
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        active = 0
+        max_active = 0
+        counter_lock = threading.Lock()
+        original_get_text = fitz.Page.get_text
+
+        def tracking_get_text(page: fitz.Page, *args: object, **kwargs: object) -> object:
+            nonlocal active, max_active
+            with counter_lock:
+                active += 1
+                max_active = max(max_active, active)
+            time.sleep(0.005)
+            try:
+                return original_get_text(page, *args, **kwargs)
+            finally:
+                with counter_lock:
+                    active -= 1
+
+        monkeypatch.setattr(fitz.Page, "get_text", tracking_get_text)
+        processor = DocumentProcessor()
+
+        # Act
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(processor.process_invoice_bytes, [pdf_bytes] * 8))
+
+        # Assert
+        assert max_active == 1
+        assert all(result["invoice_number"] == "INV-2024-001" for result in results)
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,181 @@
+import os
+import tempfile
+from pathlib import Path
+
+import fitz  # PyMuPDF
+import pytest
+
+from app.document_processor import DocumentProcessor
+from app.extraction_cache import DiskExtractionCache, build_cache_key
+
+
+class TestExtractionCache:
+    """Test suite for the extraction result cache."""
+
+    def test_cache_key_depends_on_version_and_patterns(self) -> None:
+        """
+        Test that the cache key changes with the extractor version and field patterns.
+        """
+        # Arrange
+        patterns = {"invoice_number": [r"invoice\s*#?([A-Z0-9\-]+)"]}
+        key = build_cache_key("abc123", "1", patterns)
+
+        # Act & Assert
+        assert key == build_cache_key("abc123", "1", patterns)
+        assert key != build_cache_key("def456", "1", patterns)
+        assert key != build_cache_key("abc123", "2", patterns)
+        assert key != build_cache_key("abc123", "1", {"invoice_number": [r"inv([0-9]+)"]})
+
+    def test_disk_cache_round_trip_and_counters(self, tmp_path: Path) -> None:
+        """
+        Test that stored results are returned and hits/misses are counted.
+        """
+        # Arrange
+        cache = DiskExtractionCache(tmp_path)
+        result = {"invoice_number": "INV-001", "total_charge": 1575.0}
+
+        # Act
+        missing = cache.get("key-1")
+        cache.set("key-1", result)
+        cached = cache.get("key-1")
+
+        # Assert
+        assert missing is None
+        assert cached == result
+        assert cache.stats() == {"hits": 1, "misses": 1}
+
+    def test_disk_cache_evicts_least_recently_used(self, tmp_path: Path) -> None:
+        """
+        Test that the disk cache stays within its size bound, evicting the oldest entry.
+        """
+        # Arrange
+        cache = DiskExtractionCache(tmp_path, max_entries=2)
+        cache.set("old", {"value": 1})
+        cache.set("recent", {"value": 2})
+        os.utime(tmp_path / "old.json", (1, 1))
+        os.utime(tmp_path / "recent.json", (2, 2))
+
+        # Act
+        cache.set("new", {"value": 3})
+
+        # Assert
+        assert cache.get("old") is None
+        assert cache.get("recent") == {"value": 2}
+        assert cache.get("new") == {"value": 3}
+
+    def test_disk_cache_lists_directory_only_when_full(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that writes below the size bound do not scan the cache directory.
+        """
+        # Arrange
+        cache = DiskExtractionCache(tmp_path, max_entries=10)
+        evictions = []
+        evict = cache._evict
+        monkeypatch.setattr(cache, "_evict", lambda: evictions.append(1) or evict())
+
+        # Act
+        for i in range(10):
+            cache.set(f"key-{i}", {"value": i})
+        cache.set("key-0", {"value": 0})
+        full = len(evictions)
+        cache.set("key-10", {"value": 10})
+        cache.set("key-11", {"value": 11})
+
+        # Assert: one eviction frees headroom for the next write
+        assert full == 0
+        assert len(evictions) == 1
+        assert len(list(tmp_path.glob("*.json"))) == 10
+        assert DiskExtractionCache(tmp_path, max_entries=10)._entry_count == 10
+
+    def test_processor_serves_repeat_documents_from_cache(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that processing the same PDF twice only runs extraction once.
+        """
+        # Arrange
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+            pdf_path = tmp_file.name
+
+        try:
+            doc = fitz.open()
+            page = doc.new_page(width=612, height=792)
+            page.insert_text(
+                (50, 100),
+                "Carrier: ROADWAY EXPRESS\nInvoice #: INV-2024-001\nTotal: $1,575.00",
+            )
+            doc.save(pdf_path)
+            doc.close()
+
+            processor = DocumentProcessor(cache=DiskExtractionCache(tmp_path / "cache"))
+            first = processor.process_invoice(pdf_path)
+
+            monkeypatch.setattr(
+                processor,
+                "_process_document",
+                lambda path: pytest.fail("Cached document should not be re-extracted"),
+            )
+
+            # Act
+            second = processor.process_invoice(pdf_path)
+
+            # Assert
+            assert second == first
+            assert processor.cache is not None
+            assert processor.cache.stats() == {"hits": 1, "misses": 1}
+
+        finally:
+            Path(pdf_path).unlink(missing_ok=True)
+
+    def test_processor_does_not_cache_failed_ocr(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that a result read while OCR failed, or without any core field, is not cached.
+        """
+        # Arrange: a scanned page, which needs OCR
+        doc = fitz.open()
+        doc.new_page(width=612, height=792)
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        def failing_ocr_images(*args: object, **kwargs: object) -> list[str]:
+            raise RuntimeError("tesseract is not installed")
+
+        processor = DocumentProcessor(cache=DiskExtractionCache(tmp_path / "cache"))
+        monkeypatch.setattr(processor, "_ocr_images", failing_ocr_images)
+
+        # Act
+        processor.process_invoice_bytes(pdf_bytes)
+        monkeypatch.setattr(processor, "_ocr_images", lambda *args, **kwargs: ["Thank you"])
+        processor.process_invoice_bytes(pdf_bytes)
+
+        # Assert
+        assert list((tmp_path / "cache").glob("*.json")) == []
+
+    def test_cache_key_depends_on_ocr_settings(self) -> None:
+        """
+        Test that OCR settings that change extraction results change the cache key.
+        """
+        # Arrange
+        pdf_bytes = b"%PDF-1.7"
+        key = DocumentProcessor()._cache_key(pdf_bytes)
+
+        # Act
+        other_keys = [
+            DocumentProcessor(preprocess_profile="quality")._cache_key(pdf_bytes),
+            DocumentProcessor(ocr_max_dpi=200)._cache_key(pdf_bytes),
+            DocumentProcessor(ocr_min_dpi=50)._cache_key(pdf_bytes),
+            DocumentProcessor(render_backend="pdf2image")._cache_key(pdf_bytes),
+        ]
+
+        # Assert
+        assert key == DocumentProcessor()._cache_key(pdf_bytes)
+        assert key not in other_keys
+        assert len(set(other_keys)) == len(other_keys)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
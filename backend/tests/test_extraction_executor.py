@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.extraction_executor import ExtractionCapacityError, ExtractionExecutor
+
+
+class TestExtractionExecutor:
+    """Test suite for the bounded extraction executor."""
+
+    async def test_run_returns_result(self) -> None:
+        """
+        Test that jobs run on the pool and their result is awaited.
+        """
+        # Arrange
+        executor = ExtractionExecutor(max_concurrency=1, max_queue=0)
+
+        # Act
+        result = await executor.run(lambda a, b: a + b, 2, 3)
+
+        # Assert
+        assert result == 5
+        assert executor.in_flight == 0
+        executor.shutdown()
+
+    def test_rejects_jobs_beyond_capacity(self) -> None:
+        """
+        Test that submissions beyond concurrency plus queue depth fail fast.
+        """
+        # Arrange
+        release = threading.Event()
+        executor = ExtractionExecutor(max_concurrency=1, max_queue=1)
+        running = executor.submit(release.wait)
+        queued = executor.submit(release.wait)
+
+        # Act & Assert
+        with pytest.raises(ExtractionCapacityError):
+            executor.submit(release.wait)
+
+        release.set()
+        running.result(timeout=5)
+        queued.result(timeout=5)
+        assert executor.in_flight == 0
+
+        # Capacity is available again once jobs finish
+        assert executor.submit(lambda: "ok").result(timeout=5) == "ok"
+        executor.shutdown()
+
+    async def test_run_when_available_waits_for_capacity(self) -> None:
+        """
+        Test that waiting submissions run once a slot frees up instead of failing.
+        """
+        # Arrange
+        release = threading.Event()
+        executor = ExtractionExecutor(max_concurrency=1, max_queue=0)
+        running = executor.submit(release.wait)
+
+        # Act
+        waiting = asyncio.create_task(executor.run_when_available(lambda: "done"))
+        await asyncio.sleep(0.2)
+        assert not waiting.done()
+        release.set()
+
+        # Assert
+        assert await asyncio.wait_for(waiting, timeout=5) == "done"
+        assert running.result(timeout=5) is True
+        executor.shutdown()
+
+    async def test_run_when_available_sleeps_until_a_slot_is_released(self) -> None:
+        """
+        Test that a waiting submission retries only once a job finishes, without polling.
+        """
+        # Arrange
+        release = threading.Event()
+        executor = ExtractionExecutor(max_concurrency=1, max_queue=0)
+        running = executor.submit(release.wait)
+        attempts = []
+        submit = executor.submit
+
+        def counting_submit(fn, *args):
+            attempts.append(fn)
+            return submit(fn, *args)
+
+        executor.submit = counting_submit
+
+        # Act
+        waiting = asyncio.create_task(executor.run_when_available(lambda: "done"))
+        await asyncio.sleep(0.2)
+        attempts_while_busy = len(attempts)
+        release.set()
+        result = await asyncio.wait_for(waiting, timeout=5)
+
+        # Assert
+        assert attempts_while_busy == 1
+        assert len(attempts) == 2
+        assert result == "done"
+        assert running.result(timeout=5) is True
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,72 @@
+import pytest
+
+from app.field_confidence import (
+    FIELD_SOURCE_OCR,
+    FIELD_SOURCE_TEXT,
+    MISSING_FIELD,
+    document_confidence,
+    ocr_value_confidence,
+    score_field,
+    validate_field_format,
+)
+
+
+class TestFieldConfidence:
+    """Test suite for extracted field confidence scoring."""
+
+    def test_validates_field_formats(self) -> None:
+        """
+        Test format validation of cleaned field values.
+        """
+        # Act & Assert
+        assert validate_field_format("invoice_number", "INV-2024-001")
+        assert not validate_field_format("invoice_number", "From")
+        assert validate_field_format("invoice_date", "2024-03-15")
+        assert not validate_field_format("invoice_date", "31/31/2024")
+        assert not validate_field_format("invoice_date", "1899-01-01")
+        assert validate_field_format("total_charge", 1857.50)
+        assert not validate_field_format("total_charge", 0.0)
+        assert validate_field_format("carrier_name", "ROADWAY EXPRESS INC")
+        assert not validate_field_format("carrier_name", "R0ADWAY 3XPRESS")
+        assert not validate_field_format("shipment_reference", None)
+
+    def test_scores_pattern_rank_format_and_ocr_confidence(self) -> None:
+        """
+        Test that fallback patterns, invalid formats and uncertain OCR lower the score.
+        """
+        # Arrange
+        words = [("Invoice", 96.0), ("#:INV-2024-001", 62.0), ("Total:", 95.0)]
+
+        # Act
+        labelled = score_field("invoice_number", "INV-2024-001", "INV-2024-001", 0)
+        fallback = score_field("invoice_number", "INV-2024-001", "INV-2024-001", 1)
+        invalid = score_field("invoice_number", "From", "From", 0)
+        ocr = score_field("invoice_number", "INV-2024-001", "INV-2024-001", 0, words)
+        missing = score_field("invoice_number", None, None, None)
+
+        # Assert
+        assert labelled.score == 1.0
+        assert labelled.source == FIELD_SOURCE_TEXT
+        assert fallback.score == pytest.approx(0.85)
+        assert not invalid.format_valid
+        assert invalid.score == pytest.approx(0.4)
+        assert ocr.source == FIELD_SOURCE_OCR
+        assert ocr.ocr_confidence == pytest.approx(0.62)
+        assert ocr.score == pytest.approx(0.62)
+        assert missing == MISSING_FIELD
+        assert document_confidence([labelled, missing]) == 0.5
+
+    def test_ocr_value_confidence_uses_weakest_token(self) -> None:
+        """
+        Test that a value is only as certain as its least certain word.
+        """
+        # Arrange
+        words = [("ROADWAY", 91.0), ("ROADWAY", 40.0), ("EXPRESS", 77.0)]
+
+        # Act & Assert
+        assert ocr_value_confidence("ROADWAY EXPRESS", words) == pytest.approx(0.77)
+        assert ocr_value_confidence("PRO-12345", words) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,183 @@
+import json
+import re
+import tempfile
+from pathlib import Path
+
+import fitz  # PyMuPDF
+import pytest
+
+from app.document_processor import DocumentProcessor
+from app.field_extractors import (
+    CarrierExtractor,
+    FieldExtractorRegistry,
+    load_field_extractors,
+)
+
+
+def _registry() -> FieldExtractorRegistry:
+    return FieldExtractorRegistry(
+        [
+            CarrierExtractor("roadway", "ROADWAY EXPRESS", aliases=("ROADWAY",)),
+            CarrierExtractor("road-runner", "ROAD RUNNER"),
+            CarrierExtractor(
+                "acme",
+                "ACME FREIGHT LINES",
+                field_patterns={
+                    "shipment_reference": [r"bill\s*of\s*lading[:\s]*(\d+)"],
+                    "trailer_number": [r"trailer[:\s]*([A-Z0-9]+)"],
+                },
+            ),
+        ]
+    )
+
+
+class TestFieldExtractors:
+    """Test suite for the field extractor registry."""
+
+    def test_detects_carriers_by_name_or_alias(self) -> None:
+        """
+        Test that carrier detection matches whole names case-insensitively across line breaks.
+        """
+        # Arrange
+        registry = _registry()
+
+        # Act
+        detected = {
+            text: getattr(registry.detect_carrier(text), "name", None)
+            for text in [
+                "Remit to: the Roadway\nExpress company",
+                "Shipped via ROADWAY",
+                "ROADWAYS INC",
+                "Carrier: Road  Runner.",
+                "Carrier: ACME FREIGHT LINES, then ROADWAY",
+                "No carrier named here",
+            ]
+        }
+
+        # Assert
+        assert detected == {
+            "Remit to: the Roadway\nExpress company": "roadway",
+            "Shipped via ROADWAY": "roadway",
+            "ROADWAYS INC": None,
+            "Carrier: Road  Runner.": "road-runner",
+            "Carrier: ACME FREIGHT LINES, then ROADWAY": "acme",
+            "No carrier named here": None,
+        }
+        assert FieldExtractorRegistry().detect_carrier("ROADWAY EXPRESS") is None
+
+    def test_carrier_patterns_run_only_for_their_carrier(self) -> None:
+        """
+        Test that a detected carrier's patterns take priority and add fields for it alone.
+        """
+        # Arrange
+        processor = DocumentProcessor(field_extractors=_registry())
+        acme_text = "Carrier: ACME FREIGHT LINES\n1 Ref: R-1\nBill of Lading: 778899\nTrailer: T42"
+        other_text = "Carrier: ROADWAY EXPRESS\n1 Ref: R-1\nBill of Lading: 778899\nTrailer: T42"
+
+        # Act
+        acme, _ = processor._score_fields([acme_text])
+        other, _ = processor._score_fields([other_text])
+
+        # Assert
+        assert acme["shipment_reference"] == "778899"
+        assert acme["trailer_number"] == "T42"
+        assert other["shipment_reference"] == "R-1"
+        assert "trailer_number" not in other
+
+    def test_carrier_patterns_do_not_lower_generic_match_confidence(self) -> None:
+        """
+        Test that a generic pattern is scored by its rank among the generic patterns alone.
+        """
+        # Arrange
+        registry = FieldExtractorRegistry(
+            [
+                CarrierExtractor(
+                    "acme",
+                    "ACME FREIGHT LINES",
+                    field_patterns={
+                        "shipment_reference": [r"bol[:\s]*(\d+)", r"waybill[:\s]*(\d+)"]
+                    },
+                ),
+            ]
+        )
+        processor = DocumentProcessor(field_extractors=registry)
+
+        # Act
+        fields, confidences = processor._score_fields(
+            ["Carrier: ACME FREIGHT LINES\n1 PRO #: PRO-12345\nBOL: 778899"]
+        )
+
+        # Assert
+        assert fields["shipment_reference"] == "778899"
+        assert confidences["shipment_reference"].score == 1.0
+        fields, confidences = processor._score_fields(
+            ["Carrier: ACME FREIGHT LINES\n1 PRO #: PRO-12345"]
+        )
+        assert fields["shipment_reference"] == "PRO-12345"
+        assert confidences["shipment_reference"].score == 1.0
+        assert confidences["shipment_reference"].pattern_index == 0
+
+    def test_extracts_shipment_details_and_accessorials(self) -> None:
+        """
+        Test the generic origin, destination, distance and accessorial line items.
+        """
+        # Arrange
+        doc = fitz.open()
+        doc.new_page(width=612, height=792).insert_text(
+            (50, 100),
+            "Carrier: ROADWAY EXPRESS\n1 Invoice #: INV-2024-001\nOrigin: Chicago, IL\n"
+            "Destination: Denver, CO\nDistance: 450 miles\nLine Haul: $1,350.00\n"
+            "Fuel Surcharge: $225.00\nLiftgate Service  75.00\nTotal: $1,650.00",
+        )
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        # Act
+        result = DocumentProcessor().process_invoice_bytes(pdf_bytes)
+
+        # Assert
+        assert result["origin"] == "CHICAGO, IL"
+        assert result["destination"] == "DENVER, CO"
+        assert result["distance"] == 450.0
+        assert result["accessorials"] == [
+            {"description": "FUEL SURCHARGE", "amount": 225.0},
+            {"description": "LIFTGATE SERVICE", "amount": 75.0},
+        ]
+        assert result["field_confidence"]["distance"]["format_valid"]
+
+    def test_loads_extractors_from_json(self) -> None:
+        """
+        Test loading carrier extractors from a JSON file, and rejecting patterns without groups.
+        """
+        # Arrange
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(
+                [
+                    {
+                        "name": "acme",
+                        "carrier": "ACME FREIGHT LINES",
+                        "aliases": ["ACME"],
+                        "field_patterns": {"shipment_reference": [r"bol[:\s]*(\d+)"]},
+                    }
+                ],
+                f,
+            )
+
+        try:
+            # Act
+            registry = load_field_extractors(f.name)
+
+            # Assert
+            assert len(registry) == 1
+            assert registry.detect_carrier("acme").carrier == "ACME FREIGHT LINES"
+            assert registry.field_patterns(registry.extractors()[0])["shipment_reference"][0] == (
+                r"bol[:\s]*(\d+)"
+            )
+            with pytest.raises(ValueError, match=re.escape("no capture group")):
+                CarrierExtractor("bad", "BAD LINES", field_patterns={"total_charge": ["total"]})
+        finally:
+            Path(f.name).unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
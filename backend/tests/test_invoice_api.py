@@ -1,10 +1,14 @@
 import tempfile
+import threading
 from pathlib import Path
 
 import fitz  # PyMuPDF
 import pytest
 from fastapi.testclient import TestClient
 
+from app.dependencies import get_extraction_executor
+from app.document_processor import DocumentProcessor
+from app.extraction_executor import ExtractionExecutor
 from app.main import app
 
 client = TestClient(app)
@@ -220,6 +224,90 @@ class TestInvoiceAPI:
         missing_anomalies = [a for a in anomalies if a["type"] == "MISSING_FIELD"]
         assert len(missing_anomalies) > 0, "Should detect missing fields"
 
+    def test_batch_audit_endpoint(self) -> None:
+        """
+        Test that /invoice/audit/batch audits every item against one contract, in order.
+        """
+        # Arrange
+        request_data = {
+            "items": [
+                {
+                    "invoice_data": {"carrier_name": "ROADWAY EXPRESS", "total_charge": 1575.00},
+                    "shipment_data": {"mileage": 450},
+                },
+                {
+                    "invoice_data": {"carrier_name": "ROADWAY EXPRESS", "total_charge": 1857.50},
+                    "shipment_data": {"mileage": 450},
+                },
+                {"invoice_data": {"invoice_number": "INV-001"}, "shipment_data": {}},
+            ],
+            "contract_rules": {"carrier_name": "ROADWAY EXPRESS", "max_rate_per_mile": 3.50},
+        }
+
+        # Act
+        response = client.post("/invoice/audit/batch", json=request_data)
+
+        # Assert
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["success"] is True
+        assert data["invoice_count"] == 3
+        assert [result["anomaly_count"] for result in data["results"]] == [0, 1, 3]
+        assert data["results"][1]["anomalies"][0]["type"] == "RATE_OVERAGE"
+        assert data["anomaly_count"] == 4
+
+    def test_document_processor_is_application_scoped(self) -> None:
+        """
+        Test that the lifespan creates one DocumentProcessor shared by requests.
+        """
+        with TestClient(app) as lifespan_client:
+            processor = app.state.document_processor
+            assert isinstance(processor, DocumentProcessor)
+
+            response = lifespan_client.post(
+                "/invoice/extract",
+                files={"file": ("test.pdf", _build_invoice_pdf(), "application/pdf")},
+            )
+
+            assert response.status_code == 200
+            assert app.state.document_processor is processor
+
+    def test_extract_endpoint_rejects_when_at_capacity(self) -> None:
+        """
+        Test that extraction requests over capacity fail fast with 503.
+        """
+        # Arrange: a single-slot executor already busy with another job
+        release = threading.Event()
+        busy_executor = ExtractionExecutor(max_concurrency=1, max_queue=0)
+        busy_executor.submit(release.wait)
+        app.dependency_overrides[get_extraction_executor] = lambda: busy_executor
+
+        try:
+            # Act
+            response = client.post(
+                "/invoice/extract",
+                files={"file": ("test.pdf", _build_invoice_pdf(), "application/pdf")},
+            )
+
+            # Assert
+            assert response.status_code == 503
+            assert "Retry-After" in response.headers
+        finally:
+            app.dependency_overrides.pop(get_extraction_executor)
+            release.set()
+            busy_executor.shutdown()
+
+
+def _build_invoice_pdf() -> bytes:
+    """Build a one-page invoice PDF in memory."""
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    page.insert_text((50, 100), "FREIGHT INVOICE\nCarrier: ROADWAY EXPRESS\nTotal: $1,575.00")
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
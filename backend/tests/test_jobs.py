@@ -0,0 +1,272 @@
+"""Tests for asynchronous invoice ingestion jobs."""
+
+import asyncio
+import threading
+from datetime import UTC, datetime
+from uuid import uuid4
+
+import fitz  # PyMuPDF
+import pytest
+from fastapi import BackgroundTasks
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import jobs, tasks
+from app.crud import audit_result_crud, client_crud, contract_crud, invoice_crud
+from app.database import get_db
+from app.extraction_executor import ExtractionExecutor
+from app.main import app
+
+
+async def _create_processing_invoice(db: AsyncSession):
+    client = await client_crud.create(
+        db, {"name": "Test Client", "email": f"{uuid4().hex}@example.com"}
+    )
+    invoice = await invoice_crud.create(
+        db,
+        {
+            "client_id": client.id,
+            "invoice_number": f"PENDING-{uuid4().hex}",
+            "amount": 0,
+            "status": jobs.INVOICE_STATUS_PROCESSING,
+            "issue_date": datetime.now(UTC),
+        },
+    )
+    return client, invoice
+
+
+class TestInvoiceJobs:
+    """Test suite for invoice job completion."""
+
+    async def test_completed_job_updates_invoice_and_records_audit(
+        self, session_factory: sessionmaker
+    ) -> None:
+        """
+        Test that a finished job stores extracted data and the audit result.
+        """
+        # Arrange
+        async with session_factory() as db:
+            client, invoice = await _create_processing_invoice(db)
+            contract = await contract_crud.create(
+                db,
+                {
+                    "client_id": client.id,
+                    "contract_number": "CTR-001",
+                    "title": "Roadway contract",
+                    "start_date": datetime.now(UTC),
+                    "data": {"carrier_name": "ROADWAY EXPRESS", "max_rate_per_mile": 3.50},
+                },
+            )
+
+        extracted_data = {
+            "carrier_name": "ROADWAY EXPRESS",
+            "invoice_number": "INV-2024-001",
+            "invoice_date": "2024-01-15",
+            "total_charge": 1857.50,
+        }
+
+        # Act
+        await jobs.run_invoice_job(
+            session_factory, extracted_data, invoice.id, contract.id, {"mileage": 450}
+        )
+
+        # Assert
+        async with session_factory() as db:
+            stored = await invoice_crud.get(db, invoice.id)
+            assert stored.status == jobs.INVOICE_STATUS_EXTRACTED
+            assert stored.invoice_number == "INV-2024-001"
+            assert stored.amount == 185750
+
+            audit_results = await audit_result_crud.get_by_invoice_id(db, invoice.id)
+            assert len(audit_results) == 1
+            assert audit_results[0].status == "failed"
+            anomaly_types = [a["type"] for a in audit_results[0].findings["anomalies"]]
+            assert "RATE_OVERAGE" in anomaly_types
+
+    async def test_failed_extraction_marks_invoice_failed(
+        self, session_factory: sessionmaker
+    ) -> None:
+        """
+        Test that a job whose extraction failed leaves the invoice in "failed" with the error.
+        """
+        # Arrange
+        async with session_factory() as db:
+            _, invoice = await _create_processing_invoice(db)
+
+        # Act
+        await jobs.run_invoice_job(session_factory, None, invoice.id, error="corrupt PDF")
+
+        # Assert
+        async with session_factory() as db:
+            stored = await invoice_crud.get(db, invoice.id)
+            assert stored.status == jobs.INVOICE_STATUS_FAILED
+            assert stored.data["error"] == "corrupt PDF"
+
+    async def test_failed_upload_can_be_uploaded_again(self, session_factory: sessionmaker) -> None:
+        """
+        Test that a failed job releases its file hash, so the PDF is not rejected as a duplicate.
+        """
+        # Arrange
+        async with session_factory() as db:
+            _, invoice = await _create_processing_invoice(db)
+            await invoice_crud.update(db, invoice, {"duplicate_hash": "a" * 64})
+
+        # Act
+        await jobs.run_invoice_job(session_factory, None, invoice.id, error="OCR failed")
+
+        # Assert
+        async with session_factory() as db:
+            assert await invoice_crud.get_by_duplicate_hash(db, "a" * 64) is None
+            assert await invoice_crud.get_invoice_numbers_by_duplicate_hash(db, ["a" * 64]) == {}
+
+    async def test_in_process_job_waits_for_executor_capacity(
+        self, session_factory: sessionmaker, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that a queued job waits for a busy executor instead of failing the invoice.
+        """
+        # Arrange: a one-slot executor already running another job
+        async with session_factory() as db:
+            _, invoice = await _create_processing_invoice(db)
+        monkeypatch.setattr(jobs, "AsyncSessionLocal", session_factory)
+
+        release = threading.Event()
+        executor = ExtractionExecutor(max_concurrency=1, max_queue=0)
+        busy = executor.submit(release.wait)
+
+        class FakeProcessor:
+            def process_invoice_bytes(self, pdf_bytes: bytes) -> dict[str, object]:
+                return {"carrier_name": "ROADWAY EXPRESS", "invoice_number": "INV-QUEUED-1"}
+
+        # Act
+        job = asyncio.create_task(
+            jobs._run_in_process(FakeProcessor(), executor, invoice.id, b"%PDF", None, None)
+        )
+        await asyncio.sleep(0.1)
+        release.set()
+        await job
+        busy.result()
+        executor.shutdown()
+
+        # Assert
+        async with session_factory() as db:
+            stored = await invoice_crud.get(db, invoice.id)
+            assert stored.status == jobs.INVOICE_STATUS_EXTRACTED
+            assert stored.invoice_number == "INV-QUEUED-1"
+
+    async def test_celery_jobs_carry_the_stored_pdf_key(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that the Celery backend stores the PDF and enqueues only its key.
+        """
+        # Arrange
+        stored = {}
+        published = []
+        monkeypatch.setattr(jobs.settings, "task_queue_backend", "celery")
+        monkeypatch.setattr(jobs, "put_pending_upload", stored.__setitem__)
+        monkeypatch.setattr(
+            tasks.process_invoice_job, "delay", lambda *args: published.append(args)
+        )
+        invoice_id = uuid4()
+
+        # Act
+        await jobs.enqueue_invoice_job(
+            BackgroundTasks(), None, None, invoice_id, b"%PDF-1.7", shipment_data={"mileage": 450}
+        )
+
+        # Assert
+        pdf_key = f"pending-uploads/{invoice_id}.pdf"
+        assert stored == {pdf_key: b"%PDF-1.7"}
+        assert published == [(str(invoice_id), pdf_key, None, {"mileage": 450})]
+
+    def test_celery_task_reads_and_then_deletes_the_stored_pdf(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that a worker extracts the PDF stored under the job's key and deletes it afterwards.
+        """
+        # Arrange
+        calls = []
+
+        class FakeProcessor:
+            def process_invoice_bytes(self, pdf_bytes: bytes) -> dict[str, object]:
+                calls.append(("extract", pdf_bytes))
+                return {"invoice_number": "INV-1"}
+
+        async def fake_run_invoice_job(session_factory, extracted_data, *args) -> None:
+            calls.append(("store", extracted_data))
+
+        monkeypatch.setattr(tasks, "_get_processor", FakeProcessor)
+        monkeypatch.setattr(tasks, "get_pending_upload", lambda key: b"%PDF " + key.encode())
+        monkeypatch.setattr(
+            tasks, "delete_pending_upload", lambda key: calls.append(("delete", key))
+        )
+        monkeypatch.setattr(tasks, "run_invoice_job", fake_run_invoice_job)
+        invoice_id = str(uuid4())
+
+        # Act
+        tasks.process_invoice_job.run(invoice_id, "pending-uploads/a.pdf")
+
+        # Assert
+        assert calls == [
+            ("extract", b"%PDF pending-uploads/a.pdf"),
+            ("store", {"invoice_number": "INV-1"}),
+            ("delete", "pending-uploads/a.pdf"),
+        ]
+
+    def test_async_upload_returns_processing_invoice(
+        self, session_factory: sessionmaker, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that an async upload answers 202 "processing" and completes in the background.
+        """
+
+        # Arrange: route the API and the in-process job runner to the test database
+        async def override_get_db():
+            async with session_factory() as session:
+                yield session
+
+        async def create_client():
+            async with session_factory() as db:
+                return await client_crud.create(
+                    db, {"name": "Test Client", "email": "upload@example.com"}
+                )
+
+        client_row = asyncio.run(create_client())
+        monkeypatch.setattr(jobs, "AsyncSessionLocal", session_factory)
+        monkeypatch.setattr(jobs.settings, "task_queue_backend", "inprocess")
+        app.dependency_overrides[get_db] = override_get_db
+
+        doc = fitz.open()
+        page = doc.new_page(width=612, height=792)
+        page.insert_text(
+            (50, 100),
+            "Carrier: ROADWAY EXPRESS\nInvoice #: INV-ASYNC-1\nTotal: $1,575.00",
+        )
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        try:
+            api_client = TestClient(app)
+
+            # Act
+            response = api_client.post(
+                f"/api/invoices/upload?client_id={client_row.id}&async_processing=true",
+                files={"file": ("invoice.pdf", pdf_bytes, "application/pdf")},
+            )
+
+            # Assert: accepted immediately, then completed by the background job
+            assert response.status_code == 202
+            assert response.json()["status"] == jobs.INVOICE_STATUS_PROCESSING
+
+            polled = api_client.get(f"/api/invoices/{response.json()['id']}")
+            assert polled.json()["status"] == jobs.INVOICE_STATUS_EXTRACTED
+            assert polled.json()["invoice_number"] == "INV-ASYNC-1"
+        finally:
+            app.dependency_overrides.pop(get_db)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
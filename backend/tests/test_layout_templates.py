@@ -0,0 +1,158 @@
+import json
+from pathlib import Path
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+import pytest
+
+from app import document_processor
+from app.document_processor import DocumentProcessor, OcrOptions
+from app.layout_templates import (
+    LayoutRegion,
+    LayoutTemplate,
+    LayoutTemplateRegistry,
+    crop_regions,
+    load_layout_templates,
+    page_fingerprint,
+)
+
+HEADER = LayoutRegion("header", left=0.5, top=0.0, right=1.0, bottom=0.12)
+PRO_NUMBER = LayoutRegion("pro_number", left=0.0, top=0.1, right=0.4, bottom=0.18)
+TOTAL = LayoutRegion("total", left=0.6, top=0.85, right=1.0, bottom=0.95)
+
+
+def _boxed_page(height: int, width: int, boxes: list[tuple[float, float, float, float]]):
+    """Render a white page with black rectangles at normalized (left, top, right, bottom)."""
+    page = np.full((height, width, 3), 255, dtype=np.uint8)
+    for left, top, right, bottom in boxes:
+        page[int(top * height) : int(bottom * height), int(left * width) : int(right * width)] = 0
+    return page
+
+
+class TestLayoutTemplates:
+    """Test suite for region-of-interest OCR layout templates."""
+
+    def test_crop_regions_cuts_pixel_volume(self) -> None:
+        """
+        Test that stacking header, PRO and total regions keeps a fraction of the page.
+        """
+        # Arrange
+        page = np.zeros((3300, 2550, 3), dtype=np.uint8)
+
+        # Act
+        cropped = crop_regions(page, [HEADER, PRO_NUMBER, TOTAL])
+
+        # Assert: regions stacked in order, at least 5x fewer pixels than the page
+        assert cropped.shape[1] == 1275
+        assert cropped[:396].max() == 0
+        assert cropped[396:412].min() == 255
+        assert page.shape[0] * page.shape[1] / (cropped.shape[0] * cropped.shape[1]) >= 5
+
+    def test_registry_matches_fingerprint_across_resolutions(self) -> None:
+        """
+        Test that a layout is recognized from a page rendered at another DPI.
+        """
+        # Arrange
+        layout = [(0.05, 0.05, 0.45, 0.15), (0.6, 0.85, 0.95, 0.95), (0.05, 0.3, 0.95, 0.32)]
+        sample = _boxed_page(3300, 2550, layout)
+        template = LayoutTemplate(
+            "acme-freight", regions=(HEADER, TOTAL), fingerprint=page_fingerprint(sample)
+        )
+        registry = LayoutTemplateRegistry([template])
+
+        same_layout = cv2.resize(sample, (1275, 1650), interpolation=cv2.INTER_AREA)
+        other_layout = _boxed_page(1650, 1275, [(0.5, 0.5, 0.9, 0.9), (0.1, 0.6, 0.3, 0.7)])
+
+        # Act & Assert
+        assert registry.match(same_layout) == template
+        assert registry.match(other_layout) is None
+
+    def test_registry_prefers_carrier_templates(self) -> None:
+        """
+        Test that a template keyed by carrier applies whatever the page looks like.
+        """
+        # Arrange
+        template = LayoutTemplate("roadway", regions=(HEADER,), carrier="Roadway  Express")
+        registry = LayoutTemplateRegistry([template])
+        page = _boxed_page(100, 80, [])
+
+        # Act & Assert
+        assert registry.match(page, carrier="ROADWAY EXPRESS") == template
+        assert registry.match(page, carrier="ACME FREIGHT") is None
+        assert registry.match(page) is None
+
+    def test_load_layout_templates_from_json(self, tmp_path: Path) -> None:
+        """
+        Test that templates are loaded from a JSON file and invalid regions are rejected.
+        """
+        # Arrange
+        path = tmp_path / "layouts.json"
+        path.write_text(
+            json.dumps(
+                [
+                    {
+                        "name": "roadway",
+                        "carrier": "ROADWAY EXPRESS",
+                        "regions": [
+                            {
+                                "name": "header",
+                                "left": 0.5,
+                                "top": 0.0,
+                                "right": 1.0,
+                                "bottom": 0.12,
+                            }
+                        ],
+                    }
+                ]
+            )
+        )
+
+        # Act
+        registry = load_layout_templates(path)
+
+        # Assert
+        assert [template.name for template in registry.templates()] == ["roadway"]
+        assert registry.templates()[0].regions == (HEADER,)
+        with pytest.raises(ValueError, match="Invalid bounds"):
+            LayoutRegion("upside-down", left=0.0, top=0.5, right=1.0, bottom=0.1)
+
+    def test_processor_ocrs_template_regions_of_scanned_pages(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that a scanned page of a known carrier is cropped to its regions before OCR.
+        """
+        # Arrange: a digital cover page naming the carrier, then a (blank) scanned page
+        doc = fitz.open()
+        doc.new_page(width=612, height=792).insert_text(
+            (50, 100),
+            "Carrier: ROADWAY EXPRESS\n2 pages: bill of lading and delivery receipt",
+        )
+        doc.new_page(width=612, height=792)
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        ocr_shapes = []
+
+        def fake_ocr_page(image: np.ndarray, options: OcrOptions) -> str:
+            ocr_shapes.append(np.asarray(image).shape)
+            return "Invoice #: INV-2024-001"
+
+        monkeypatch.setattr(document_processor, "_ocr_page", fake_ocr_page)
+        registry = LayoutTemplateRegistry(
+            [LayoutTemplate("roadway", regions=(HEADER, TOTAL), carrier="ROADWAY EXPRESS")]
+        )
+        processor = DocumentProcessor(layout_templates=registry)
+
+        # Act
+        result = processor.process_invoice_bytes(pdf_bytes)
+
+        # Assert: only the two regions of the 300 DPI scan were OCR'd
+        assert ocr_shapes == [(396 + 16 + 330, 1275, 3)]
+        assert result["carrier_name"] == "ROADWAY EXPRESS"
+        assert result["invoice_number"] == "INV-2024-001"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,86 @@
+import tempfile
+
+import numpy as np
+import pytest
+
+from app import document_processor
+from app.document_processor import OcrOptions, _ocr_page
+from app.ocr_cache import OcrPageCache, OcrPageCacheConfig, page_cache_key
+from app.ocr_engines import OcrText
+
+
+def _page(value: int) -> np.ndarray:
+    return np.full((40, 30, 3), value, dtype=np.uint8)
+
+
+class TestOcrPageCache:
+    """Test suite for the OCR page-image cache."""
+
+    def test_memory_tier_evicts_least_recently_used(self) -> None:
+        """
+        Test that the in-memory tier keeps only its most recently used pages.
+        """
+        # Arrange
+        cache = OcrPageCache(OcrPageCacheConfig(max_entries=2))
+        cache.set("a", OcrText("page a"))
+        cache.set("b", OcrText("page b"))
+
+        # Act
+        cache.get("a")
+        cache.set("c", OcrText("page c"))
+
+        # Assert
+        assert cache.get("a") == "page a"
+        assert cache.get("b") is None
+        assert cache.get("c") == "page c"
+        assert cache.stats() == {"hits": 3, "misses": 1, "entries": 2}
+
+    def test_disk_tier_persists_across_processes(self) -> None:
+        """
+        Test that a fresh cache, as in another OCR worker, reads pages from the disk tier.
+        """
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            config = OcrPageCacheConfig(max_entries=10, directory=directory)
+            OcrPageCache(config).set("key", OcrText("Total: $10", [("Total:", 91.0)]))
+
+            # Act
+            cached = OcrPageCache(config).get("key")
+
+        # Assert
+        assert isinstance(cached, OcrText)
+        assert cached == "Total: $10"
+        assert cached.word_confidences == (("Total:", 91.0),)
+
+    def test_repeated_pages_are_ocrd_once(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Test that a page bitmap seen before is not preprocessed or OCR'd again.
+        """
+        # Arrange
+        calls = []
+
+        def fake_image_to_string(image: np.ndarray, engine: str) -> OcrText:
+            calls.append(engine)
+            return OcrText(f"page {len(calls)}", [("page", 95.0)])
+
+        monkeypatch.setattr(document_processor, "image_to_string", fake_image_to_string)
+        options = OcrOptions(
+            preprocess_profile="fast", page_cache=OcrPageCacheConfig(max_entries=10)
+        )
+
+        # Act
+        first = _ocr_page(_page(255), options)
+        repeated = _ocr_page(_page(255), options)
+        other = _ocr_page(_page(0), options)
+
+        # Assert
+        assert (first, repeated, other) == ("page 1", "page 1", "page 2")
+        assert repeated.word_confidences == (("page", 95.0),)
+        assert len(calls) == 2
+        assert page_cache_key(_page(255), "fast", "pytesseract") != page_cache_key(
+            _page(255), "quality", "pytesseract"
+        )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,134 @@
+import threading
+
+import pytest
+from PIL import Image
+
+from app import ocr_engines
+from app.document_processor import DocumentProcessor
+
+
+class FakeTessBaseAPI:
+    """Stand-in for tesserocr.PyTessBaseAPI that counts engine startups."""
+
+    instances: list["FakeTessBaseAPI"] = []
+
+    def __init__(self, lang: str) -> None:
+        self.lang = lang
+        self.images: list[Image.Image] = []
+        FakeTessBaseAPI.instances.append(self)
+
+    def SetImage(self, image: Image.Image) -> None:  # noqa: N802 - tesserocr API name
+        self.images.append(image)
+
+    def GetUTF8Text(self) -> str:  # noqa: N802 - tesserocr API name
+        return f"page {len(self.images)}"
+
+    def MapWordConfidences(self) -> list[tuple[str, int]]:  # noqa: N802 - tesserocr API name
+        return [("page", 96), (str(len(self.images)), 91)]
+
+
+class FakeTesserocr:
+    PyTessBaseAPI = FakeTessBaseAPI
+
+
+@pytest.fixture
+def fake_tesserocr(monkeypatch: pytest.MonkeyPatch):
+    """Install a fake tesserocr module and give each test fresh per-thread engines."""
+    FakeTessBaseAPI.instances = []
+    monkeypatch.setattr(ocr_engines, "tesserocr", FakeTesserocr)
+    monkeypatch.setattr(ocr_engines, "_thread_state", threading.local())
+    return FakeTesserocr
+
+
+class TestOcrEngines:
+    """Test suite for OCR engine selection and persistent Tesseract engines."""
+
+    def test_auto_engine_follows_tesserocr_availability(
+        self, fake_tesserocr: FakeTesserocr, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that "auto" uses tesserocr when installed and pytesseract otherwise.
+        """
+        # Act & Assert
+        assert ocr_engines.resolve_ocr_engine("auto") == "tesserocr"
+        assert DocumentProcessor(ocr_engine="auto").ocr_options.engine == "tesserocr"
+
+        monkeypatch.setattr(ocr_engines, "tesserocr", None)
+        assert ocr_engines.resolve_ocr_engine("auto") == "pytesseract"
+        with pytest.raises(ValueError, match="not installed"):
+            ocr_engines.resolve_ocr_engine("tesserocr")
+        with pytest.raises(ValueError, match="Unknown OCR engine"):
+            DocumentProcessor(ocr_engine="easyocr")
+
+    def test_tesserocr_engine_is_reused_per_thread(self, fake_tesserocr: FakeTesserocr) -> None:
+        """
+        Test that pages on one thread share a single engine, and other threads get their own.
+        """
+        # Arrange
+        page = Image.new("L", (10, 10), 255)
+
+        # Act
+        texts = [ocr_engines.image_to_string(page, "tesserocr") for _ in range(3)]
+        worker = threading.Thread(target=ocr_engines.image_to_string, args=(page, "tesserocr"))
+        worker.start()
+        worker.join()
+
+        # Assert
+        assert texts == ["page 1", "page 2", "page 3"]
+        assert texts[2].word_confidences == (("page", 96), ("3", 91))
+        assert len(FakeTessBaseAPI.instances) == 2
+        assert FakeTessBaseAPI.instances[0].lang == "eng"
+
+    def test_falls_back_to_pytesseract_when_engine_cannot_start(
+        self, fake_tesserocr: FakeTesserocr, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Test that a tesserocr startup failure falls back to the tesseract CLI.
+        """
+
+        # Arrange
+        def failing_api(lang: str) -> None:
+            raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+
+        monkeypatch.setattr(FakeTesserocr, "PyTessBaseAPI", failing_api)
+        cli_data = {
+            "block_num": [1, 1, 1],
+            "par_num": [1, 1, 1],
+            "line_num": [1, 1, 1],
+            "text": ["", "cli", "text"],
+            "conf": ["-1", "95.5", "88"],
+        }
+        monkeypatch.setattr(
+            ocr_engines.pytesseract, "image_to_data", lambda image, output_type: cli_data
+        )
+
+        # Act
+        text = ocr_engines.image_to_string(Image.new("L", (10, 10), 255), "tesserocr")
+
+        # Assert
+        assert text == "cli text"
+        assert text.word_confidences == (("cli", 95.5), ("text", 88.0))
+
+    def test_pytesseract_data_is_laid_out_as_text(self) -> None:
+        """
+        Test that text rebuilt from image_to_data keeps Tesseract's line and paragraph breaks.
+        """
+        # Arrange: two lines in one paragraph, then a second paragraph
+        data = {
+            "block_num": [1, 1, 1, 1, 1, 2, 2],
+            "par_num": [0, 1, 1, 1, 1, 1, 1],
+            "line_num": [0, 1, 1, 2, 2, 1, 1],
+            "text": ["", "Invoice", "#:", "Total:", "$10.00", "Thank", "you"],
+            "conf": [-1, 96, 90, 93, 71, 95, 95],
+        }
+
+        # Act
+        text = ocr_engines._text_from_data(data)
+
+        # Assert
+        assert text == "Invoice #:\nTotal: $10.00\n\nThank you"
+        assert dict(text.word_confidences)["$10.00"] == 71
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from app.text_quality import score_text_quality
+
+
+def _original_is_text_quality_poor(text: str) -> bool:
+    """The per-character heuristic the scorer replaces."""
+    if len(text.strip()) < 50:
+        return True
+
+    alphanumeric_count = sum(c.isalnum() for c in text)
+    if len(text) > 0 and (alphanumeric_count / len(text)) < 0.3:
+        return True
+
+    return False
+
+
+class TestTextQuality:
+    """Test suite for the bulk text quality scorer."""
+
+    def test_matches_per_character_heuristic(self) -> None:
+        """
+        Test that the decision and alnum counts match str.isalnum on mixed scripts.
+        """
+        # Arrange: ASCII, accented, CJK, superscript digits, controls and private-use glyphs
+        alphabet = (
+            "abcXYZ019 \n\t.,:$#-" "éÅßñ²½٣" "運送請求書" "\x00\x07\x85\ufffd\ue001\xa0\u2003"
+        )
+        rng = random.Random(0)
+
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 200)))
+
+            # Act
+            score = score_text_quality(text)
+
+            # Assert
+            assert score.is_poor == _original_is_text_quality_poor(text), repr(text)
+            expected_alnum = sum(c.isalnum() for c in text)
+            assert score.alnum_ratio == (expected_alnum / len(text) if text else 0.0)
+
+    def test_scores_clean_invoice_text(self) -> None:
+        """
+        Test the richer score of well-extracted invoice text.
+        """
+        # Arrange
+        text = "Carrier: ROADWAY EXPRESS\nInvoice #: INV-2024-001\nTotal Amount Due: $1,575.00\n"
+
+        # Act
+        score = score_text_quality(text)
+
+        # Assert
+        assert not score.is_poor
+        assert score.garbage_ratio == 0.0
+        # all words but ROADWAY and INV are in the vocabulary
+        assert score.word_ratio == pytest.approx(6 / 8)
+
+    def test_flags_broken_font_encoding(self) -> None:
+        """
+        Test that text extracted through a broken font encoding scores as garbage.
+        """
+        # Arrange: unmapped glyphs come out as private-use and replacement characters
+        text = "\ue041\ue042\ue043 \ufffd\ufffd " * 20
+
+        # Act
+        score = score_text_quality(text)
+
+        # Assert
+        assert score.is_poor
+        assert score.garbage_ratio == pytest.approx(5 / 7)
+        assert score.word_ratio == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import io
+
+import fitz  # PyMuPDF
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import client_crud, invoice_crud
+from app.uploads import UploadTooLargeError, read_upload
+
+
+class CountingStream(io.BytesIO):
+    """Binary stream that counts how many reads were made."""
+
+    def __init__(self, data: bytes) -> None:
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size: int = -1) -> bytes:
+        self.reads += 1
+        return super().read(size)
+
+
+class TestUploads:
+    """Test suite for chunked upload handling."""
+
+    async def test_read_upload_hashes_in_memory(self) -> None:
+        """
+        Test that uploads are hashed incrementally and read into one in-memory buffer.
+        """
+        # Arrange
+        data = b"%PDF-1.7 " + b"x" * (3 * 1024 * 1024)
+
+        # Act
+        upload = await read_upload(UploadFile(io.BytesIO(data)), len(data))
+
+        # Assert
+        assert upload.size == len(data)
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+        assert upload.data == data
+
+    async def test_read_upload_stops_at_size_limit(self) -> None:
+        """
+        Test that an oversize upload is rejected at the first chunk past the limit.
+        """
+        # Arrange
+        stream = CountingStream(b"x" * 10 * 1024)
+
+        # Act
+        with pytest.raises(UploadTooLargeError) as exc_info:
+            await read_upload(UploadFile(stream), max_size=2500, chunk_size=1024)
+
+        # Assert: three 1KB chunks read out of ten
+        assert exc_info.value.status_code == 413
+        assert stream.reads == 3
+
+    def test_upload_records_hash_and_rejects_repeat_files(
+        self, api_client: TestClient, session_factory: sessionmaker
+    ) -> None:
+        """
+        Test that uploads store the file's SHA-256 and the same file is refused twice.
+        """
+
+        # Arrange
+        async def create_client():
+            async with session_factory() as db:
+                return await client_crud.create(
+                    db, {"name": "Test Client", "email": "uploads@example.com"}
+                )
+
+        client_row = asyncio.run(create_client())
+        doc = fitz.open()
+        doc.new_page(width=612, height=792).insert_text(
+            (50, 100), "Carrier: ROADWAY EXPRESS\nInvoice #: INV-HASH-1\nTotal: $1,575.00"
+        )
+        pdf_bytes = doc.tobytes()
+        doc.close()
+        files = {"file": ("invoice.pdf", pdf_bytes, "application/pdf")}
+
+        # Act
+        first = api_client.post(f"/api/invoices/upload?client_id={client_row.id}", files=files)
+        second = api_client.post(f"/api/invoices/upload?client_id={client_row.id}", files=files)
+
+        # Assert
+        assert first.status_code == 200
+        assert first.json()["duplicate_hash"] == hashlib.sha256(pdf_bytes).hexdigest()
+        assert second.status_code == 400
+        assert "INV-HASH-1" in second.json()["detail"]
+
+        async def count_invoices():
+            async with session_factory() as db:
+                return len(await invoice_crud.get_by_client_id(db, client_row.id))
+
+        assert asyncio.run(count_invoices()) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])